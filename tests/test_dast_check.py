@@ -0,0 +1,92 @@
+# Cliente do ZAP daemon contra um stub HTTP local (sem Docker)
+import asyncio
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools import dast_check
+
+TARGET = "http://app.local:8080"
+ALERTS = [
+    {"pluginId": "10038", "alert": "CSP Header Not Set", "risk": "Medium", "confidence": "High",
+     "url": f"{TARGET}/", "description": "Sem CSP", "solution": "Defina CSP",
+     "reference": "https://a\nhttps://b"},
+    {"pluginId": "10038", "alert": "CSP Header Not Set", "risk": "Medium", "confidence": "High",
+     "url": f"{TARGET}/login"},
+    {"pluginId": "40012", "alert": "Cross Site Scripting (Reflected)", "risk": "High",
+     "url": f"{TARGET}/busca?q=x"},
+]
+
+
+class _ZapStub(BaseHTTPRequestHandler):
+    """Responde à API JSON do ZAP; o spider só chega a 100% na terceira consulta"""
+
+    calls = []
+    spider_polls = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        endpoint = url.path.strip("/").split("/", 1)[1]
+        type(self).calls.append((endpoint, params))
+        if endpoint == "spider/view/status":
+            type(self).spider_polls += 1
+            body = {"status": "100" if self.spider_polls >= 3 else "40"}
+        else:
+            body = {
+                "core/view/version": {"version": "2.14.0"},
+                "context/action/newContext": {"contextId": "7"},
+                "spider/action/scan": {"scan": "3"},
+                "pscan/view/recordsToScan": {"recordsToScan": "0"},
+                "core/view/alerts": {"alerts": ALERTS},
+            }.get(endpoint, {"Result": "OK"})
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    _ZapStub.calls, _ZapStub.spider_polls = [], 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ZapStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_scan_target_polls_until_done_and_maps_alerts():
+    server, base_url = _serve()
+    try:
+        daemon = dast_check.ZapDaemon(base_url=base_url, api_key="chave", poll_interval=0.01)
+        daemon.start()  # stub já ativo: nenhum container é criado
+        (result,) = asyncio.run(daemon.scan_targets([TARGET]))
+        daemon.stop()
+    finally:
+        server.shutdown()
+
+    assert result["error"] is None
+    assert _ZapStub.spider_polls == 3
+    endpoints = [endpoint for endpoint, _ in _ZapStub.calls]
+    assert endpoints[-1] == "context/action/removeContext"
+    include = dict(_ZapStub.calls)["context/action/includeInContext"]
+    assert include["regex"] == r"http://app\.local:8080.*"
+    assert all(params.get("apikey") == "chave" for _, params in _ZapStub.calls)
+    assert daemon.port == server.server_address[1]
+
+    findings = dast_check.parse_alerts(TARGET, result["alerts"])
+    assert [f["severity"] for f in findings] == ["MEDIUM", "HIGH"]
+    csp = findings[0]
+    assert csp["title"] == "DAST (ZAP) - CSP Header Not Set"
+    assert f"- {TARGET}/login" in csp["description"]
+    assert csp["confidence"] == "HIGH"
+    assert csp["references"] == ["https://a", "https://b"]
+    assert findings[1]["location"] == TARGET
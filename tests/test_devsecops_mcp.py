@@ -0,0 +1,84 @@
+# Fluxo de streaming do perguntar com retriever e LLM stub (sem Ollama)
+import io
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_community")
+pytest.importorskip("matplotlib")
+
+from tools import devsecops_mcp
+
+DOCS = [
+    SimpleNamespace(page_content="O SSDF organiza práticas de desenvolvimento seguro.",
+                    metadata={"source": "sp800-218.pdf", "category": "NIST", "score": 0.82, "page": 3}),
+    SimpleNamespace(page_content="Top 10 de riscos de APIs.", metadata={"source": "owasp_api_top10.md"}),
+]
+
+
+class _StubRetriever:
+    def __init__(self):
+        self.queries = []
+
+    def invoke(self, query):
+        self.queries.append(query)
+        return DOCS
+
+
+class _StubLLM:
+    """Registra o prompt e devolve os tokens em ordem (o vazio deve ser ignorado)"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        yield from self.tokens
+
+
+def test_stream_answer_emits_sources_then_tokens_then_done():
+    retriever, llm = _StubRetriever(), _StubLLM(["O SSDF ", "", "é do NIST."])
+    events = list(devsecops_mcp.stream_answer("O que é SSDF?", llm=llm, retriever=retriever))
+
+    assert [e["event"] for e in events] == ["sources", "token", "token", "done"]
+    assert events[0]["sources"] == [
+        {"source": "sp800-218.pdf", "category": "NIST", "score": 0.82},
+        {"source": "owasp_api_top10.md"},
+    ]
+    assert [e["text"] for e in events[1:3]] == ["O SSDF ", "é do NIST."]
+    done = events[-1]
+    assert done["chars"] == len("O SSDF é do NIST.")
+    assert done["first_token_s"] is not None and done["first_token_s"] <= done["total_s"]
+
+    assert retriever.queries == ["O que é SSDF?"]
+    (prompt,) = llm.prompts
+    assert DOCS[0].page_content in prompt and "O que é SSDF?" in prompt
+
+
+def test_print_answer_stream_ndjson_writes_one_event_per_line():
+    llm = _StubLLM(["Olá", " mundo"])
+    out = io.StringIO()
+    devsecops_mcp.print_answer_stream(
+        devsecops_mcp.stream_answer("oi", llm=llm, retriever=_StubRetriever()), ndjson=True, out=out)
+
+    lines = out.getvalue().splitlines()
+    events = [json.loads(line) for line in lines]
+    assert [e["event"] for e in events] == ["sources", "token", "token", "done"]
+    assert events[0]["sources"][0]["category"] == "NIST"
+    assert "".join(e["text"] for e in events if e["event"] == "token") == "Olá mundo"
+
+
+def test_print_answer_stream_text_lists_sources_before_answer():
+    out = io.StringIO()
+    devsecops_mcp.print_answer_stream(
+        devsecops_mcp.stream_answer("oi", llm=_StubLLM(["Olá"]), retriever=_StubRetriever()), out=out)
+
+    assert out.getvalue() == ("📚 Fontes: sp800-218.pdf (NIST), owasp_api_top10.md\n\n"
+                              "Olá\n")
@@ -0,0 +1,407 @@
+# Workers Bandit "quentes" (API Python, sem shell)
+"""
+Executa o Bandit pela API Python (`bandit.core.manager`) em vez de
+`bandit -r ... -f json` via shell:
+
+- cada worker importa o Bandit e carrega o conjunto de plugins uma única vez;
+- os arquivos `.py` do alvo são distribuídos em lotes entre os workers e o
+  resultado volta estruturado, no mesmo formato do `bandit -f json`;
+- um daemon opcional (`python tools/bandit_pool.py serve`) mantém o pool vivo
+  entre invocações da CLI, de modo que um scan de um único arquivo (ex.: ao
+  salvar no editor) responde em dezenas de milissegundos.
+
+Sem daemon, scans pequenos rodam no próprio processo e scans grandes usam um
+pool temporário. Em todos os caminhos vale o timeout do Bandit no
+`resource_governor` (DEVSECOPS_LIMITS_BANDIT) e o scan levanta TimeoutError
+ao estourar: no pool, os workers daquele scan são encerrados; no próprio
+processo não há como interromper o Bandit, e a thread abandonada continua
+consumindo CPU até terminar o lote (ou o processo sair).
+"""
+
+import logging
+import os
+import secrets
+import signal
+import sys
+import threading
+import time
+from multiprocessing import Pool, TimeoutError as PoolTimeoutError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools import resource_governor, tracing
+
+# Diretórios ignorados (os mesmos excluídos por padrão pelo Bandit, mais ambientes virtuais)
+EXCLUDE_DIRS = {".svn", "CVS", ".bzr", ".hg", ".git", "__pycache__", ".tox", ".eggs",
+                ".venv", "venv", "node_modules"}
+# Arquivos por tarefa enviada a um worker
+BATCH_FILES = 16
+# Até esta quantidade de arquivos, sem daemon, o scan roda no próprio processo
+INLINE_MAX_FILES = 64
+
+STATE_DIR = Path.home() / ".devsecops"
+AUTHKEY_FILE = STATE_DIR / "bandit_key"
+if os.name == "nt":
+    FAMILY, ADDRESS = "AF_PIPE", r"\\.\pipe\devsecops-bandit"
+else:
+    FAMILY, ADDRESS = "AF_UNIX", str(STATE_DIR / "bandit.sock")
+
+_CONFIG = None
+
+
+def _worker_init() -> None:
+    """Importa o Bandit e monta a configuração uma vez por processo"""
+    global _CONFIG
+    if _CONFIG is None:
+        from bandit.core import config as b_config
+        logging.getLogger("bandit").setLevel(logging.ERROR)
+        _CONFIG = b_config.BanditConfig()
+
+
+def _pool_worker_init() -> None:
+    """
+    Inicialização dos processos do pool: sinais padrão (o daemon instala os seus),
+    limites do Bandit no resource_governor (nice/ionice, memória) e o Bandit
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C encerra pelo processo pai
+    resource_governor.govern_process("bandit")
+    _worker_init()
+
+
+def _scan_batch(files: List[str]) -> Dict:
+    """Roda todos os testes do Bandit em um lote de arquivos"""
+    _worker_init()
+    from bandit.core import manager as b_manager
+    mgr = b_manager.BanditManager(_CONFIG, "file", quiet=True)
+    mgr.discover_files(files, recursive=False)
+    mgr.run_tests()
+    totals = mgr.metrics.data.get("_totals", {})
+    return {
+        "results": [issue.as_dict() for issue in mgr.get_issue_list()],
+        "errors": [{"filename": name, "reason": reason} for name, reason in mgr.skipped],
+        "loc": totals.get("loc", 0),
+        "nosec": totals.get("nosec", 0),
+        "files": len(files),
+    }
+
+
+def _scan_batch_governed(files: List[str]) -> Dict:
+    """Lote no worker do pool, com o limite de CPU do Bandit e o consumo medido"""
+    with resource_governor.cpu_budget("bandit") as usage:
+        part = _scan_batch(files)
+    part["usage"] = usage
+    return part
+
+
+def _record_usage(parts: Iterable[Dict]) -> None:
+    """Exporta CPU e pico de RSS de cada lote nas métricas do scanner (no processo pai)"""
+    for part in parts:
+        if "usage" in part:
+            resource_governor.record_usage("bandit", **part["usage"])
+
+
+def iter_python_files(paths: Iterable[Union[str, Path]]) -> List[str]:
+    """Expande arquivos e diretórios nos arquivos `.py` a analisar"""
+    files = []
+    for path in paths:
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"caminho não encontrado: {path}")
+        if path.is_file():
+            files.append(str(path))
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d not in EXCLUDE_DIRS and not d.endswith(".egg"))
+            files.extend(os.path.join(root, n) for n in sorted(names) if n.endswith(".py"))
+    return files
+
+
+def _batches(files: List[str]) -> List[List[str]]:
+    return [files[i:i + BATCH_FILES] for i in range(0, len(files), BATCH_FILES)]
+
+
+def _merge(parts: Iterable[Dict]) -> Dict:
+    """Junta os lotes no formato do `bandit -f json` (results, errors, metrics._totals)"""
+    report = {"results": [], "errors": [], "metrics": {"_totals": {"loc": 0, "nosec": 0, "files": 0}}}
+    totals = report["metrics"]["_totals"]
+    for part in parts:
+        report["results"].extend(part["results"])
+        report["errors"].extend(part["errors"])
+        for key in ("loc", "nosec", "files"):
+            totals[key] += part[key]
+    report["results"].sort(key=lambda r: (r["filename"], r["line_number"], r["test_id"]))
+    for issue in report["results"]:
+        sev = f"SEVERITY.{issue['issue_severity']}"
+        totals[sev] = totals.get(sev, 0) + 1
+    return report
+
+
+class BanditPool:
+    """
+    Pools de processos com o Bandit já carregado
+
+    Cada scan usa um pool exclusivo: o ocioso (quente) quando houver, ou um
+    novo para pedidos concorrentes. Assim o timeout de um scan encerra só os
+    workers dele, sem derrubar os scans de outros clientes do daemon.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_idle: int = 1):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_idle = max_idle
+        self._idle = []
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        procs = Pool(self.workers, initializer=_pool_worker_init)
+        # Aquece todos os workers antes do primeiro pedido real
+        procs.map(_worker_init_probe, range(self.workers))
+        return procs
+
+    def _release(self, procs) -> None:
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(procs)
+                return
+        procs.close()
+        procs.join()
+
+    def scan(self, paths: Iterable[Union[str, Path]], timeout: Optional[float] = None) -> Dict:
+        """
+        Analisa arquivos/diretórios e devolve o relatório estruturado
+
+        Os workers rodam sob os limites do Bandit no resource_governor
+        (prioridade, memória e CPU por lote) e o consumo de cada lote vai para
+        as métricas do scanner.
+
+        Raises:
+            TimeoutError: o scan passou de `timeout` segundos; os workers deste
+                scan são encerrados (os de outros scans seguem rodando)
+            ResourceBudgetError: recusado na admissão ou lote acima do limite de CPU/memória
+        """
+        files = iter_python_files(paths)
+        if files:
+            resource_governor.admit("bandit", resource_governor.limits_for("bandit"))
+        procs = self._acquire()
+        pending = procs.map_async(_scan_batch_governed, _batches(files))
+        try:
+            parts = pending.get(timeout)
+        except PoolTimeoutError:
+            procs.terminate()
+            procs.join()
+            resource_governor.record_usage("bandit", limited_by="timeout")
+            raise TimeoutError(f"Bandit excedeu {timeout:.0f}s") from None
+        except (resource_governor.ResourceBudgetError, MemoryError) as e:
+            self._release(procs)
+            limit = "memory" if isinstance(e, MemoryError) else "cpu"
+            resource_governor.record_usage("bandit", limited_by=limit)
+            raise resource_governor.ResourceBudgetError(
+                f"bandit: lote interrompido pelo limite de {'memória' if limit == 'memory' else 'CPU'}") from e
+        except BaseException:
+            self._release(procs)
+            raise
+        self._release(procs)
+        _record_usage(parts)
+        return _merge(parts)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle, self._closed = self._idle, [], True
+        for procs in idle:
+            procs.close()
+            procs.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _worker_init_probe(_: int) -> bool:
+    _worker_init()
+    return True
+
+
+# --------------------------------------------------------------------------- daemon
+def _authkey(create: bool = False) -> Optional[bytes]:
+    try:
+        return bytes.fromhex(AUTHKEY_FILE.read_text().strip())
+    except (OSError, ValueError):
+        if not create:
+            return None
+    key = secrets.token_bytes(32)
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    AUTHKEY_FILE.write_text(key.hex())
+    try:
+        AUTHKEY_FILE.chmod(0o600)
+    except OSError:
+        pass
+    return key
+
+
+def serve(workers: Optional[int] = None) -> None:
+    """Mantém um BanditPool vivo e atende pedidos de outros processos até Ctrl+C"""
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    if FAMILY == "AF_UNIX" and os.path.exists(ADDRESS):
+        os.unlink(ADDRESS)
+    pool = BanditPool(workers)
+    pool.scan([])  # aquece os workers
+    listener = Listener(ADDRESS, family=FAMILY, authkey=_authkey(create=True))
+    if FAMILY == "AF_UNIX":
+        os.chmod(ADDRESS, 0o600)
+    print(f"Bandit workers prontos ({pool.workers}) em {ADDRESS}", flush=True)
+
+    def handle(conn):
+        with conn:
+            try:
+                request = conn.recv()
+                conn.send({"ok": True, "report": pool.scan(request["paths"], request.get("timeout"))})
+            except TimeoutError as e:
+                conn.send({"ok": False, "timeout": True, "error": str(e)})
+            except Exception as e:
+                conn.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception:
+                continue  # cliente com chave inválida ou que desconectou
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()  # remove também o socket Unix
+        pool.close()
+
+
+def request(paths: Iterable[Union[str, Path]], timeout: Optional[float] = None) -> Optional[Dict]:
+    """
+    Envia o scan ao daemon, se houver um rodando
+
+    Returns:
+        Relatório do daemon, ou None se não houver daemon disponível
+
+    Raises:
+        TimeoutError: o scan passou de `timeout` segundos
+    """
+    key = _authkey()
+    if key is None or (FAMILY == "AF_UNIX" and not os.path.exists(ADDRESS)):
+        return None
+    try:
+        conn = Client(ADDRESS, family=FAMILY, authkey=key)
+    except (OSError, EOFError):
+        return None
+    with conn:
+        # Caminhos absolutos: o daemon pode ter outro diretório de trabalho
+        conn.send({"paths": [str(Path(p).resolve()) for p in paths], "timeout": timeout})
+        # O daemon aplica o mesmo timeout; a folga cobre o daemon travado
+        if not conn.poll(None if timeout is None else timeout + 5):
+            raise TimeoutError(f"daemon do Bandit não respondeu em {timeout:.0f}s")
+        reply = conn.recv()
+    if reply.get("timeout"):
+        raise TimeoutError(reply["error"])
+    if not reply["ok"]:
+        raise RuntimeError(reply["error"])
+    return reply["report"]
+
+
+@tracing.traced("sast.bandit_api")
+def scan(paths: Iterable[Union[str, Path]], workers: Optional[int] = None,
+         timeout: Optional[float] = None) -> Dict:
+    """
+    Analisa com o Bandit usando o melhor caminho disponível
+
+    Ordem: daemon com workers quentes → no próprio processo (poucos arquivos)
+    → pool temporário (árvores grandes). No caminho em processo, um timeout
+    devolve o controle, mas o trabalho abandonado não é interrompido (ver
+    `_scan_inline`).
+
+    Args:
+        timeout: Segundos até desistir (padrão: o timeout do Bandit no resource_governor)
+
+    Raises:
+        TimeoutError
+    """
+    paths = list(paths)
+    timeout = timeout or resource_governor.limits_for("bandit").timeout
+    report = request(paths, timeout)
+    if report is not None:
+        return report
+    files = iter_python_files(paths)
+    if len(files) <= INLINE_MAX_FILES:
+        return _scan_inline(files, timeout)
+    with BanditPool(workers) as pool:
+        return pool.scan(files, timeout)
+
+
+def _scan_inline(files: List[str], timeout: Optional[float]) -> Dict:
+    """
+    Scan no próprio processo (até INLINE_MAX_FILES arquivos, sem custo de spawn)
+
+    Roda sem os limites do resource_governor (valeriam para o processo que
+    chamou); só o timeout e o tempo de CPU da thread são aplicados/registrados.
+    Com timeout, o Bandit roda numa thread daemon e o scan desiste dela ao
+    estourar. Threads não podem ser interrompidas: a thread abandonada segue
+    rodando em segundo plano até concluir os lotes ou o processo terminar.
+    """
+    def run() -> Dict:
+        started = time.thread_time()
+        report = _merge(_scan_batch(batch) for batch in _batches(files))
+        resource_governor.record_usage("bandit", cpu_seconds=time.thread_time() - started)
+        return report
+
+    if timeout is None:
+        return run()
+    outcome: Dict = {}
+
+    def target():
+        try:
+            outcome["report"] = run()
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"Bandit excedeu {timeout:.0f}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["report"]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Workers Bandit persistentes")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve", help="Inicia o daemon com workers quentes")
+    p_serve.add_argument("--workers", type=int, default=None)
+    p_scan = sub.add_parser("scan", help="Analisa arquivos/diretórios (usa o daemon se houver)")
+    p_scan.add_argument("paths", nargs="+")
+    args = parser.parse_args(argv)
+    if args.cmd == "serve":
+        serve(args.workers)
+    else:
+        print(json.dumps(scan(args.paths), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    # Reimporta como tools.bandit_pool para que os workers recebam funções picklable pelo nome do módulo
+    from tools import bandit_pool
+    sys.exit(bandit_pool.main())
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Benchmarks dos analisadores e pipelines com corpora sintéticos determinísticos.
+
+Cada caso roda em um subprocesso próprio (para medir o pico de RSS isolado),
+gera seu corpus a partir de uma semente fixa e reporta vazão (itens/s),
+latências p50/p95/p99 e pico de memória. Os resultados podem ser gravados como
+baseline e comparados em execuções futuras.
+
+Uso:
+    python tools/benchmark.py                       # todos os casos
+    python tools/benchmark.py dockerfile compose    # casos específicos
+    python tools/benchmark.py --scale 0.1           # corpora 10x menores
+    python tools/benchmark.py --save-baseline       # grava data/benchmarks/baseline.json
+    python tools/benchmark.py --baseline data/benchmarks/baseline.json --tolerance 0.2
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+BASE = Path(__file__).resolve().parents[1]
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+BASELINE = BASE / "data" / "benchmarks" / "baseline.json"
+RESULTS = BASE / "relatorios" / "benchmark.json"
+SEED = 1337
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# --------------------------------------------------------------------------- corpora
+BASE_IMAGES = ["alpine:3.19", "python:3.12-slim", "node:20-slim", "ubuntu:latest", "nginx:alpine",
+               "debian:bookworm", "golang:1.22", "openjdk:17", "busybox:latest", "redis:7"]
+PACKAGES = ["curl", "git", "openssl", "ca-certificates", "gcc", "make", "libpq-dev", "jq", "unzip", "tzdata"]
+
+
+def gen_dockerfile(rng: random.Random) -> str:
+    lines = []
+    for stage in range(rng.choice([1, 1, 2, 3])):
+        lines.append(f"FROM {rng.choice(BASE_IMAGES)} AS stage{stage}")
+        lines.append(f"RUN apt-get update && apt-get install -y {' '.join(rng.sample(PACKAGES, 4))}")
+        for _ in range(rng.randint(2, 12)):
+            op = rng.choice(["COPY", "ADD", "RUN", "ENV", "WORKDIR", "EXPOSE"])
+            if op in ("COPY", "ADD"):
+                lines.append(f"{op} src/{rng.randint(0, 999)} /app/{rng.randint(0, 999)}")
+            elif op == "RUN":
+                lines.append(f"RUN echo step{rng.randint(0, 9999)} && make -j{rng.randint(1, 8)}")
+            elif op == "ENV":
+                if rng.random() < 0.1:
+                    lines.append(f"ENV API_KEY=\"{rng.getrandbits(64):x}\"")
+                else:
+                    lines.append(f"ENV VAR_{rng.randint(0, 99)}={rng.randint(0, 9999)}")
+            elif op == "WORKDIR":
+                lines.append(f"WORKDIR /app/{rng.randint(0, 9)}")
+            else:
+                lines.append(f"EXPOSE {rng.randint(1024, 65000)}")
+    if rng.random() < 0.2:
+        lines.append("USER root")
+    if rng.random() < 0.5:
+        lines.append("HEALTHCHECK CMD curl -f http://localhost/ || exit 1")
+    lines.append('CMD ["./run"]')
+    return "\n".join(lines) + "\n"
+
+
+def gen_compose(rng: random.Random) -> Dict:
+    services = {}
+    for i in range(rng.randint(2, 15)):
+        svc = {"image": rng.choice(BASE_IMAGES)}
+        if rng.random() < 0.6:
+            svc["ports"] = [f"{rng.randint(1024, 65000)}:{rng.randint(1, 9000)}"]
+        if rng.random() < 0.5:
+            svc["volumes"] = [f"./data{j}:/data{j}:{rng.choice(['ro', 'rw'])}" for j in range(rng.randint(1, 4))]
+        if rng.random() < 0.1:
+            svc["privileged"] = True
+        if rng.random() < 0.1:
+            svc["network_mode"] = "host"
+        if rng.random() < 0.5:
+            svc["deploy"] = {"resources": {"limits": {"cpus": "0.5", "memory": "256M"}}}
+        svc["environment"] = {f"VAR_{k}": str(rng.randint(0, 999)) for k in range(rng.randint(0, 10))}
+        services[f"svc{i}"] = svc
+    return {"version": "3.9", "services": services}
+
+
+def gen_k8s_object(rng: random.Random, i: int) -> Dict:
+    container = {
+        "name": f"app{i}",
+        "image": rng.choice(BASE_IMAGES),
+        "ports": [{"containerPort": rng.randint(1024, 9000)}],
+        "env": [{"name": f"VAR_{k}", "value": str(rng.randint(0, 999))} for k in range(rng.randint(0, 8))],
+    }
+    if rng.random() < 0.6:
+        container["resources"] = {"limits": {"cpu": "500m", "memory": "256Mi"}}
+    if rng.random() < 0.5:
+        container["securityContext"] = {"runAsNonRoot": True, "readOnlyRootFilesystem": True}
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {"name": f"deploy-{i}", "namespace": f"ns{i % 20}", "labels": {"app": f"app{i}"}},
+        "spec": {
+            "replicas": rng.randint(1, 5),
+            "selector": {"matchLabels": {"app": f"app{i}"}},
+            "template": {"metadata": {"labels": {"app": f"app{i}"}}, "spec": {"containers": [container]}},
+        },
+    }
+
+
+def gen_finding(rng: random.Random, i: int) -> Dict:
+    return {
+        "severity": rng.choice(["CRITICAL", "HIGH", "MEDIUM", "LOW"]),
+        "title": f"Finding {i} - {rng.choice(['SQL Injection', 'XSS', 'CVE-2024-%04d' % rng.randint(0, 9999)])}",
+        "description": " ".join(rng.choice(["lorem", "ipsum", "dolor", "sit", "amet"]) for _ in range(30)),
+        "recommendation": "Atualize a dependência e revise o código.",
+        "tool": rng.choice(["SAST", "SCA", "DAST", "Trivy"]),
+        "location": f"src/module{rng.randint(0, 500)}.py:{rng.randint(1, 2000)}",
+    }
+
+
+def gen_knowledge_base(rng: random.Random, total_bytes: int) -> List[Dict]:
+    words = [hashlib.md5(str(i).encode()).hexdigest()[:rng.randint(3, 10)] for i in range(5000)]
+    docs, size, i = [], 0, 0
+    while size < total_bytes:
+        paragraphs = []
+        for _ in range(rng.randint(20, 80)):
+            paragraphs.append(" ".join(rng.choice(words) for _ in range(rng.randint(30, 150))))
+        content = f"# Documento {i}\n\n" + "\n\n".join(paragraphs)
+        docs.append({"content": content,
+                     "metadata": {"source": f"doc{i}.md", "category": f"cat{i % 6}", "type": "markdown"}})
+        size += len(content)
+        i += 1
+    return docs
+
+
+class StubEmbeddings:
+    """Embeddings determinísticos por hashing de tokens (substitui o Ollama nos benchmarks)"""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for token in text.split():
+            h = zlib.crc32(token.encode("utf-8"))
+            vec[h % self.dim] += 1.0 if h & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# --------------------------------------------------------------------------- casos
+def _timed(items, fn: Callable) -> List[float]:
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def case_dockerfile(workdir: Path, scale: float) -> Tuple[int, List[float]]:
+    from tools import container_check
+    rng = random.Random(SEED)
+    paths = []
+    for i in range(max(1, int(5000 * scale))):
+        p = workdir / f"Dockerfile.{i}"
+        p.write_text(gen_dockerfile(rng))
+        paths.append(str(p))
+    checker = container_check.ContainerSecurityChecker()
+    return len(paths), _timed(paths, checker.analyze_dockerfile)
+
+
+def case_compose(workdir: Path, scale: float) -> Tuple[int, List[float]]:
+    import yaml
+    from tools import container_check
+    rng = random.Random(SEED)
+    paths = []
+    for i in range(max(1, int(2000 * scale))):
+        p = workdir / f"docker-compose.{i}.yml"
+        p.write_text(yaml.safe_dump(gen_compose(rng)))
+        paths.append(str(p))
+    checker = container_check.ContainerSecurityChecker()
+    return len(paths), _timed(paths, checker.analyze_compose)
+
+
+def case_k8s(workdir: Path, scale: float) -> Tuple[int, List[float]]:
+    import yaml
+    from tools import policy_check
+    rng = random.Random(SEED)
+    paths = []
+    per_bundle = max(1, int(2000 * scale))
+    for b in range(10):
+        bundle = {"apiVersion": "v1", "kind": "List",
+                  "items": [gen_k8s_object(rng, b * per_bundle + i) for i in range(per_bundle)]}
+        p = workdir / f"bundle{b}.yaml"
+        p.write_text(yaml.safe_dump(bundle))
+        paths.append(p)
+    return len(paths), _timed(paths, policy_check.analyze_config)
+
+
+def case_report(workdir: Path, scale: float) -> Tuple[int, List[float]]:
+    from tools import report_gen
+    rng = random.Random(SEED)
+    n = max(1, int(100_000 * scale))
+    report = report_gen.DevSecOpsReport("Benchmark")
+    for i in range(n):
+        report.add_finding(report_gen.SecurityFinding(**gen_finding(rng, i)))
+    report.add_metric("findings", n)
+    report.add_summary("executive_summary", "Benchmark sintético")
+    steps = [
+        lambda _: report.to_markdown(workdir / "report.md"),
+        lambda _: report.to_html(workdir / "report.html"),
+        lambda _: report.export_json(workdir / "report.json"),
+    ]
+    return n, _timed(steps, lambda step: step(None))
+
+
+def case_rag(workdir: Path, scale: float) -> Tuple[int, List[float]]:
+    from tools import rag_loader
+    rng = random.Random(SEED)
+    texts = gen_knowledge_base(rng, max(1, int(8 * 1024 * 1024 * scale)))
+    embedder = StubEmbeddings()
+    chunks: List = []
+    latencies = _timed(texts, lambda item: chunks.extend(rag_loader.split_documents([item])))
+    batch = 256
+    batches = [chunks[i:i + batch] for i in range(0, len(chunks), batch)]
+    latencies += _timed(batches, lambda b: embedder.embed_documents([d.page_content for d in b]))
+    return len(chunks), latencies
+
+
+def case_vector(workdir: Path, scale: float) -> Tuple[int, List[float]]:
+    import numpy as np
+    from tools import vector_index
+    rng = np.random.default_rng(SEED)
+    n, dim = max(16, int(200_000 * scale)), 384
+    centers = rng.standard_normal((256, dim), dtype=np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + rng.standard_normal((n, dim), dtype=np.float32)
+    vector_index.write_index(workdir / "index", vectors, [f"chunk {i}" for i in range(n)],
+                             [{"source": f"doc{i % 100}.md"} for i in range(n)])
+    queries = vectors[rng.integers(0, n, 200)]
+    latencies = _timed([None], lambda _: vector_index.CompactIndex(workdir / "index").close())
+    index = vector_index.CompactIndex(workdir / "index")
+    latencies += _timed(queries, lambda q: index.query(q, 3))
+    return n, latencies
+
+
+CASES: Dict[str, Callable[[Path, float], Tuple[int, List[float]]]] = {
+    "dockerfile": case_dockerfile,
+    "compose": case_compose,
+    "k8s": case_k8s,
+    "report": case_report,
+    "rag": case_rag,
+    "vector": case_vector,
+}
+
+
+# --------------------------------------------------------------------------- execução
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KiB; macOS, bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def run_case(name: str, scale: float) -> Dict:
+    """Executa um caso no processo atual e devolve suas métricas"""
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as tmp:
+        start = time.perf_counter()
+        items, latencies = CASES[name](Path(tmp), scale)
+        measured = sum(latencies)
+        total = time.perf_counter() - start
+    lat = sorted(latencies)
+    return {
+        "case": name,
+        "items": items,
+        "seconds": round(measured, 4),
+        "wall_seconds": round(total, 4),
+        "throughput": round(items / measured, 2) if measured else None,
+        "p50_ms": round(_percentile(lat, 50) * 1000, 3),
+        "p95_ms": round(_percentile(lat, 95) * 1000, 3),
+        "p99_ms": round(_percentile(lat, 99) * 1000, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_isolated(name: str, scale: float) -> Dict:
+    """Executa um caso em subprocesso para isolar o pico de RSS"""
+    res = subprocess.run([sys.executable, __file__, "--run-case", name, "--scale", str(scale)],
+                         capture_output=True, text=True, cwd=str(BASE))
+    if res.returncode != 0:
+        return {"case": name, "error": (res.stderr.strip().splitlines() or ["erro desconhecido"])[-1]}
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Compara resultados com a baseline
+
+    Returns:
+        Lista de regressões (vazão menor ou p95 maior que a tolerância permite)
+    """
+    regressions = []
+    base_cases = {c["case"]: c for c in baseline.get("results", [])}
+    for r in results:
+        b = base_cases.get(r["case"])
+        if not b or "error" in r or "error" in b:
+            continue
+        if b.get("throughput") and r.get("throughput") and r["throughput"] < b["throughput"] * (1 - tolerance):
+            regressions.append(f"{r['case']}: vazão {r['throughput']} < {b['throughput']} (baseline)")
+        if b.get("p95_ms") and r["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['case']}: p95 {r['p95_ms']}ms > {b['p95_ms']}ms (baseline)")
+        if b.get("peak_rss_mb") and r.get("peak_rss_mb") and r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{r['case']}: RSS {r['peak_rss_mb']}MB > {b['peak_rss_mb']}MB (baseline)")
+    return regressions
+
+
+def format_table(results: List[Dict]) -> str:
+    header = f"{'caso':<12}{'itens':>9}{'itens/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>9}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if "error" in r:
+            lines.append(f"{r['case']:<12} ⚠️ ignorado: {r['error']}")
+            continue
+        lines.append(f"{r['case']:<12}{r['items']:>9}{r['throughput'] or 0:>12.1f}{r['p50_ms']:>10.2f}"
+                     f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['peak_rss_mb'] or 0:>9.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do MCP DevSecOps")
+    parser.add_argument("cases", nargs="*", help=f"Casos a executar (padrão: todos): {', '.join(CASES)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="Fator de tamanho dos corpora")
+    parser.add_argument("--baseline", help="Arquivo de baseline para comparação")
+    parser.add_argument("--save-baseline", nargs="?", const=str(BASELINE), help="Grava os resultados como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Tolerância relativa de regressão")
+    parser.add_argument("--saida", default=str(RESULTS), help=f"Arquivo de resultados (padrão: {RESULTS})")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.scale)))
+        return 0
+
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f"casos desconhecidos: {', '.join(unknown)}")
+
+    results = [run_isolated(name, args.scale) for name in (args.cases or list(CASES))]
+    print(format_table(results))
+
+    payload = {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "results": results,
+    }
+    output = Path(args.saida)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"\nBaseline gravada em: {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if baseline.get("scale") != args.scale:
+            print(f"\n⚠️ Baseline gerada com --scale {baseline.get('scale')}; comparação pode não ser significativa")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Regressões detectadas:")
+            print("\n".join(f"- {r}" for r in regressions))
+            return 1
+        print("\n✅ Nenhuma regressão em relação à baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
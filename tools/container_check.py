@@ -1,11 +1,10 @@
 # Container scanning helpers (Trivy, Docker security best practices)
-import subprocess
+import os
 import shutil
 import json
-import yaml
-import re
 from pathlib import Path
 from typing import List, Dict, Optional
+from tools import doc_cache, resource_governor, sbom_store, secret_scan, tracing
 
 class ContainerSecurityChecker:
     """Classe para análise de segurança de containers"""
@@ -15,31 +14,34 @@ class ContainerSecurityChecker:
         "python:slim", "node:slim", "nginx:alpine"
     ]
     
-    SENSITIVE_PATTERNS = [
-        r'(?i)password\s*=\s*[\'"][^\'"]+[\'"]',
-        r'(?i)secret\s*=\s*[\'"][^\'"]+[\'"]',
-        r'(?i)api[_-]key\s*=\s*[\'"][^\'"]+[\'"]',
-        r'(?i)token\s*=\s*[\'"][^\'"]+[\'"]',
-        r'(?i)credentials?\s*=\s*[\'"][^\'"]+[\'"]'
-    ]
+    SENSITIVE_PATTERNS = secret_scan.GENERIC_ASSIGNMENT_PATTERNS
 
     def __init__(self):
         self.trivy_available = shutil.which('trivy') is not None
 
+    @tracing.traced("container.trivy")
     def trivy_scan_image(self, image: str) -> str:
         """
         Executa análise de vulnerabilidades em imagem usando Trivy
-        
+
+        O SBOM da imagem é gerado uma vez por digest (`sbom_store`) e as
+        análises seguintes só cruzam o SBOM salvo com a base atual, sem pull.
+        Com DEVSECOPS_SBOM=0 volta ao `trivy image` direto.
+
         Args:
             image: Nome da imagem Docker a ser analisada
-            
+
         Returns:
             str: Resultado da análise em formato JSON com vulnerabilidades encontradas
         """
         try:
             if not self.trivy_available:
                 return '[Trivy não encontrado. Instale Trivy localmente ou use docker image aquasec/trivy]'
-            
+
+            if os.environ.get("DEVSECOPS_SBOM", "1") != "0":
+                path, _ = sbom_store.SBOMStore().ensure(image)
+                return sbom_store.match_trivy(path)
+
             cmd = [
                 "trivy", "image",
                 "--quiet",
@@ -49,12 +51,15 @@ class ContainerSecurityChecker:
                 image
             ]
             
-            res = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            res = resource_governor.run(cmd, "trivy")
+            if res.limited_by:
+                return resource_governor.describe_limit("trivy", res)
             return res.stdout or res.stderr
             
         except Exception as e:
             return f"[Erro Trivy: {e}]"
 
+    @tracing.traced("container.dockerfile")
     def analyze_dockerfile(self, path: str) -> Dict[str, List[str]]:
         """
         Análise avançada de Dockerfile com recomendações de segurança
@@ -96,11 +101,11 @@ class ContainerSecurityChecker:
             if 'HEALTHCHECK' not in content:
                 result["suggestions"].append("💡 Adicione HEALTHCHECK para monitoramento de saúde do container")
             
-            # Análise de secrets expostos
-            for pattern in self.SENSITIVE_PATTERNS:
-                if re.search(pattern, content):
-                    result["critical"].append("❌ Detectadas possíveis credenciais expostas no Dockerfile")
-                    break
+            # Análise de secrets expostos (todas as regras em uma única passada)
+            secrets = secret_scan.scan_text(content)
+            if secrets:
+                lines_found = ", ".join(str(s["line"]) for s in secrets)
+                result["critical"].append(f"❌ Detectadas possíveis credenciais expostas no Dockerfile (linhas {lines_found})")
             
             # Verificação de versões fixas
             if ':latest' in content:
@@ -111,6 +116,7 @@ class ContainerSecurityChecker:
         except Exception as e:
             return {"error": [f"[Erro ao analisar Dockerfile: {e}]"]}
 
+    @tracing.traced("container.compose")
     def analyze_compose(self, path: str) -> Dict[str, List[str]]:
         """
         Analisa arquivo docker-compose.yml em busca de problemas de segurança
@@ -121,41 +127,49 @@ class ContainerSecurityChecker:
         Returns:
             Dict com issues encontradas
         """
-        result = {"critical": [], "warnings": [], "suggestions": []}
-        
         try:
-            with open(path) as f:
-                compose = yaml.safe_load(f)
-            
-            services = compose.get('services', {})
-            for service_name, service in services.items():
-                # Verificação de privilégios
-                if service.get('privileged', False):
-                    result["critical"].append(f"❌ Serviço {service_name} está em modo privilegiado")
-                
-                # Verificação de portas expostas
-                if 'ports' in service:
-                    result["warnings"].append(f"⚠️ Serviço {service_name} expõe portas - verifique se necessário")
-                
-                # Verificação de volumes
-                if 'volumes' in service:
-                    for volume in service['volumes']:
-                        if ':rw' in volume:
-                            result["warnings"].append(f"⚠️ Volume com permissão de escrita em {service_name}")
-                
-                # Verificação de rede host
-                if service.get('network_mode') == 'host':
-                    result["critical"].append(f"❌ Serviço {service_name} usa network_mode: host")
-                
-                # Verificação de limites de recursos
-                if not service.get('deploy', {}).get('resources', {}):
-                    result["suggestions"].append(f"💡 Defina limites de recursos para {service_name}")
-            
-            return result
+            return self.compose_issues(doc_cache.load(path))
             
         except Exception as e:
             return {"error": [f"[Erro ao analisar docker-compose: {e}]"]}
 
+    def compose_issues(self, compose: Dict) -> Dict[str, List[str]]:
+        """
+        Heurísticas de segurança para um docker-compose já parseado
+
+        Args:
+            compose: Documento docker-compose (dict com `services`)
+
+        Returns:
+            Dict com issues encontradas
+        """
+        result = {"critical": [], "warnings": [], "suggestions": []}
+        services = compose.get('services', {})
+        for service_name, service in services.items():
+            # Verificação de privilégios
+            if service.get('privileged', False):
+                result["critical"].append(f"❌ Serviço {service_name} está em modo privilegiado")
+            
+            # Verificação de portas expostas
+            if 'ports' in service:
+                result["warnings"].append(f"⚠️ Serviço {service_name} expõe portas - verifique se necessário")
+            
+            # Verificação de volumes
+            if 'volumes' in service:
+                for volume in service['volumes']:
+                    if ':rw' in volume:
+                        result["warnings"].append(f"⚠️ Volume com permissão de escrita em {service_name}")
+            
+            # Verificação de rede host
+            if service.get('network_mode') == 'host':
+                result["critical"].append(f"❌ Serviço {service_name} usa network_mode: host")
+            
+            # Verificação de limites de recursos
+            if not service.get('deploy', {}).get('resources', {}):
+                result["suggestions"].append(f"💡 Defina limites de recursos para {service_name}")
+        
+        return result
+
     def format_results(self, results: Dict[str, List[str]]) -> str:
         """Formata os resultados da análise"""
         output = []
@@ -176,3 +190,36 @@ class ContainerSecurityChecker:
             output.append(f"\n❌ Erro: {results['error']}")
         
         return "\n".join(output) if output else "✅ Nenhum problema encontrado"
+
+
+def trivy_findings(output: str, image: str) -> List[Dict]:
+    """
+    Converte a saída JSON do Trivy em achados (campos de SecurityFinding)
+
+    Args:
+        output: Saída de `trivy image --format json`
+        image: Imagem analisada (usada como localização)
+
+    Returns:
+        Lista de achados, um por vulnerabilidade/pacote
+
+    Raises:
+        ValueError: se a saída não for o JSON do Trivy (ex.: mensagem de erro)
+    """
+    data = json.loads(output)
+    findings = []
+    for result in data.get("Results") or []:
+        for vuln in result.get("Vulnerabilities") or []:
+            fixed = vuln.get("FixedVersion")
+            findings.append({
+                "severity": str(vuln.get("Severity") or "MEDIUM").upper(),
+                "title": f"Container (Trivy) - {vuln.get('VulnerabilityID')} em {vuln.get('PkgName')}",
+                "description": (f"{vuln.get('Title') or vuln.get('Description') or ''}\n\n"
+                                f"Pacote {vuln.get('PkgName')} {vuln.get('InstalledVersion')} "
+                                f"({result.get('Target')})").strip(),
+                "recommendation": f"Atualize para {fixed}." if fixed else "Sem correção disponível; avalie mitigação.",
+                "tool": "Trivy",
+                "location": image,
+                "references": [vuln["PrimaryURL"]] if vuln.get("PrimaryURL") else None,
+            })
+    return findings
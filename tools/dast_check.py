@@ -1,9 +1,315 @@
-# DAST helpers using OWASP ZAP container (quick placeholder)
+# DAST helpers using OWASP ZAP (baseline container + daemon mode via API)
+import asyncio
+import os
+import re
+import secrets
 import subprocess
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from tools import resource_governor, tracing
+
+ZAP_IMAGE = "owasp/zap2docker-stable"
+ZAP_CONTAINER = "devsecops-zap"
+ZAP_PORT = 8090
+# Chave da API persistida para que outros processos reaproveitem o daemon
+ZAP_KEY_FILE = Path.home() / ".devsecops" / "zap_api_key"
+# Mantém o container de pé entre execuções (0 encerra ao final de cada scan)
+KEEP_ALIVE = os.environ.get("DEVSECOPS_ZAP_KEEP_ALIVE", "1").lower() not in ("0", "false", "no")
+
+# Mapeamento de risco do ZAP para a severidade usada nos relatórios
+RISK_TO_SEVERITY = {
+    "High": "HIGH",
+    "Medium": "MEDIUM",
+    "Low": "LOW",
+    "Informational": "LOW",
+}
+
+
 def run_zap_scan(url):
+    """
+    Executa o zap-baseline em um container efêmero (um alvo por chamada)
+    Args:
+        url: URL alvo
+    Returns:
+        Saída textual do zap-baseline
+    """
     try:
-        cmd = f"docker run --rm owasp/zap2docker-stable zap-baseline.py -t {url}"
-        res = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=600)
+        res = resource_governor.run_container(["--rm", ZAP_IMAGE, "zap-baseline.py", "-t", url], "zap")
+        if res.limited_by:
+            return resource_governor.describe_limit("zap", res)
         return res.stdout or res.stderr
     except Exception as e:
         return f"[Erro ZAP: {e}]"
+
+
+class ZapDaemon:
+    """
+    ZAP em modo daemon controlado pela API JSON.
+
+    `start()` só sobe o container se nenhum ZAP responder em `base_url`; a chave
+    da API fica em `ZAP_KEY_FILE`, então execuções seguintes (outros processos)
+    encontram o daemon ativo e o reaproveitam. `stop()` só encerra o container
+    que esta instância subiu; para encerrar um daemon deixado de pé, use
+    `stop_daemon()`. Se `base_url` apontar para uma instância já ativa —
+    inclusive um stub HTTP local em testes — nenhum container é criado.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 port: int = ZAP_PORT, container_name: str = ZAP_CONTAINER,
+                 poll_interval: float = 2.0):
+        self.base_url = (base_url or f"http://127.0.0.1:{port}").rstrip("/")
+        # O container publica a porta da base_url (quando informada)
+        self.port = urlparse(self.base_url).port or port
+        self.api_key = api_key or os.environ.get("ZAP_API_KEY") or self._load_key()
+        self.container_name = container_name
+        self.poll_interval = poll_interval
+        self.session = requests.Session()
+        self._started_here = False
+
+    @staticmethod
+    def _load_key() -> Optional[str]:
+        try:
+            return ZAP_KEY_FILE.read_text().strip() or None
+        except OSError:
+            return None
+
+    @staticmethod
+    def _save_key(key: str) -> None:
+        ZAP_KEY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        ZAP_KEY_FILE.write_text(key)
+        try:
+            ZAP_KEY_FILE.chmod(0o600)
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------ API
+    def _api(self, component: str, kind: str, name: str, **params) -> Dict:
+        if self.api_key:
+            params["apikey"] = self.api_key
+        url = f"{self.base_url}/JSON/{component}/{kind}/{name}/"
+        r = self.session.get(url, params=params, timeout=30)
+        r.raise_for_status()
+        return r.json()
+
+    async def _aapi(self, component: str, kind: str, name: str, **params) -> Dict:
+        return await asyncio.to_thread(self._api, component, kind, name, **params)
+
+    def is_running(self) -> bool:
+        try:
+            self._api("core", "view", "version")
+            return True
+        except Exception:
+            return False
+
+    # ------------------------------------------------------------ lifecycle
+    def start(self, timeout: float = 120) -> None:
+        """Garante um ZAP daemon ativo, subindo o container se necessário"""
+        if self.is_running():
+            return
+        self.api_key = secrets.token_hex(16)
+        self._save_key(self.api_key)
+        subprocess.run(["docker", "rm", "-f", self.container_name], capture_output=True, text=True)
+        cmd = [
+            "docker", "run", "-d", "--name", self.container_name,
+            "-p", f"127.0.0.1:{self.port}:8080",
+            *resource_governor.docker_flags("zap"),
+            ZAP_IMAGE, "zap.sh", "-daemon", "-host", "0.0.0.0", "-port", "8080",
+            "-config", f"api.key={self.api_key}",
+            "-config", "api.addrs.addr.name=.*",
+            "-config", "api.addrs.addr.regex=true",
+        ]
+        res = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+        if res.returncode != 0:
+            raise RuntimeError(f"Falha ao iniciar ZAP daemon: {res.stderr.strip()}")
+        self._started_here = True
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.is_running():
+                return
+            time.sleep(1)
+        raise TimeoutError(f"ZAP daemon não respondeu em {timeout}s")
+
+    def stop(self) -> None:
+        """Encerra o container do daemon (se foi iniciado por esta instância)"""
+        if self._started_here:
+            subprocess.run(["docker", "rm", "-f", self.container_name], capture_output=True, text=True)
+            self._started_here = False
+
+    # ---------------------------------------------------------------- scans
+    async def _wait_status(self, component: str, scan_id: str, deadline: float) -> None:
+        while True:
+            status = await self._aapi(component, "view", "status", scanId=scan_id)
+            if int(status.get("status", 0)) >= 100:
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{component} {scan_id} excedeu o tempo limite")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _wait_passive(self, deadline: float) -> None:
+        while True:
+            pending = await self._aapi("pscan", "view", "recordsToScan")
+            if int(pending.get("recordsToScan", 0)) == 0 or time.monotonic() > deadline:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def _alerts(self, target: str, page_size: int = 500) -> List[Dict]:
+        alerts, start = [], 0
+        while True:
+            page = await self._aapi("core", "view", "alerts", baseurl=target,
+                                    start=start, count=page_size)
+            batch = page.get("alerts", [])
+            alerts.extend(batch)
+            if len(batch) < page_size:
+                return alerts
+            start += page_size
+
+    async def scan_target(self, target: str, active: bool = False, timeout: float = 600) -> Dict:
+        """
+        Escaneia um alvo em um contexto próprio (spider + passivo, ativo opcional)
+
+        Args:
+            target: URL alvo
+            active: Executa também o active scan (mais lento e intrusivo)
+            timeout: Tempo máximo em segundos para o alvo
+
+        Returns:
+            Dict com target, alerts (brutos do ZAP) e error (se houver)
+        """
+        deadline = time.monotonic() + timeout
+        context = f"devsecops-{secrets.token_hex(4)}"
+        with tracing.span("dast.alvo", target=target, active=active):
+            return await self._scan_in_context(target, context, active, deadline)
+
+    async def _scan_in_context(self, target: str, context: str, active: bool, deadline: float) -> Dict:
+        try:
+            ctx = await self._aapi("context", "action", "newContext", contextName=context)
+            context_id = ctx.get("contextId")
+            parsed = urlparse(target)
+            await self._aapi("context", "action", "includeInContext", contextName=context,
+                             regex=re.escape(f"{parsed.scheme}://{parsed.netloc}") + ".*")
+
+            spider = await self._aapi("spider", "action", "scan", url=target, contextName=context)
+            await self._wait_status("spider", spider.get("scan"), deadline)
+            await self._wait_passive(deadline)
+
+            if active:
+                ascan = await self._aapi("ascan", "action", "scan", url=target,
+                                         contextId=context_id, recurse="true")
+                await self._wait_status("ascan", ascan.get("scan"), deadline)
+
+            return {"target": target, "alerts": await self._alerts(target), "error": None}
+        except Exception as e:
+            return {"target": target, "alerts": [], "error": str(e)}
+        finally:
+            try:
+                await self._aapi("context", "action", "removeContext", contextName=context)
+            except Exception:
+                pass
+
+    async def scan_targets(self, targets: List[str], max_concurrency: int = 4,
+                           active: bool = False, timeout: float = 600) -> List[Dict]:
+        """Escaneia vários alvos em paralelo, limitado por `max_concurrency`"""
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def _one(t):
+            async with sem:
+                return await self.scan_target(t, active=active, timeout=timeout)
+
+        return await asyncio.gather(*(_one(t) for t in targets))
+
+
+def parse_alerts(target: str, alerts: List[Dict], max_urls: int = 10) -> List[Dict]:
+    """
+    Converte alertas do ZAP em achados estruturados (campos de SecurityFinding)
+
+    Alertas do mesmo plugin são agrupados por alvo, listando as URLs afetadas.
+    """
+    grouped: Dict[str, Dict] = {}
+    for alert in alerts:
+        key = str(alert.get("pluginId") or alert.get("alert"))
+        entry = grouped.setdefault(key, {"alert": alert, "urls": []})
+        url = alert.get("url")
+        if url and url not in entry["urls"]:
+            entry["urls"].append(url)
+
+    findings = []
+    for entry in grouped.values():
+        alert, urls = entry["alert"], entry["urls"]
+        affected = "\n".join(f"- {u}" for u in urls[:max_urls])
+        if len(urls) > max_urls:
+            affected += f"\n- ... (+{len(urls) - max_urls})"
+        refs = [r for r in str(alert.get("reference") or "").split("\n") if r.strip()]
+        findings.append({
+            "severity": RISK_TO_SEVERITY.get(alert.get("risk"), "LOW"),
+            "title": f"DAST (ZAP) - {alert.get('alert') or alert.get('name')}",
+            "description": f"{alert.get('description', '').strip()}\n\nURLs afetadas:\n{affected}",
+            "recommendation": str(alert.get("solution") or "Revisar resultados do DAST.").strip(),
+            "tool": "DAST",
+            "location": target,
+            "confidence": str(alert.get("confidence") or "MEDIUM").upper(),
+            "references": refs or None,
+        })
+    return findings
+
+
+def stop_daemon(container_name: str = ZAP_CONTAINER) -> bool:
+    """
+    Encerra o container do ZAP daemon deixado de pé entre execuções
+
+    Returns:
+        True se havia um container para encerrar
+    """
+    res = subprocess.run(["docker", "rm", "-f", container_name], capture_output=True, text=True)
+    return res.returncode == 0
+
+
+def scan_targets(targets: List[str], max_concurrency: int = 4, active: bool = False,
+                 timeout: float = 600, base_url: Optional[str] = None,
+                 api_key: Optional[str] = None, keep_alive: Optional[bool] = None) -> List[Dict]:
+    """
+    Executa DAST em vários alvos usando um único ZAP daemon
+
+    Args:
+        targets: URLs alvo
+        max_concurrency: Número máximo de alvos escaneados simultaneamente
+        active: Executa também o active scan
+        timeout: Tempo máximo por alvo (segundos)
+        base_url: URL da API de um ZAP já ativo (evita subir container)
+        api_key: Chave da API do ZAP
+        keep_alive: Mantém o container iniciado por esta chamada para as execuções
+            seguintes (padrão: DEVSECOPS_ZAP_KEEP_ALIVE, ligado)
+
+    Returns:
+        Lista de achados estruturados; alvos com erro geram um achado LOW
+    """
+    daemon = ZapDaemon(base_url=base_url, api_key=api_key)
+    try:
+        with tracing.span("dast.zap_daemon"):
+            daemon.start()
+        with tracing.span("dast.zap", targets=len(targets)):
+            results = asyncio.run(daemon.scan_targets(targets, max_concurrency=max_concurrency,
+                                                      active=active, timeout=timeout))
+    finally:
+        # Um daemon já ativo (de outro processo ou base_url) nunca é encerrado aqui
+        if not (KEEP_ALIVE if keep_alive is None else keep_alive):
+            daemon.stop()
+    findings = []
+    for res in results:
+        if res["error"]:
+            findings.append({
+                "severity": "LOW",
+                "title": "DAST (ZAP) - Falha ao escanear alvo",
+                "description": res["error"],
+                "recommendation": "Verifique se o alvo está acessível a partir do ZAP.",
+                "tool": "DAST",
+                "location": res["target"],
+            })
+        else:
+            findings.extend(parse_alerts(res["target"], res["alerts"]))
+    return findings
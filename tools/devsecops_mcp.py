@@ -1,34 +1,108 @@
 #!/usr/bin/env python3
+import hashlib
+import os
 import sys
+import time
+from contextlib import nullcontext
 from pathlib import Path
 import json
-from tools import sast_check, sca_check, dast_check, container_check, policy_check, monitoring_check, report_gen
-from langchain_community.vectorstores import Chroma
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools import sast_check, sca_check, dast_check, container_check, policy_check, monitoring_check, report_gen, findings_store, tracing, secret_scan, job_scheduler, rag_shards, rag_context, manifest_stream, watcher
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
 # Basic paths
 BASE = Path(__file__).resolve().parents[1]
 PLAN = BASE / "data" / "plano_de_trabalho" / "Plano_DevSecOps.pdf"
 REPORT_DIR = BASE / "relatorios"
-DB_DIR = Path.home() / "projetos/devsecops/chromadb"
+HISTORY_DB = REPORT_DIR / "historico.db"
+# "auto" usa o índice compacto quando existir; "chroma" ou "compact" forçam um backend
+RAG_BACKEND = rag_shards.RAG_BACKEND
+# Modelo do Ollama que gera as respostas do perguntar
+LLM_MODEL = os.environ.get("DEVSECOPS_LLM_MODEL", "llama3")
+# Orçamento de contexto (tokens estimados) enviado ao LLM no perguntar
+RAG_CONTEXT_TOKENS = int(os.environ.get("DEVSECOPS_RAG_CONTEXT_TOKENS", rag_context.DEFAULT_BUDGET_TOKENS))
+PLAN_CACHE_DIR = BASE / "data" / "cache" / "plano"
 REPORT_DIR.mkdir(exist_ok=True)
 
-def read_plan():
+def _plan_digest(path):
+    """SHA-256 do PDF, memoizado por (mtime, tamanho) para evitar re-hash a cada chamada"""
+    st = path.stat()
+    stamp = [st.st_mtime_ns, st.st_size]
+    index_file = PLAN_CACHE_DIR / "index.json"
+    try:
+        index = json.loads(index_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        index = {}
+    entry = index.get(str(path))
+    if entry and entry.get("stamp") == stamp:
+        return entry["sha256"]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    index[str(path)] = {"stamp": stamp, "sha256": h.hexdigest()}
+    PLAN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    index_file.write_text(json.dumps(index), encoding="utf-8")
+    return h.hexdigest()
+
+def _join_pages(pages):
+    return "".join(t + "\n" for t in pages if t)
+
+def read_plan(max_chars=None):
+    """
+    Extrai o texto do plano de trabalho (PDF)
+
+    A extração para assim que `max_chars` caracteres são obtidos, e as páginas já
+    extraídas ficam em cache em disco, chaveadas pelo hash do PDF — chamadas
+    seguintes só abrem o PDF se precisarem de páginas ainda não extraídas.
+
+    Args:
+        max_chars: Quantidade de caracteres necessária (None = documento inteiro)
+
+    Returns:
+        Texto extraído (pode passar de max_chars, pois páginas são inteiras)
+    """
     if not PLAN.exists():
         return "[PDF do plano não encontrado. Coloque em data/plano_de_trabalho/]"
     try:
+        digest = _plan_digest(PLAN)
+        cache_file = PLAN_CACHE_DIR / f"{digest}.json"
+        try:
+            cached = json.loads(cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cached = {"pages": [], "total_pages": None}
+        pages = cached["pages"]
+        text = _join_pages(pages)
+        complete = cached["total_pages"] is not None and len(pages) >= cached["total_pages"]
+        if complete or (max_chars is not None and len(text) >= max_chars):
+            monitoring_check.record_cache("plan", True)
+            return text
+        monitoring_check.record_cache("plan", False)
+
         try:
             from PyPDF2 import PdfReader
         except Exception:
             return "[PyPDF2 não instalado — coloque o PDF em data/plano_de_trabalho/ ou instale PyPDF2 para extração automática]"
 
-        reader = PdfReader(str(PLAN))
-        text = ""
-        for p in reader.pages:
-            t = p.extract_text()
-            if t:
-                text += t + "\n"
+        with tracing.span("plano.ler_pdf", path=str(PLAN), max_chars=max_chars) as sp:
+            reader = PdfReader(str(PLAN))
+            total = len(reader.pages)
+            for i in range(len(pages), total):
+                t = reader.pages[i].extract_text() or ""
+                pages.append(t)
+                if t:
+                    text += t + "\n"
+                if max_chars is not None and len(text) >= max_chars:
+                    break
+            sp.set(pages=len(pages), total_pages=total, chars=len(text))
+
+        PLAN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"pages": pages, "total_pages": total}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, cache_file)
         return text
     except Exception as e:
         return f"[Erro lendo PDF: {e}]"
@@ -40,43 +114,56 @@ def gerar_relatorio():
     summaries = {}
 
     # Plano de trabalho resumo
-    summaries['executive_summary'] = read_plan()[:2000]
+    summaries['executive_summary'] = read_plan(max_chars=2000)[:2000]
 
-    # SAST quick
+    # SAST quick — um achado por issue do Bandit, para o delta entre execuções
     try:
-        sast_out = sast_check.run_bandit('.')
-        findings.append({
-            'severity': 'MEDIUM',
-            'title': 'SAST (Bandit) - Quick Scan',
-            'description': sast_out[:4000],
-            'recommendation': 'Reveja os achados do SAST e priorize correções críticas.',
-            'tool': 'SAST',
-            'location': str(Path('.').resolve())
-        })
-        metrics['sast_len'] = len(sast_out)
+        with monitoring_check.SCANNER_DURATION.time(tool='bandit'):
+            sast_out = sast_check.run_bandit('.')
+        if sast_out.startswith('[Erro'):
+            raise RuntimeError(sast_out)
+        sast_findings = sast_check.to_findings(json.loads(sast_out))
+        findings.extend(sast_findings)
+        metrics['sast_achados'] = len(sast_findings)
     except Exception as e:
         findings.append({
             'severity': 'LOW',
             'title': 'SAST (Bandit) - Falha ao rodar',
-            'description': str(e),
+            'description': str(e)[:4000],
             'recommendation': 'Verificar instalação do Bandit.',
             'tool': 'SAST',
             'location': ''
         })
 
-    # Container quick (Trivy)
+    # SCA offline (somente se o índice OSV local existir)
+    if sca_check.OSV_INDEX.exists():
+        try:
+            with monitoring_check.SCANNER_DURATION.time(tool='sca'):
+                sca_findings = sca_check.scan_dependencies('.')
+            findings.extend(sca_findings)
+            metrics['sca_vulnerabilidades'] = len(sca_findings)
+        except Exception as e:
+            findings.append({
+                'severity': 'LOW',
+                'title': 'SCA - Falha ao rodar',
+                'description': str(e),
+                'recommendation': 'Verificar o índice OSV local (python tools/sca_check.py --build-index).',
+                'tool': 'SCA',
+                'location': ''
+            })
+
+    # Container quick (Trivy) — um achado por vulnerabilidade/pacote
     try:
         checker = container_check.ContainerSecurityChecker()
-        trivy_out = checker.trivy_scan_image('alpine:latest')
-        findings.append({
-            'severity': 'HIGH' if 'CRITICAL' in trivy_out or 'HIGH' in trivy_out else 'MEDIUM',
-            'title': 'Container (Trivy) - Quick Scan',
-            'description': trivy_out[:4000],
-            'recommendation': 'Analise as vulnerabilidades e atualize imagens base.',
-            'tool': 'Trivy',
-            'location': 'alpine:latest'
-        })
-        metrics['trivy_len'] = len(trivy_out)
+        with monitoring_check.SCANNER_DURATION.time(tool='trivy'):
+            trivy_out = checker.trivy_scan_image('alpine:latest')
+        try:
+            trivy_findings = container_check.trivy_findings(trivy_out, 'alpine:latest')
+        except ValueError:
+            # Saída não é o JSON do Trivy (Trivy ausente, erro ou limite de recursos)
+            raise RuntimeError(trivy_out.strip()[:4000]) from None
+        findings.extend(trivy_findings)
+        metrics['trivy_vulnerabilidades'] = len(trivy_findings)
     except Exception as e:
         findings.append({
             'severity': 'LOW',
@@ -87,25 +174,33 @@ def gerar_relatorio():
             'location': ''
         })
 
-    # DAST quick (se disponível)
+    # DAST quick (se disponível) — ZAP em modo daemon, mantido de pé para as próximas execuções
     try:
-        dast_sample = dast_check.run_zap_scan('http://localhost:8080')
-        findings.append({
-            'severity': 'MEDIUM',
-            'title': 'DAST (ZAP) - Quick',
-            'description': str(dast_sample)[:4000],
-            'recommendation': 'Revisar resultados do DAST.',
-            'tool': 'DAST',
-            'location': 'http://localhost:8080'
-        })
-        metrics['dast_len'] = len(str(dast_sample))
+        with monitoring_check.SCANNER_DURATION.time(tool='zap'):
+            dast_findings = dast_check.scan_targets(['http://localhost:8080'])
+        findings.extend(dast_findings)
+        metrics['dast_alertas'] = len(dast_findings)
     except Exception:
         # não interrompe se não houver alvo
         pass
 
+    project = 'Relatório Unificado - DevSecOps Assistant'
+
+    # Histórico: registra a execução e calcula o delta contra a anterior
+    try:
+        with findings_store.FindingsStore(HISTORY_DB) as store:
+            run_id = store.record_run(project, findings)
+            delta = store.diff(run_id)
+        summaries['delta'] = findings_store.format_delta(delta)
+        metrics['achados_novos'] = len(delta['new'])
+        metrics['achados_corrigidos'] = len(delta['fixed'])
+        metrics['achados_persistentes'] = len(delta['persisting'])
+    except Exception as e:
+        print(f'Aviso: histórico de achados indisponível: {e}')
+
     # Gerar relatório estruturado usando report_gen
     try:
-        report = report_gen.create_report('Relatório Unificado - DevSecOps Assistant', findings, metrics, summaries, REPORT_DIR, locale='pt')
+        report = report_gen.create_report(project, findings, metrics, summaries, REPORT_DIR, locale='pt')
         print(f'Relatório gerado: {REPORT_DIR}')
     except Exception as e:
         print(f'Erro ao gerar relatório: {e}')
@@ -115,7 +210,9 @@ def analisar_arquivo(p):
     if not p.exists():
         print(f"Arquivo não encontrado: {p}")
         return
-    if p.suffix in [".yml", ".yaml", ".json"]:
+    if p.name in ("prometheus.yml", "prometheus.yaml"):
+        print(monitoring_check.check_prometheus_config(p))
+    elif p.suffix in [".yml", ".yaml", ".json"]:
         print(policy_check.analyze_config(p))
     elif p.name == "Dockerfile":
         checker = container_check.ContainerSecurityChecker()
@@ -130,60 +227,288 @@ def analisar_arquivo(p):
     else:
         print("Tipo de arquivo não suportado para análise rápida.")
 
-def contextual_answer(query):
-    embeddings = OllamaEmbeddings(model="llama3")
-    db = Chroma(persist_directory=str(DB_DIR), embedding_function=embeddings)
-    retriever = db.as_retriever(search_kwargs={"k": 3})
+def historico(limit=10):
+    """Mostra a tendência das últimas execuções e o delta da mais recente"""
+    if not HISTORY_DB.exists():
+        print("Nenhum histórico encontrado. Execute gerar-relatorio primeiro.")
+        return
+    with findings_store.FindingsStore(HISTORY_DB) as store:
+        runs = store.runs(limit=1)
+        if not runs:
+            print("Nenhuma execução registrada.")
+            return
+        last = runs[0]
+        for entry in store.trend(last['project'], limit=limit):
+            print(f"#{entry['run_id']} {entry['started_at']} total={entry['total']} "
+                  f"CRITICAL={entry['CRITICAL']} HIGH={entry['HIGH']} MEDIUM={entry['MEDIUM']} LOW={entry['LOW']}")
+        print()
+        print(findings_store.format_delta(store.diff(last['id'])))
+
+ANSWER_PROMPT = PromptTemplate.from_template(
+    "Você é um assistente de DevSecOps. Responda à pergunta usando apenas o contexto abaixo; "
+    "se o contexto não for suficiente, diga isso.\n\n"
+    "Contexto:\n{context}\n\n"
+    "Pergunta: {question}\n"
+    "Resposta:"
+)
 
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=None,  # o Continue/Ollama já fornece o LLM ativo
-        chain_type="stuff",
-        retriever=retriever,
-        return_source_documents=True
-    )
-    result = qa_chain({"query": query})
-    return result["result"]
+def default_llm():
+    """LLM local (Ollama) usado pelo perguntar — o mesmo modelo configurado no Continue"""
+    from langchain_community.llms import Ollama
+    return Ollama(model=LLM_MODEL)
+
+def open_retriever(query, categories=None):
+    with tracing.span("rag.abrir_indice", backend=RAG_BACKEND) as sp:
+        embeddings = OllamaEmbeddings(model="llama3")
+        # Só os shards das categorias relevantes (ou do filtro explícito) são abertos
+        retriever, selected = rag_shards.open_retriever(query, embeddings, categories, backend=RAG_BACKEND, k=3)
+        sp.set(categorias=",".join(selected))
+    # Funde trechos sobrepostos, descarta repetições e limita o contexto enviado ao LLM
+    return rag_context.CompressingRetriever(base=retriever, budget_tokens=RAG_CONTEXT_TOKENS)
+
+def stream_answer(query, categories=None, llm=None, retriever=None):
+    """
+    Responde à pergunta em streaming
+
+    As fontes são emitidas assim que a recuperação termina, antes de qualquer
+    token do LLM, e a resposta segue token a token.
+
+    Args:
+        query: Pergunta
+        categories: Filtro explícito de categorias da base
+        llm: Qualquer objeto com `.stream(prompt)` (padrão: Ollama local)
+        retriever: Retriever LangChain (padrão: shards roteados + compressão)
+
+    Yields:
+        {"event": "sources", "sources": [...]}, depois {"event": "token", "text": ...}
+        e por fim {"event": "done", "chars": ..., "first_token_s": ..., "total_s": ...}
+    """
+    started = time.perf_counter()
+    retriever = retriever or open_retriever(query, categories)
+    with tracing.span("rag.recuperar", query_chars=len(query)) as sp:
+        docs = retriever.invoke(query)
+        sp.set(docs=len(docs))
+    yield {
+        "event": "sources",
+        "sources": [
+            {key: d.metadata[key] for key in ("source", "category", "score") if key in d.metadata}
+            for d in docs
+        ],
+    }
+
+    prompt = ANSWER_PROMPT.format(context="\n\n".join(d.page_content for d in docs), question=query)
+    llm = llm or default_llm()
+    first_token = None
+    chars = 0
+    with tracing.span("rag.gerar", prompt_chars=len(prompt)) as sp:
+        for chunk in llm.stream(prompt):
+            # LLMs devolvem str; chat models devolvem mensagens com .content
+            text = chunk if isinstance(chunk, str) else getattr(chunk, "content", str(chunk))
+            if not text:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            chars += len(text)
+            yield {"event": "token", "text": text}
+        sp.set(chars=chars)
+    yield {"event": "done", "chars": chars, "first_token_s": first_token,
+           "total_s": time.perf_counter() - started}
+
+def contextual_answer(query, categories=None, llm=None):
+    """Resposta completa (sem streaming) para a pergunta"""
+    return "".join(e["text"] for e in stream_answer(query, categories, llm) if e["event"] == "token")
+
+def print_answer_stream(events, ndjson=False, out=None):
+    """
+    Escreve os eventos de `stream_answer` à medida que chegam
+
+    Com ndjson=True, cada evento vira uma linha JSON (modo para o servidor MCP/editor);
+    caso contrário, as fontes são listadas e os tokens impressos sem quebra de linha.
+    """
+    out = out or sys.stdout
+    for event in events:
+        if ndjson:
+            out.write(json.dumps(event, ensure_ascii=False) + "\n")
+        elif event["event"] == "sources":
+            names = [f"{s.get('source', '?')} ({s['category']})" if s.get("category") else s.get("source", "?")
+                     for s in event["sources"]]
+            out.write(f"📚 Fontes: {', '.join(names) if names else 'nenhuma'}\n\n")
+        elif event["event"] == "token":
+            out.write(event["text"])
+        else:
+            out.write("\n")
+        out.flush()
+
+SCAN_TOOLS = ("sast", "sca", "secrets", "container", "dast")
+
+def run_scan(tool, targets):
+    """Executa um scanner e devolve a saída em texto (chamado pelo agendador de jobs)"""
+    with monitoring_check.SCANNER_DURATION.time(tool=tool):
+        if tool == "sast":
+            return sast_check.run_bandit(targets[0])
+        if tool == "sca":
+            return sca_check.run_dependency_check(targets[0])
+        if tool == "secrets":
+            return secret_scan.run_secret_scan(targets[0])
+        if tool == "container":
+            return container_check.ContainerSecurityChecker().trivy_scan_image(targets[0])
+        # Vários alvos são escaneados em paralelo pelo mesmo ZAP daemon
+        return json.dumps(dast_check.scan_targets(targets), indent=2, ensure_ascii=False)
+
+ACTIONS = ("ler-plano", "gerar-relatorio", "historico", "analisar", "watch", "scan", "jobs",
+           "zap-parar", "perguntar")
+TRACE_FORMATS = ("json", "chrome")
+
+def parse_global_flags(argv):
+    """
+    Extrai as opções globais (--trace, --trace-format, --profile) antes da ação
+
+    Só os argumentos anteriores ao nome da ação são opções globais; o que vem
+    depois (inclusive o texto do perguntar) é repassado intacto à ação.
+
+    Returns:
+        Tupla (argumentos restantes, dict de opções)
+
+    Raises:
+        ValueError: para opção global desconhecida ou formato de trace inválido
+    """
+    opts = {"trace": None, "trace_format": "json", "profile": False}
+    i = 0
+    while i < len(argv) and argv[i].startswith("--"):
+        arg = argv[i]
+        nxt = argv[i + 1] if i + 1 < len(argv) else None
+        if arg == "--trace":
+            # O arquivo é opcional: não consome outra opção nem o nome da ação
+            if nxt is not None and not nxt.startswith("-") and nxt not in ACTIONS:
+                opts["trace"] = nxt
+                i += 1
+            else:
+                opts["trace"] = str(REPORT_DIR / "trace.json")
+        elif arg.startswith("--trace="):
+            opts["trace"] = arg.split("=", 1)[1]
+        elif arg == "--trace-format":
+            if nxt is None:
+                raise ValueError("--trace-format exige um valor")
+            opts["trace_format"] = nxt
+            i += 1
+        elif arg.startswith("--trace-format="):
+            opts["trace_format"] = arg.split("=", 1)[1]
+        elif arg == "--profile":
+            opts["profile"] = True
+        else:
+            raise ValueError(f"opção desconhecida: {arg}")
+        i += 1
+    if opts["trace_format"] not in TRACE_FORMATS:
+        raise ValueError(f"formato de trace inválido: {opts['trace_format']} (use {' ou '.join(TRACE_FORMATS)})")
+    return argv[i:], opts
 
 def main():
+    try:
+        args, opts = parse_global_flags(sys.argv[1:])
+    except ValueError as e:
+        print(f"Erro: {e}")
+        args, opts = [], None
+    sys.argv = sys.argv[:1] + args
     if len(sys.argv) < 2:
-        print("Uso: python devsecops_mcp.py <acao> [args]")
-        print("Ações: ler-plano, gerar-relatorio, analisar <arquivo>, scan <tool> <target>, perguntar <query>")
+        print("Uso: python devsecops_mcp.py [--trace <arquivo>] [--trace-format json|chrome] [--profile] <acao> [args]")
+        print("Ações: ler-plano, gerar-relatorio, historico, analisar <arquivo|->, watch [dir] [--json], scan <tool> <target> [--priority N], jobs [id|status], zap-parar, perguntar [--categoria <nome>] [--stream-json] <query>")
+        if opts is None:
+            sys.exit(2)
         return
+    monitoring_check.start_from_env()
     cmd = sys.argv[1]
+    if opts["trace"]:
+        tracing.enable()
+    profiler = tracing.profiled(REPORT_DIR / f"profile-{cmd}.prof") if opts["profile"] else nullcontext()
+    try:
+        with profiler, tracing.span(f"acao.{cmd}", args=" ".join(sys.argv[2:])):
+            run_action(cmd)
+    finally:
+        if opts["trace"]:
+            if opts["trace_format"] == "chrome":
+                tracing.export_chrome(opts["trace"])
+            else:
+                tracing.export_json(opts["trace"])
+            print(tracing.format_tree(), file=sys.stderr)
+            print(f"Trace gravado em: {opts['trace']}", file=sys.stderr)
+
+def run_action(cmd):
     if cmd == "ler-plano":
-        print(read_plan()[:8000])
+        print(read_plan(max_chars=8000)[:8000])
     elif cmd == "gerar-relatorio":
         gerar_relatorio()
+    elif cmd == "historico":
+        historico()
     elif cmd == "analisar":
         if len(sys.argv) < 3:
-            print("Forneça o arquivo a analisar.")
+            print("Forneça o arquivo a analisar (ou - para ler manifestos do stdin).")
+        elif sys.argv[2] == "-":
+            # Stream de manifestos (helm template, kubectl get -o yaml): uma linha NDJSON por documento
+            try:
+                manifest_stream.analyze_stream(manifest_stream.stdin(), sys.stdout)
+            except BrokenPipeError:
+                sys.stderr.close()
         else:
             analisar_arquivo(sys.argv[2])
+    elif cmd == "watch":
+        # Reanálise incremental a cada arquivo salvo (Ctrl+C para sair)
+        watcher.main(sys.argv[2:])
     elif cmd == "scan":
-        if len(sys.argv) < 4:
-            print("Uso: scan <sast|container|dast> <target>")
+        args = sys.argv[2:]
+        priority = 0
+        if "--priority" in args:
+            i = args.index("--priority")
+            try:
+                priority = int(args[i + 1])
+            except (IndexError, ValueError):
+                priority = None
+            del args[i:i + 2]
+        if len(args) < 2 or priority is None:
+            print("Uso: scan <sast|sca|secrets|container|dast> <target> [target ...] [--priority N]")
+        elif args[0] not in SCAN_TOOLS:
+            print("Tool desconhecida.")
         else:
-            tool = sys.argv[2]
-            target = sys.argv[3]
-            if tool == "sast":
-                print(sast_check.run_bandit(target if len(sys.argv) > 3 else "."))
-            elif tool == "container":
-                checker = container_check.ContainerSecurityChecker()
-                print(checker.trivy_scan_image(target))
-            elif tool == "dast":
-                print(dast_check.run_zap_scan(target))
-            else:
-                print("Tool desconhecida.")
+            tool, targets = args[0], args[1:]
+            # Pedidos idênticos de outras sessões/CI são fundidos em uma única execução
+            scheduler = job_scheduler.JobScheduler()
+            try:
+                print(scheduler.run(tool, targets, lambda: run_scan(tool, targets), priority=priority))
+            except ValueError as e:
+                print(f"Alvos inválidos: {e}")
+            except job_scheduler.JobError as e:
+                print(f"Falha no job de scan: {e}")
+    elif cmd == "zap-parar":
+        # Encerra o ZAP daemon mantido entre execuções (DEVSECOPS_ZAP_KEEP_ALIVE)
+        print("ZAP daemon encerrado." if dast_check.stop_daemon() else "Nenhum ZAP daemon ativo.")
+    elif cmd == "jobs":
+        scheduler = job_scheduler.JobScheduler()
+        if len(sys.argv) > 2 and sys.argv[2].isdigit():
+            job = scheduler.status(int(sys.argv[2]))
+            print(json.dumps(job, indent=2, ensure_ascii=False) if job else "Job não encontrado.")
+        else:
+            print(job_scheduler.format_jobs(scheduler.jobs(status=sys.argv[2] if len(sys.argv) > 2 else None)))
     elif cmd == "perguntar":
         if len(sys.argv) < 3:
             print("Forneça uma pergunta para o assistente.")
         else:
-            query = " ".join(sys.argv[2:])
+            args = sys.argv[2:]
+            categories = []
+            while "--categoria" in args:
+                i = args.index("--categoria")
+                if i + 1 < len(args):
+                    categories.extend(c for c in args[i + 1].split(",") if c.strip())
+                del args[i:i + 2]
+            ndjson = "--stream-json" in args
+            if ndjson:
+                args.remove("--stream-json")
+            query = " ".join(args)
             try:
-                resposta = contextual_answer(query)
-                print(resposta)
+                print_answer_stream(stream_answer(query, categories or None), ndjson=ndjson)
             except Exception as e:
-                print(f"Erro ao processar a pergunta: {e}")
+                if ndjson:
+                    print(json.dumps({"event": "error", "message": str(e)}, ensure_ascii=False))
+                else:
+                    print(f"Erro ao processar a pergunta: {e}")
     else:
         print("Comando não reconhecido.")
 
@@ -0,0 +1,138 @@
+# Cache compartilhado de documentos YAML/JSON já parseados
+"""
+Camada única de carregamento de manifestos para os analisadores.
+
+- Usa o loader em C da libyaml (`yaml.CSafeLoader`) quando disponível, com
+  fallback para o `SafeLoader` puro Python.
+- Suporta streams com vários documentos (`---`).
+- Memoiza as árvores parseadas por (caminho, mtime, tamanho) em um LRU
+  limitado pelo total de bytes dos arquivos de origem, de modo que todos os
+  analisadores de uma execução reaproveitam um único parse por arquivo.
+
+Os objetos devolvidos são compartilhados entre chamadas: trate-os como
+somente leitura.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Union
+
+import yaml
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+LIBYAML = SafeLoader is not yaml.SafeLoader
+
+# Limite padrão do cache (bytes dos arquivos de origem)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+JSON_SUFFIXES = {".json"}
+
+# Chamado a cada consulta ao cache com True (acerto) ou False (erro). O
+# monitoring_check instala aqui o contador de métricas ao ser importado, de
+# modo que este módulo não depende dele.
+_lookup_hook: Optional[Callable[[bool], None]] = None
+
+
+def set_lookup_hook(hook: Optional[Callable[[bool], None]]) -> None:
+    """Define a função notificada a cada acerto/erro do cache (None desliga)"""
+    global _lookup_hook
+    _lookup_hook = hook
+
+
+def _notify(hit: bool) -> None:
+    if _lookup_hook is not None:
+        _lookup_hook(hit)
+
+
+def load_yaml_all(text: Union[str, bytes]) -> List[Any]:
+    """Parseia todos os documentos de um stream YAML (documentos vazios são descartados)"""
+    return [doc for doc in yaml.load_all(text, Loader=SafeLoader) if doc is not None]
+
+
+def load_yaml(text: Union[str, bytes]) -> Any:
+    """Parseia um único documento YAML com o loader mais rápido disponível"""
+    return yaml.load(text, Loader=SafeLoader)
+
+
+class DocumentCache:
+    """LRU de documentos parseados, chaveado por (caminho, mtime, tamanho)"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        # caminho -> ((mtime_ns, tamanho), bytes de origem, documentos)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _parse(self, path: Path, data: bytes) -> List[Any]:
+        if path.suffix.lower() in JSON_SUFFIXES:
+            return [json.loads(data)]
+        return load_yaml_all(data)
+
+    def load_all(self, path: Union[str, Path]) -> List[Any]:
+        """
+        Carrega (ou reaproveita do cache) todos os documentos de um arquivo
+
+        Args:
+            path: Arquivo YAML (um ou vários documentos) ou JSON
+
+        Returns:
+            Lista de documentos parseados (compartilhada; não modifique)
+
+        Raises:
+            OSError, yaml.YAMLError, json.JSONDecodeError
+        """
+        path = Path(path)
+        key = str(path.resolve())
+        st = os.stat(key)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                _notify(True)
+                return entry[2]
+        _notify(False)
+
+        with open(key, "rb") as f:
+            data = f.read()
+        docs = self._parse(path, data)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if len(data) <= self.max_bytes:
+                self._entries[key] = (stamp, len(data), docs)
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes and self._entries:
+                    _, (_, size, _) = self._entries.popitem(last=False)
+                    self._bytes -= size
+        return docs
+
+    def load(self, path: Union[str, Path]) -> Any:
+        """Carrega o primeiro documento do arquivo (ou None se vazio)"""
+        docs = self.load_all(path)
+        return docs[0] if docs else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Cache compartilhado por todos os analisadores do processo
+CACHE = DocumentCache()
+
+
+def load_all(path: Union[str, Path]) -> List[Any]:
+    """Atalho para `CACHE.load_all`"""
+    return CACHE.load_all(path)
+
+
+def load(path: Union[str, Path]) -> Any:
+    """Atalho para `CACHE.load`"""
+    return CACHE.load(path)
@@ -0,0 +1,228 @@
+# Histórico de achados (SQLite) com diff entre execuções
+"""
+Armazena os achados (SecurityFinding) de cada execução do `gerar-relatorio` em
+uma base SQLite local, permitindo consultar o que é novo, o que foi corrigido e
+o que persiste entre execuções, além de métricas de tendência.
+"""
+
+import hashlib
+import json
+import sqlite3
+import datetime
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finding_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS findings (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    fingerprint TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    location TEXT NOT NULL,
+    title TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (run_id, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS idx_findings_fingerprint ON findings(fingerprint, run_id);
+CREATE INDEX IF NOT EXISTS idx_findings_tool ON findings(tool, run_id);
+CREATE INDEX IF NOT EXISTS idx_findings_severity ON findings(severity, run_id);
+CREATE INDEX IF NOT EXISTS idx_findings_location ON findings(location, run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_project ON runs(project, id);
+"""
+
+
+def _as_dict(finding: Union[Dict, object]) -> Dict:
+    if is_dataclass(finding):
+        return asdict(finding)
+    return dict(finding)
+
+
+def fingerprint(finding: Union[Dict, object]) -> str:
+    """
+    Calcula uma impressão digital estável para um achado.
+
+    A descrição fica de fora porque costuma carregar saída bruta do scanner
+    (timestamps, contagens) que muda entre execuções do mesmo problema.
+
+    Args:
+        finding: SecurityFinding ou dict com os mesmos campos
+
+    Returns:
+        str: Hash SHA-256 (hex) de ferramenta, título e localização normalizados
+    """
+    data = _as_dict(finding)
+    key = "\x1f".join(
+        " ".join(str(data.get(field) or "").split()).lower()
+        for field in ("tool", "title", "location")
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class FindingsStore:
+    """Base local de achados indexada por ferramenta, severidade, localização e execução"""
+
+    def __init__(self, db_path: Union[str, Path]):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record_run(self, project: str, findings: List[Union[Dict, object]]) -> int:
+        """
+        Registra uma execução e seus achados
+
+        Args:
+            project: Nome do projeto/relatório
+            findings: Lista de SecurityFinding ou dicts
+
+        Returns:
+            int: Identificador da execução criada
+        """
+        rows = {}
+        for f in findings:
+            data = _as_dict(f)
+            # Achados repetidos na mesma execução contam uma vez só
+            rows[fingerprint(data)] = data
+
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (project, started_at, finding_count) VALUES (?, ?, ?)",
+                (project, datetime.datetime.now().isoformat(), len(rows)),
+            )
+            run_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO findings (run_id, fingerprint, tool, severity, location, title, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id, fp,
+                        str(d.get("tool") or ""),
+                        str(d.get("severity") or "").upper(),
+                        str(d.get("location") or ""),
+                        str(d.get("title") or ""),
+                        json.dumps(d, ensure_ascii=False),
+                    )
+                    for fp, d in rows.items()
+                ],
+            )
+        return run_id
+
+    def runs(self, project: Optional[str] = None, limit: int = 20) -> List[Dict]:
+        """Lista as execuções mais recentes (opcionalmente de um projeto)"""
+        if project is None:
+            cur = self.conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            cur = self.conn.execute(
+                "SELECT * FROM runs WHERE project = ? ORDER BY id DESC LIMIT ?", (project, limit)
+            )
+        return [dict(r) for r in cur.fetchall()]
+
+    def previous_run(self, run_id: int) -> Optional[int]:
+        """Retorna a execução anterior do mesmo projeto, se houver"""
+        row = self.conn.execute(
+            "SELECT prev.id FROM runs cur JOIN runs prev "
+            "ON prev.project = cur.project AND prev.id < cur.id "
+            "WHERE cur.id = ? ORDER BY prev.id DESC LIMIT 1",
+            (run_id,),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _select(self, sql: str, params: tuple) -> List[Dict]:
+        return [json.loads(r["data"]) for r in self.conn.execute(sql, params).fetchall()]
+
+    def new_findings(self, run_id: int, base_run_id: Optional[int]) -> List[Dict]:
+        """Achados presentes em `run_id` e ausentes em `base_run_id`"""
+        return self._select(
+            "SELECT f.data FROM findings f WHERE f.run_id = ? AND NOT EXISTS ("
+            "SELECT 1 FROM findings b WHERE b.run_id = ? AND b.fingerprint = f.fingerprint) "
+            "ORDER BY f.severity, f.tool, f.location",
+            (run_id, -1 if base_run_id is None else base_run_id),
+        )
+
+    def fixed_findings(self, run_id: int, base_run_id: Optional[int]) -> List[Dict]:
+        """Achados presentes em `base_run_id` que não aparecem mais em `run_id`"""
+        if base_run_id is None:
+            return []
+        return self.new_findings(base_run_id, run_id)
+
+    def persisting_findings(self, run_id: int, base_run_id: Optional[int]) -> List[Dict]:
+        """Achados presentes nas duas execuções"""
+        if base_run_id is None:
+            return []
+        return self._select(
+            "SELECT f.data FROM findings f JOIN findings b "
+            "ON b.fingerprint = f.fingerprint AND b.run_id = ? "
+            "WHERE f.run_id = ? ORDER BY f.severity, f.tool, f.location",
+            (base_run_id, run_id),
+        )
+
+    def diff(self, run_id: int, base_run_id: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """
+        Compara uma execução com outra (por padrão, a anterior do mesmo projeto)
+
+        Returns:
+            Dict com listas 'new', 'fixed' e 'persisting'
+        """
+        if base_run_id is None:
+            base_run_id = self.previous_run(run_id)
+        return {
+            "new": self.new_findings(run_id, base_run_id),
+            "fixed": self.fixed_findings(run_id, base_run_id),
+            "persisting": self.persisting_findings(run_id, base_run_id),
+        }
+
+    def trend(self, project: str, limit: int = 30) -> List[Dict]:
+        """
+        Métricas de tendência por execução: total e contagem por severidade
+
+        Returns:
+            Lista (da mais antiga para a mais recente) de dicts com run_id,
+            started_at, total e contagens por severidade
+        """
+        rows = self.conn.execute(
+            "SELECT r.id, r.started_at, r.finding_count, f.severity, COUNT(f.fingerprint) AS n "
+            "FROM (SELECT * FROM runs WHERE project = ? ORDER BY id DESC LIMIT ?) r "
+            "LEFT JOIN findings f ON f.run_id = r.id "
+            "GROUP BY r.id, f.severity ORDER BY r.id",
+            (project, limit),
+        ).fetchall()
+        trend: Dict[int, Dict] = {}
+        for r in rows:
+            entry = trend.setdefault(r["id"], {
+                "run_id": r["id"],
+                "started_at": r["started_at"],
+                "total": r["finding_count"],
+                "CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0,
+            })
+            if r["severity"]:
+                entry[r["severity"]] = r["n"]
+        return list(trend.values())
+
+
+def format_delta(delta: Dict[str, List[Dict]]) -> str:
+    """Formata o diff entre execuções em Markdown simples"""
+    labels = {"new": "🆕 Novos", "fixed": "✅ Corrigidos", "persisting": "♻️ Persistentes"}
+    lines = [f"- **{labels[k]}**: {len(delta.get(k, []))}" for k in ("new", "fixed", "persisting")]
+    for key in ("new", "fixed"):
+        for f in delta.get(key, []):
+            lines.append(f"  - {labels[key]}: [{f.get('severity')}] {f.get('title')} ({f.get('tool')} @ {f.get('location')})")
+    return "\n".join(lines)
@@ -0,0 +1,344 @@
+# Agendador local de scans com fila de prioridade e single-flight
+"""
+Coordena as ações `scan` entre todos os processos da máquina (sessões do
+editor, jobs de CI) através de uma base SQLite compartilhada:
+
+- pedidos idênticos em andamento (mesma ferramenta e mesmo alvo normalizado)
+  são fundidos em um único job — uma execução atende todos os que aguardam;
+- cada ferramenta tem um limite de execuções simultâneas, então rajadas de
+  pedidos não multiplicam processos do Trivy/Bandit/ZAP;
+- entre os jobs na fila, roda primeiro o de maior prioridade (e, no empate,
+  o mais antigo);
+- o estado de cada job (queued/running/done/failed) pode ser consultado.
+
+Não há daemon: cada processo que aguarda um job tenta assumi-lo quando há
+vaga, e quem o assume executa o scanner e grava o resultado para os demais.
+"""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from tools import monitoring_check
+
+BASE = Path(__file__).resolve().parents[1]
+JOBS_DB = BASE / "relatorios" / "jobs.db"
+
+# Execuções simultâneas por ferramenta (sobrescreva com DEVSECOPS_SCAN_LIMITS="container=2,sast=4")
+DEFAULT_LIMITS = {"sast": 2, "sca": 2, "secrets": 2, "container": 1, "dast": 1}
+# Ferramentas que aceitam vários alvos em um único job
+MULTI_TARGET_TOOLS = {"dast"}
+
+# Job na fila sem nenhum processo aguardando por este tempo é abandonado
+STALE_SECONDS = 30.0
+# Jobs finalizados são mantidos por este tempo para consulta
+RETENTION_SECONDS = 7 * 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    target TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    waiters INTEGER NOT NULL DEFAULT 1,
+    owner_pid INTEGER,
+    submitted_at REAL NOT NULL,
+    heartbeat REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_inflight ON jobs(key) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs(tool, status, priority DESC, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at);
+"""
+
+
+class JobError(RuntimeError):
+    """Falha do job compartilhado, repassada a todos os processos que o aguardavam"""
+
+
+def job_key(tool: str, target: Union[str, List[str]]) -> Tuple[str, str]:
+    """
+    Normaliza o alvo e monta a chave de de-duplicação
+
+    Caminhos existentes viram absolutos (`scan sast .` e `scan sast /repo`
+    são o mesmo job); listas de alvos (DAST) são ordenadas.
+
+    Returns:
+        Tupla (chave, alvo normalizado)
+    """
+    targets = [target] if isinstance(target, str) else list(target)
+    normalized = []
+    for t in targets:
+        t = t.strip()
+        if t and os.path.exists(t):
+            t = str(Path(t).resolve())
+        normalized.append(t)
+    norm = " ".join(sorted(normalized))
+    return f"{tool}\x1f{norm}", norm
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, int]:
+    """Interpreta "tool=n,tool=n" sobre os limites padrão"""
+    limits = dict(DEFAULT_LIMITS)
+    for item in (spec or "").split(","):
+        if "=" in item:
+            tool, value = item.split("=", 1)
+            try:
+                limits[tool.strip()] = max(1, int(value))
+            except ValueError:
+                pass
+    return limits
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ClosingConnection:
+    """Conexão SQLite que fecha ao sair do bloco `with`"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+
+class JobScheduler:
+    """Fila de scans compartilhada entre processos, com limites por ferramenta"""
+
+    def __init__(self, db_path: Union[str, Path] = JOBS_DB, limits: Optional[Dict[str, int]] = None,
+                 poll_interval: float = 0.2, max_poll_interval: float = 1.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.limits = limits if limits is not None else parse_limits(os.environ.get("DEVSECOPS_SCAN_LIMITS"))
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> ClosingConnection:
+        # isolation_level=None: as transações são abertas explicitamente com BEGIN IMMEDIATE
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        return ClosingConnection(conn)
+
+    def limit(self, tool: str) -> int:
+        return self.limits.get(tool, 1)
+
+    # -- fila -----------------------------------------------------------------
+
+    def submit(self, tool: str, target: Union[str, List[str]], priority: int = 0) -> Tuple[int, bool]:
+        """
+        Enfileira um scan ou se junta ao job idêntico já em andamento
+
+        Returns:
+            Tupla (id do job, True se o pedido foi fundido a um job existente)
+
+        Raises:
+            ValueError: vários alvos para uma ferramenta que só aceita um
+        """
+        if not isinstance(target, str) and len(target) > 1 and tool not in MULTI_TARGET_TOOLS:
+            raise ValueError(f"{tool} aceita um único alvo por scan (recebidos {len(target)})")
+        key, norm = job_key(tool, target)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reap(conn, now)
+                row = conn.execute(
+                    "SELECT id, priority FROM jobs WHERE key = ? AND status IN ('queued', 'running')", (key,)
+                ).fetchone()
+                if row:
+                    # Quem chega com prioridade maior promove o job compartilhado
+                    conn.execute(
+                        "UPDATE jobs SET waiters = waiters + 1, priority = MAX(priority, ?), heartbeat = ? "
+                        "WHERE id = ?", (priority, now, row["id"]))
+                    job_id, merged = row["id"], True
+                else:
+                    cur = conn.execute(
+                        "INSERT INTO jobs (key, tool, target, priority, status, submitted_at, heartbeat) "
+                        "VALUES (?, ?, ?, ?, 'queued', ?, ?)", (key, tool, norm, priority, now, now))
+                    job_id, merged = cur.lastrowid, False
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        monitoring_check.SCHEDULER_JOBS.inc(tool=tool, event="merged" if merged else "submitted")
+        self._update_depth(tool)
+        return job_id, merged
+
+    def _reap(self, conn: sqlite3.Connection, now: float) -> None:
+        """Devolve à fila jobs cujo executor morreu e abandona filas sem ninguém aguardando"""
+        for row in conn.execute("SELECT id, owner_pid FROM jobs WHERE status = 'running'").fetchall():
+            if not _pid_alive(row["owner_pid"]):
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', owner_pid = NULL, started_at = NULL, heartbeat = ? "
+                    "WHERE id = ?", (now, row["id"]))
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'abandonado: nenhum processo aguardando', finished_at = ? "
+            "WHERE status = 'queued' AND heartbeat < ?", (now, now - STALE_SECONDS))
+        conn.execute("DELETE FROM jobs WHERE finished_at < ?", (now - RETENTION_SECONDS,))
+
+    def _try_claim(self, job_id: int) -> Optional[sqlite3.Row]:
+        """
+        Assume o job se ele é o próximo da fila da ferramenta e há vaga
+
+        Returns:
+            A linha do job se terminou (done/failed), None se continua aguardando;
+            a linha com status 'running' e owner_pid deste processo se foi assumido
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reap(conn, now)
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if job is None:
+                    raise JobError(f"job {job_id} não encontrado")
+                if job["status"] == "queued":
+                    conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (now, job_id))
+                    running = conn.execute(
+                        "SELECT COUNT(*) FROM jobs WHERE tool = ? AND status = 'running'", (job["tool"],)
+                    ).fetchone()[0]
+                    head = conn.execute(
+                        "SELECT id FROM jobs WHERE tool = ? AND status = 'queued' ORDER BY priority DESC, id LIMIT 1",
+                        (job["tool"],)).fetchone()
+                    if running < self.limit(job["tool"]) and head["id"] == job_id:
+                        conn.execute(
+                            "UPDATE jobs SET status = 'running', owner_pid = ?, started_at = ? WHERE id = ?",
+                            (os.getpid(), now, job_id))
+                        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if job["status"] == "queued":
+            return None
+        if job["status"] == "running" and job["owner_pid"] != os.getpid():
+            return None
+        return job
+
+    def _finish(self, job_id: int, tool: str, result: Optional[str], error: Optional[str]) -> None:
+        status = "failed" if error is not None else "done"
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, owner_pid = NULL WHERE id = ?",
+                (status, result, error, time.time(), job_id))
+        monitoring_check.SCHEDULER_JOBS.inc(tool=tool, event=status)
+        self._update_depth(tool)
+
+    def _update_depth(self, tool: str) -> None:
+        with self._connect() as conn:
+            depth = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE tool = ? AND status = 'queued'", (tool,)).fetchone()[0]
+        monitoring_check.QUEUE_DEPTH.set(depth, queue=f"scan.{tool}")
+
+    # -- execução -------------------------------------------------------------
+
+    def run(self, tool: str, target: Union[str, List[str]], fn: Callable[[], str], priority: int = 0,
+            timeout: Optional[float] = None) -> str:
+        """
+        Executa `fn` como o job (tool, target), ou aguarda o resultado de um job idêntico
+
+        Args:
+            tool: Ferramenta (sast, sca, secrets, container, dast)
+            target: Alvo (ou lista de alvos) do scan
+            fn: Função que executa o scanner e devolve a saída em texto
+            priority: Prioridade na fila (maior roda antes)
+            timeout: Tempo máximo de espera na fila (None = sem limite)
+
+        Returns:
+            Saída do scanner (a mesma para todos os pedidos fundidos)
+
+        Raises:
+            JobError: se o job compartilhado falhou ou a espera esgotou
+        """
+        job_id, _ = self.submit(tool, target, priority)
+        deadline = time.monotonic() + timeout if timeout else None
+        delay = self.poll_interval
+        while True:
+            job = self._try_claim(job_id)
+            if job is not None:
+                break
+            if deadline and time.monotonic() > deadline:
+                raise JobError(f"tempo de espera esgotado para o job {job_id}")
+            time.sleep(delay)
+            delay = min(delay * 1.5, self.max_poll_interval)
+
+        if job["status"] == "done":
+            return job["result"]
+        if job["status"] == "failed":
+            raise JobError(job["error"])
+
+        # Este processo assumiu o job
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(job_id, tool, None, f"{type(e).__name__}: {e}")
+            raise
+        self._finish(job_id, tool, "" if result is None else str(result), None)
+        return result
+
+    # -- consulta -------------------------------------------------------------
+
+    def status(self, job_id: int) -> Optional[Dict]:
+        """Estado de um job (sem a saída completa, exposta em `result`)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def jobs(self, limit: int = 20, status: Optional[str] = None) -> List[Dict]:
+        """Lista os jobs mais recentes (opcionalmente filtrados por estado)"""
+        query = ("SELECT id, tool, target, priority, status, waiters, owner_pid, submitted_at, started_at, "
+                 "finished_at, error FROM jobs")
+        params: list = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(query, params).fetchall()]
+
+
+def format_jobs(jobs: List[Dict]) -> str:
+    """Tabela simples de jobs para o terminal"""
+    if not jobs:
+        return "Nenhum job registrado."
+    lines = []
+    for j in jobs:
+        if j.get("finished_at") and j.get("started_at"):
+            took = f"{j['finished_at'] - j['started_at']:.1f}s"
+        elif j.get("started_at"):
+            took = f"rodando há {time.time() - j['started_at']:.0f}s"
+        else:
+            took = f"na fila há {time.time() - j['submitted_at']:.0f}s"
+        line = (f"#{j['id']} [{j['status']}] {j['tool']} {j['target']} "
+                f"prio={j['priority']} pedidos={j['waiters']} {took}")
+        if j.get("error"):
+            line += f" erro={j['error']}"
+        lines.append(line)
+    return "\n".join(lines)
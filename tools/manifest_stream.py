@@ -0,0 +1,345 @@
+# Análise em streaming de manifestos (stdin → NDJSON)
+"""
+Analisa streams com muitos documentos YAML/JSON (saída de `helm template`,
+`kubectl get -o yaml`, `kustomize build`) sem arquivo temporário:
+
+- o stream é lido linha a linha e cortado nos separadores `---`; cada
+  documento é parseado e analisado assim que termina, então a memória fica
+  limitada ao maior documento, não ao tamanho do stream;
+- listas do Kubernetes (`kind: List` com `items:` no topo, como no
+  `kubectl get -o yaml`) são quebradas item a item, sem montar a lista;
+- JSON: valores concatenados (`jq -c`, NDJSON) ou um documento `List`/array
+  são expandidos em itens (cada valor JSON é parseado inteiro);
+- cada documento gera uma linha NDJSON assim que é analisado, com as
+  heurísticas do `policy_check` ou, para docker-compose, do
+  `container_check`; um documento inválido gera uma linha de erro e o
+  stream continua.
+
+Uso:
+    helm template ./chart | python tools/devsecops_mcp.py analisar -
+    kubectl get deploy -A -o yaml | python tools/manifest_stream.py
+"""
+
+import io
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import yaml
+
+from tools import container_check, doc_cache, policy_check, tracing
+
+# Tamanho de leitura do stream JSON
+READ_CHUNK = 64 * 1024
+# Maior valor JSON aceito; acima disso o valor é descartado (memória limitada)
+MAX_JSON_DOCUMENT = 32 * 1024 * 1024
+
+_DOC_START = re.compile(r"^---(\s|$)")
+_DOC_END = re.compile(r"^\.\.\.(\s|$)")
+_ITEMS_KEY = re.compile(r"^items:\s*(#.*)?$")
+_SEQ_ENTRY = re.compile(r"^(\s*)-(\s|$)")
+_JSON_LINE_START = re.compile(r"\n[\[{]")
+_KIND_KEY = re.compile(r"^kind:\s*[\"']?([\w.-]+)")
+
+# (índice, documento, erro) — documento é None quando o trecho não pôde ser parseado
+Parsed = Tuple[int, Any, Optional[str]]
+
+
+class _YamlSplitter:
+    """Corta um stream YAML em documentos (e itens de `items:` no topo) sem carregá-lo inteiro"""
+
+    def __init__(self):
+        self.index = 0
+
+    def _parse(self, lines: List[str]) -> Iterator[Parsed]:
+        text = "".join(lines)
+        if not text.strip():
+            return
+        try:
+            doc = yaml.load(text, Loader=doc_cache.SafeLoader)
+        except yaml.YAMLError as e:
+            self.index += 1
+            yield self.index, None, f"YAML inválido: {str(e).splitlines()[0]}"
+            return
+        if doc is not None:
+            self.index += 1
+            yield self.index, doc, None
+
+    def _parse_item(self, lines: List[str]) -> Iterator[Parsed]:
+        """Um item da sequência `items:` (o trecho é uma sequência YAML de um elemento)"""
+        for index, doc, error in self._parse(lines):
+            if error is None and isinstance(doc, list):
+                for item in doc:
+                    yield index, item, None
+            else:
+                yield index, doc, error
+
+    def documents(self, lines: Iterable[str]) -> Iterator[Parsed]:
+        head: List[str] = []       # linhas do documento atual (fora de items:)
+        item: List[str] = []       # item de items: em construção
+        state = "head"             # head | items_start | items
+        indent = ""                # indentação dos itens de items:
+        kind = None                # kind: do topo do documento atual, se já visto
+        expanded = False           # o documento atual está sendo quebrado em itens
+
+        def flush_doc():
+            nonlocal head, expanded, kind
+            if not expanded:
+                yield from self._parse(head)
+            head, expanded, kind = [], False, None
+
+        def flush_item():
+            # Sem `kind: ...List` antes de items: (ordem do kubectl), o primeiro item decide:
+            # só uma sequência de objetos do Kubernetes é quebrada; senão o documento é comum
+            nonlocal item, state, expanded
+            if item and not expanded and not _is_object_item(item):
+                head.extend(["items:\n"] + item)
+                state = "head"
+            elif item:
+                expanded = True
+                yield from self._parse_item(item)
+            item = []
+
+        for line in lines:
+            if _DOC_START.match(line) or _DOC_END.match(line):
+                yield from flush_item()
+                if state == "items_start":
+                    head.append("items:\n")
+                state = "head"
+                yield from flush_doc()
+                rest = line[3:].strip()
+                if _DOC_START.match(line) and rest and not rest.startswith("#"):
+                    head.append(line)  # "--- valor" ou "--- !tag"
+                continue
+
+            if state == "head":
+                if _ITEMS_KEY.match(line) and (kind is None or kind.endswith("List")):
+                    state = "items_start"
+                else:
+                    head.append(line)
+                    match = _KIND_KEY.match(line)
+                    if match:
+                        kind = match.group(1)
+                continue
+
+            if state == "items_start":
+                if not line.strip() or line.lstrip().startswith("#"):
+                    continue
+                match = _SEQ_ENTRY.match(line)
+                if match is None:
+                    # items: não é uma sequência (ex.: um mapeamento) — documento comum
+                    head.extend(["items:\n", line])
+                    state = "head"
+                    continue
+                indent, state, expanded = match.group(1), "items", kind is not None
+                item = [line]
+                continue
+
+            # state == "items"
+            match = _SEQ_ENTRY.match(line)
+            if match and match.group(1) == indent:
+                yield from flush_item()
+                if state == "items":
+                    item = [line]
+                else:
+                    head.append(line)
+            elif not line.strip() or line.lstrip().startswith("#") or \
+                    len(line) - len(line.lstrip(" \t")) > len(indent):
+                item.append(line)
+            else:
+                # Fim de items: no topo; o restante (kind: List, metadata) não é analisado
+                yield from flush_item()
+                state = "head"
+                head.append(line)
+
+        yield from flush_item()
+        if state == "items_start":
+            head.append("items:\n")
+        yield from flush_doc()
+
+
+def _is_object_item(lines: List[str]) -> bool:
+    """O trecho `- ...` é um objeto do Kubernetes (mapeamento com `kind`)?"""
+    try:
+        doc = yaml.load("".join(lines), Loader=doc_cache.SafeLoader)
+    except yaml.YAMLError:
+        return False
+    return isinstance(doc, list) and len(doc) == 1 and isinstance(doc[0], dict) and "kind" in doc[0]
+
+
+def _expand(value: Any) -> Iterator[Any]:
+    """Quebra listas do Kubernetes e arrays no topo em documentos individuais"""
+    if isinstance(value, dict) and str(value.get("kind", "")).endswith("List") and isinstance(value.get("items"), list):
+        yield from value["items"]
+    elif isinstance(value, list):
+        yield from value
+    elif value is not None:
+        yield value
+
+
+def _next_value(buf: str, start: int) -> int:
+    """Posição da próxima linha que começa um valor JSON no topo (`{` ou `[` na coluna 0), ou -1"""
+    match = _JSON_LINE_START.search(buf, start)
+    return match.start() + 1 if match else -1
+
+
+def iter_json_documents(stream: TextIO, prefix: str = "") -> Iterator[Parsed]:
+    """
+    Valores JSON concatenados (ou separados por linha) lidos em blocos
+
+    Um valor inválido gera um erro e a leitura continua na próxima linha que
+    começa um valor (`{`/`[` na coluna 0, como no NDJSON e na saída do `jq`).
+    Valores maiores que MAX_JSON_DOCUMENT também viram erro e são descartados
+    sem acumular o restante do stream.
+    """
+    decoder = json.JSONDecoder()
+    buf, eof, index = prefix, False, 0
+    retry_at = 0       # só tenta decodificar de novo quando o buffer dobrar (custo linear)
+    skipping = False   # descartando um valor grande demais até o próximo início de valor
+    while True:
+        if skipping:
+            resume = _next_value(buf, 0)
+            if resume < 0:
+                if eof:
+                    return
+                buf = buf[-1:]  # pode ser o "\n" que antecede o próximo valor
+                chunk = stream.read(READ_CHUNK)
+                eof = not chunk
+                buf += chunk
+                continue
+            buf, skipping, retry_at = buf[resume:], False, 0
+        buf = buf.lstrip()
+        if not buf:
+            if eof:
+                return
+            chunk = stream.read(READ_CHUNK)
+            eof = not chunk
+            buf += chunk
+            continue
+        if len(buf) >= retry_at or eof:
+            try:
+                value, end = decoder.raw_decode(buf)
+            except json.JSONDecodeError as e:
+                resume = _next_value(buf, e.pos)
+                if resume > 0 or eof:
+                    # Valor completo e inválido: registra e segue para o próximo
+                    index += 1
+                    yield index, None, f"JSON inválido: {e.msg} (linha {e.lineno} do valor)"
+                    if resume < 0:
+                        return
+                    buf, retry_at = buf[resume:], 0
+                    continue
+                if len(buf) > MAX_JSON_DOCUMENT:
+                    index += 1
+                    yield index, None, f"JSON maior que {MAX_JSON_DOCUMENT // (1024 * 1024)} MB; valor ignorado"
+                    skipping = True
+                    continue
+                retry_at = len(buf) * 2
+            else:
+                buf, retry_at = buf[end:], 0
+                for doc in _expand(value):
+                    index += 1
+                    yield index, doc, None
+                continue
+        chunk = stream.read(READ_CHUNK)
+        eof = not chunk
+        buf += chunk
+
+
+def iter_documents(stream: TextIO) -> Iterator[Parsed]:
+    """
+    Documentos de um stream YAML ou JSON, na ordem em que chegam
+
+    O formato é detectado pelo primeiro caractere relevante (`{`/`[` = JSON).
+
+    Yields:
+        Tuplas (índice, documento, erro)
+    """
+    prelude: List[str] = []
+    for line in stream:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            prelude.append(line)
+            continue
+        if stripped[0] in "{[":
+            yield from iter_json_documents(stream, "".join(prelude) + line)
+            return
+        prelude.append(line)
+        break
+    yield from _YamlSplitter().documents(_chain(prelude, stream))
+
+
+def _chain(first: List[str], rest: Iterable[str]) -> Iterator[str]:
+    yield from first
+    yield from rest
+
+
+def analyze_document(doc: Any, index: int, compose_checker: Optional[Any] = None) -> Dict:
+    """Aplica o analisador adequado a um documento e monta o evento NDJSON"""
+    if isinstance(doc, dict) and isinstance(doc.get("services"), dict) and "kind" not in doc:
+        checker = compose_checker or container_check.ContainerSecurityChecker()
+        found = checker.compose_issues(doc)
+        return {"event": "documento", "indice": index, "documento": f"docker-compose #{index}",
+                "analisador": "compose", "issues": found["critical"] + found["warnings"] + found["suggestions"],
+                "criticos": len(found["critical"])}
+    issues = [issue[2:] if issue.startswith("- ") else issue for issue in policy_check._config_issues(doc)]
+    return {"event": "documento", "indice": index, "documento": policy_check._describe(doc, index),
+            "analisador": "policy", "issues": issues}
+
+
+def analyze_stream(stream: TextIO, out: TextIO) -> Dict:
+    """
+    Analisa cada documento do stream e escreve um evento NDJSON por documento
+
+    A última linha é o evento `resumo`.
+
+    Args:
+        stream: Entrada de texto (ex.: stdin)
+        out: Saída onde as linhas NDJSON são escritas (e descarregadas) uma a uma
+
+    Returns:
+        O evento de resumo
+    """
+    started = time.perf_counter()
+    checker = container_check.ContainerSecurityChecker()
+    summary = {"event": "resumo", "documentos": 0, "com_problemas": 0, "erros": 0}
+    with tracing.span("policy.stream") as sp:
+        for index, doc, error in iter_documents(stream):
+            if error is not None:
+                event = {"event": "erro", "indice": index, "erro": error}
+                summary["erros"] += 1
+            else:
+                event = analyze_document(doc, index, checker)
+                summary["documentos"] += 1
+                summary["com_problemas"] += bool(event["issues"])
+            out.write(json.dumps(event, ensure_ascii=False) + "\n")
+            out.flush()
+        summary["segundos"] = round(time.perf_counter() - started, 3)
+        sp.set(documentos=summary["documentos"], erros=summary["erros"])
+    out.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    out.flush()
+    return summary
+
+
+def stdin() -> TextIO:
+    """stdin em UTF-8, independentemente do locale do terminal/CI"""
+    return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+
+
+def main() -> int:
+    try:
+        analyze_stream(stdin(), sys.stdout)
+    except BrokenPipeError:
+        # Consumidor fechou o pipe (ex.: `| head`)
+        sys.stderr.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,393 @@
-# Monitoring placeholders (Prometheus/ELK)
+# Monitoring: validação de prometheus.yml e métricas de runtime do assistente
+"""
+Dois recursos:
+
+- `check_prometheus_config`: validação estrutural de um `prometheus.yml`
+  (intervalos de coleta, timeouts, jobs, targets, regras e alertmanagers).
+- Registro de métricas em memória (`REGISTRY`) exposto no formato texto do
+  Prometheus em `/metrics` (`serve_metrics`) ou gravado para o textfile
+  collector do node_exporter (`write_textfile`), com histogramas dos caminhos
+  quentes do próprio assistente.
+"""
+
+import atexit
+import math
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import yaml
+
+from tools import doc_cache, tracing
+
+# --------------------------------------------------------------------------- validação
+_DURATION_RE = re.compile(r"^((\d+)y)?((\d+)w)?((\d+)d)?((\d+)h)?((\d+)m)?((\d+)s)?((\d+)ms)?$")
+_DURATION_UNITS = (365 * 86400, 7 * 86400, 86400, 3600, 60, 1, 0.001)
+
+# Limites usados nas checagens estruturais
+MIN_SCRAPE_INTERVAL = 5.0        # abaixo disso a carga nos alvos costuma ser excessiva
+MAX_SCRAPE_INTERVAL = 120.0      # séries ficam "stale" após 5m; intervalos longos geram lacunas
+MAX_STATIC_TARGETS_PER_JOB = 100
+
+
+def parse_duration(value) -> Optional[float]:
+    """Converte uma duração do Prometheus (ex.: 1m30s, 15s, 500ms) em segundos"""
+    if value is None:
+        return None
+    m = _DURATION_RE.match(str(value).strip())
+    if not m or not str(value).strip() or str(value).strip() == "0":
+        return None
+    groups = m.groups()[1::2]
+    return sum(int(g) * unit for g, unit in zip(groups, _DURATION_UNITS) if g)
+
+
+def _check_intervals(scope: str, interval, timeout, issues: List[str]) -> None:
+    seconds = parse_duration(interval)
+    if interval is not None and seconds is None:
+        issues.append(f"❌ {scope}: scrape_interval inválido ({interval})")
+        return
+    if seconds is not None:
+        if seconds < MIN_SCRAPE_INTERVAL:
+            issues.append(f"⚠️ {scope}: scrape_interval de {interval} é muito agressivo (< {MIN_SCRAPE_INTERVAL:g}s)")
+        elif seconds > MAX_SCRAPE_INTERVAL:
+            issues.append(f"⚠️ {scope}: scrape_interval de {interval} pode gerar séries obsoletas (> {MAX_SCRAPE_INTERVAL:g}s)")
+    t_seconds = parse_duration(timeout)
+    if timeout is not None and t_seconds is None:
+        issues.append(f"❌ {scope}: scrape_timeout inválido ({timeout})")
+    elif t_seconds is not None and seconds is not None and t_seconds > seconds:
+        issues.append(f"❌ {scope}: scrape_timeout ({timeout}) maior que scrape_interval ({interval})")
+
+
+@tracing.traced("monitoring.prometheus_config")
 def check_prometheus_config(path):
-    return '[Placeholder] Validar prometheus.yml e targets.'
+    """
+    Valida a estrutura de um prometheus.yml
+
+    Args:
+        path: Caminho do arquivo prometheus.yml
+
+    Returns:
+        str: Resultado da validação com problemas e sugestões
+    """
+    try:
+        p = Path(path)
+        config = doc_cache.load(p) or {}
+        if not isinstance(config, dict):
+            return "[Erro: prometheus.yml deve ser um mapeamento YAML]"
+        issues: List[str] = []
+
+        glob = config.get("global") or {}
+        g_interval = glob.get("scrape_interval", "1m")
+        # Sem scrape_timeout explícito o Prometheus usa min(10s, scrape_interval): nada a comparar
+        _check_intervals("global", g_interval, glob.get("scrape_timeout"), issues)
+        if glob.get("evaluation_interval") is not None and parse_duration(glob["evaluation_interval"]) is None:
+            issues.append(f"❌ global: evaluation_interval inválido ({glob['evaluation_interval']})")
+
+        scrape_configs = config.get("scrape_configs") or []
+        if not scrape_configs:
+            issues.append("❌ Nenhum scrape_config definido")
+        seen_jobs, seen_targets = set(), {}
+        total_targets = 0
+        for i, job in enumerate(scrape_configs):
+            name = job.get("job_name")
+            if not name:
+                issues.append(f"❌ scrape_configs[{i}] sem job_name")
+                name = f"#{i}"
+            elif name in seen_jobs:
+                issues.append(f"❌ job_name duplicado: {name}")
+            seen_jobs.add(name)
+
+            # Intervalos herdados do global já foram validados acima
+            if "scrape_interval" in job or "scrape_timeout" in job:
+                _check_intervals(f"job {name}", job.get("scrape_interval", g_interval),
+                                 job.get("scrape_timeout"), issues)
+
+            if job.get("scheme", "http") not in ("http", "https"):
+                issues.append(f"❌ job {name}: scheme inválido ({job.get('scheme')})")
+            if not str(job.get("metrics_path", "/metrics")).startswith("/"):
+                issues.append(f"❌ job {name}: metrics_path deve começar com '/'")
+            if (job.get("tls_config") or {}).get("insecure_skip_verify"):
+                issues.append(f"⚠️ job {name}: tls_config.insecure_skip_verify habilitado")
+            if (job.get("basic_auth") or {}).get("password"):
+                issues.append(f"⚠️ job {name}: senha em texto claro no basic_auth (prefira password_file)")
+            if job.get("scheme", "http") == "http" and (job.get("basic_auth") or job.get("authorization")):
+                issues.append(f"⚠️ job {name}: credenciais enviadas sem TLS")
+
+            job_targets = []
+            for sc in job.get("static_configs") or []:
+                for target in sc.get("targets") or []:
+                    job_targets.append(target)
+                    if not re.match(r"^[\w.\-\[\]:]+:\d{1,5}$", str(target)):
+                        issues.append(f"⚠️ job {name}: target sem host:porta válido ({target})")
+                    if target in seen_targets and seen_targets[target] != name:
+                        issues.append(f"⚠️ target {target} coletado por {seen_targets[target]} e {name}")
+                    seen_targets.setdefault(target, name)
+            if len(job_targets) != len(set(job_targets)):
+                issues.append(f"⚠️ job {name}: targets duplicados")
+            if len(job_targets) > MAX_STATIC_TARGETS_PER_JOB:
+                issues.append(f"💡 job {name}: {len(job_targets)} targets estáticos — considere service discovery")
+            sd_keys = [k for k in job if k.endswith("_sd_configs")]
+            if not job_targets and not sd_keys:
+                issues.append(f"⚠️ job {name}: nenhum target ou service discovery configurado")
+            total_targets += len(job_targets)
+
+        for pattern in config.get("rule_files") or []:
+            if not list(p.parent.glob(pattern)):
+                issues.append(f"⚠️ rule_files: nenhum arquivo encontrado para {pattern}")
+        if not (config.get("alerting") or {}).get("alertmanagers"):
+            issues.append("💡 Nenhum alertmanager configurado em alerting.alertmanagers")
+
+        header = f"Análise do prometheus.yml ({len(seen_jobs)} jobs, {total_targets} targets estáticos):\n"
+        return header + ("\n".join(issues) if issues else "✅ Configuração sem problemas aparentes.")
+    except yaml.YAMLError:
+        return "[Erro ao processar YAML: Verifique a sintaxe do arquivo]"
+    except Exception as e:
+        return f"[Erro ao validar prometheus.yml: {e}]"
+
+
+# --------------------------------------------------------------------------- métricas
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _fmt(value: float) -> str:
+    value = float(value)
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(v)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # [contagens por bucket..., soma, total]
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Mede a duração do bloco e registra no histograma"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="' + _fmt(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {_fmt(cumulative)}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(series[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {_fmt(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo, renderizado no formato texto do Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SCANNER_DURATION = REGISTRY.histogram(
+    "devsecops_scanner_duration_seconds", "Duração das execuções de scanners", ["tool"])
+CACHE_REQUESTS = REGISTRY.counter(
+    "devsecops_cache_requests_total", "Consultas a caches internos por resultado (hit/miss)", ["cache", "result"])
+QUEUE_DEPTH = REGISTRY.gauge(
+    "devsecops_queue_depth", "Itens aguardando nas filas internas", ["queue"])
+SCHEDULER_JOBS = REGISTRY.counter(
+    "devsecops_scheduler_jobs_total", "Pedidos de scan por desfecho no agendador (submitted/merged/done/failed)",
+    ["tool", "event"])
+DISTRIBUTED_JOBS = REGISTRY.counter(
+    "devsecops_distributed_jobs_total",
+    "Jobs da varredura distribuída por evento (leased/done/duplicate/retried/dead/lost/expired)", ["tool", "event"])
+SCANNER_PEAK_RSS = REGISTRY.histogram(
+    "devsecops_scanner_peak_rss_megabytes", "Pico de memória residente de cada execução de scanner", ["tool"],
+    buckets=(32, 64, 128, 256, 512, 1024, 2048, 4096, 8192))
+SCANNER_CPU_SECONDS = REGISTRY.histogram(
+    "devsecops_scanner_cpu_seconds", "Tempo de CPU (usuário + sistema) de cada execução de scanner", ["tool"])
+SCANNER_REJECTED = REGISTRY.counter(
+    "devsecops_scanner_rejected_total", "Execuções recusadas ou interrompidas pelo orçamento de recursos",
+    ["tool", "reason"])
+EMBEDDING_DURATION = REGISTRY.histogram(
+    "devsecops_embedding_duration_seconds", "Duração de cada lote de embeddings", ["backend"])
+EMBEDDING_THROUGHPUT = REGISTRY.histogram(
+    "devsecops_embedding_throughput_chunks_per_second", "Vazão de embeddings por lote (chunks/s)", ["backend"],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000))
+REPORT_RENDER_DURATION = REGISTRY.histogram(
+    "devsecops_report_render_seconds", "Tempo de renderização do relatório por formato", ["format"])
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Registra um acerto/erro de cache"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# O doc_cache não importa este módulo: o contador é injetado como hook
+doc_cache.set_lookup_hook(lambda hit: record_cache("documents", hit))
+
+
+def record_embedding(chunks: int, seconds: float, backend: str = "ollama") -> None:
+    """Registra a duração e a vazão de um lote de embeddings"""
+    EMBEDDING_DURATION.observe(seconds, backend=backend)
+    if seconds > 0:
+        EMBEDDING_THROUGHPUT.observe(chunks / seconds, backend=backend)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port: int = 9464, addr: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Expõe `/metrics` em uma thread de fundo
+
+    Returns:
+        O servidor HTTP (use `shutdown()` para encerrar)
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((addr, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
+
+
+def write_textfile(path, registry: MetricsRegistry = REGISTRY) -> None:
+    """Grava as métricas para o textfile collector do node_exporter (escrita atômica)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(registry.render(), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def start_from_env() -> None:
+    """
+    Ativa a exportação conforme variáveis de ambiente:
+    DEVSECOPS_METRICS_PORT (servidor /metrics) e DEVSECOPS_METRICS_FILE (textfile ao sair)
+    """
+    port = os.environ.get("DEVSECOPS_METRICS_PORT")
+    if port:
+        serve_metrics(int(port), os.environ.get("DEVSECOPS_METRICS_ADDR", "127.0.0.1"))
+    textfile = os.environ.get("DEVSECOPS_METRICS_FILE")
+    if textfile:
+        atexit.register(write_textfile, textfile)
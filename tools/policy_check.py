@@ -2,10 +2,40 @@
 import json
 import yaml
 from pathlib import Path
+from tools import doc_cache, tracing
 
+def _config_issues(config):
+    """Heurísticas de políticas e boas práticas para um documento já parseado"""
+    issues = []
+    if isinstance(config, dict):
+        # Verifica limites de recursos
+        if not any(key in str(config) for key in ['limits:', 'resources:', '"limits":', '"resources":']):
+            issues.append('- Sem limites de recursos detectados')
+
+        # Verifica configurações de segurança comuns
+        if not any(key in str(config) for key in ['securityContext', 'networkPolicy', 'rbac']):
+            issues.append('- Configurações de segurança recomendadas ausentes')
+
+        # Verifica políticas específicas
+        if 'spec' in config:
+            if not any(key in str(config['spec']) for key in ['rules', 'policies', 'validate']):
+                issues.append('- Nenhuma regra de validação encontrada em spec')
+    return issues
+
+def _describe(config, index):
+    """Identificação curta de um documento (kind/nome) para streams com vários documentos"""
+    if isinstance(config, dict):
+        meta = config.get('metadata') if isinstance(config.get('metadata'), dict) else {}
+        kind = config.get('kind', 'documento')
+        name = meta.get('name')
+        return f"{kind}/{name}" if name else f"{kind} #{index}"
+    return f"documento #{index}"
+
+@tracing.traced("policy.config")
 def analyze_config(p):
     """
     Analisa arquivos de configuração (YAML/JSON) para políticas e boas práticas.
+    Arquivos YAML com vários documentos (---) são analisados documento a documento.
     
     Args:
         p (str): Caminho do arquivo a ser analisado
@@ -15,35 +45,25 @@ def analyze_config(p):
     """
     try:
         path = Path(p)
-        txt = path.read_text()
-        issues = []
         
         # Determina o tipo de arquivo
         if path.suffix.lower() in ['.yaml', '.yml']:
-            config = yaml.safe_load(txt)
             file_type = "YAML"
         elif path.suffix.lower() == '.json':
-            config = json.loads(txt)
             file_type = "JSON"
         else:
             return f'Tipo de arquivo não suportado: {path.suffix}'
-            
-        # Análise de recursos e limites
-        if isinstance(config, dict):
-            # Verifica limites de recursos
-            if not any(key in str(config) for key in ['limits:', 'resources:', '"limits":', '"resources":']):
-                issues.append('- Sem limites de recursos detectados')
-                
-            # Verifica configurações de segurança comuns
-            if not any(key in str(config) for key in ['securityContext', 'networkPolicy', 'rbac']):
-                issues.append('- Configurações de segurança recomendadas ausentes')
-                
-            # Verifica políticas específicas
-            if 'spec' in config:
-                if not any(key in str(config['spec']) for key in ['rules', 'policies', 'validate']):
-                    issues.append('- Nenhuma regra de validação encontrada em spec')
-
-        return f'Análise do arquivo {file_type}:\n' + ('\n'.join(issues) if issues else f'{file_type} com boas práticas aparentes.')
+        docs = doc_cache.load_all(path)
+
+        if len(docs) <= 1:
+            issues = _config_issues(docs[0] if docs else None)
+            return f'Análise do arquivo {file_type}:\n' + ('\n'.join(issues) if issues else f'{file_type} com boas práticas aparentes.')
+
+        sections = []
+        for i, config in enumerate(docs, 1):
+            issues = _config_issues(config)
+            sections.append(f'[{_describe(config, i)}]\n' + ('\n'.join(issues) if issues else 'Boas práticas aparentes.'))
+        return f'Análise do arquivo {file_type} ({len(docs)} documentos):\n' + '\n\n'.join(sections)
     except yaml.YAMLError:
         return f'[Erro ao processar YAML: Verifique a sintaxe do arquivo]'
     except json.JSONDecodeError:
@@ -51,6 +71,7 @@ def analyze_config(p):
     except Exception as e:
         return f'[Erro ao analisar arquivo: {e}]'
 
+@tracing.traced("policy.rego")
 def analyze_rego(p):
     txt = Path(p).read_text()
     if 'deny' in txt or 'allow' in txt:
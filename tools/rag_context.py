@@ -0,0 +1,174 @@
+# Compressão do contexto recuperado antes da chamada ao LLM
+"""
+Os chunks da base de conhecimento se sobrepõem (`chunk_overlap=200`), então
+o top-k de uma pergunta costuma repetir os mesmos trechos. Este estágio roda
+entre o retriever e a chain "stuff":
+
+1. funde chunks sobrepostos ou adjacentes da mesma fonte (pela metadata
+   `start_index` gravada pelo splitter);
+2. remove quase-duplicatas (trechos cujos shingles de palavras já estão
+   quase todos em um trecho mais relevante — com k pequeno a comparação
+   exata dos conjuntos é mais barata que MinHash);
+3. corta o contexto em um orçamento de tokens, preservando a ordem de
+   relevância.
+"""
+
+import math
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from tools import tracing
+
+try:
+    from langchain_core.retrievers import BaseRetriever
+except ImportError:
+    BaseRetriever = None
+
+# Orçamento padrão de contexto (tokens estimados) enviado ao LLM
+DEFAULT_BUDGET_TOKENS = 1500
+# Similaridade a partir da qual dois trechos são considerados o mesmo conteúdo
+DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+# Distância máxima (caracteres) entre chunks da mesma fonte para considerá-los adjacentes
+ADJACENT_GAP = 2
+# Sobra mínima do orçamento para valer a pena incluir um trecho truncado
+MIN_TAIL_TOKENS = 50
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens (~4 caracteres por token em textos técnicos)"""
+    return math.ceil(len(text) / 4)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Conjunto de hashes dos n-gramas de palavras do texto"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def containment(a: Set[int], b: Set[int]) -> float:
+    """Fração dos shingles de `a` presentes em `b` (1.0 = `a` está contido em `b`)"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a)
+
+
+def _source_key(metadata: Dict) -> Optional[Tuple]:
+    if "start_index" not in metadata or metadata.get("source") is None:
+        return None
+    return (metadata.get("category"), metadata.get("source"))
+
+
+def merge_overlapping(docs: Sequence[Any]) -> List[Any]:
+    """
+    Funde chunks sobrepostos ou adjacentes da mesma fonte
+
+    O trecho fundido ocupa a posição do chunk mais relevante do grupo.
+    Documentos sem `start_index` passam inalterados.
+    """
+    # [rank, início, fim, texto, documento de origem] por fonte
+    groups: Dict[Tuple, List[List]] = {}
+    passthrough: List[Tuple[int, Any]] = []
+    for rank, doc in enumerate(docs):
+        key = _source_key(doc.metadata)
+        if key is None:
+            passthrough.append((rank, doc))
+            continue
+        start = int(doc.metadata["start_index"])
+        groups.setdefault(key, []).append([rank, start, start + len(doc.page_content), doc.page_content, doc])
+
+    merged: List[Tuple[int, Any]] = list(passthrough)
+    for spans in groups.values():
+        spans.sort(key=lambda s: s[1])
+        current = spans[0]
+        for span in spans[1:]:
+            rank, start, end, text, _ = span
+            if start <= current[2] + ADJACENT_GAP:
+                overlap = current[2] - start
+                if end > current[2]:
+                    current[3] += text[overlap:] if overlap >= 0 else "\n" + text
+                    current[2] = end
+                current[0] = min(current[0], rank)
+            else:
+                merged.append((current[0], _with_text(current[4], current[3])))
+                current = span
+        merged.append((current[0], _with_text(current[4], current[3])))
+
+    merged.sort(key=lambda pair: pair[0])
+    return [doc for _, doc in merged]
+
+
+def _with_text(doc: Any, text: str) -> Any:
+    """Cópia do documento (mesmo tipo e metadados) com outro texto"""
+    return type(doc)(page_content=text, metadata=dict(doc.metadata))
+
+
+def drop_near_duplicates(docs: Sequence[Any], threshold: float = DUPLICATE_THRESHOLD) -> List[Any]:
+    """Remove trechos quase inteiramente contidos em um trecho mais relevante já mantido"""
+    kept: List[Any] = []
+    kept_shingles: List[Set[int]] = []
+    for doc in docs:
+        sh = shingles(doc.page_content)
+        if any(containment(sh, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(sh)
+    return kept
+
+
+def fit_budget(docs: Sequence[Any], budget_tokens: int = DEFAULT_BUDGET_TOKENS) -> List[Any]:
+    """Mantém os trechos mais relevantes dentro do orçamento, truncando o último em limite de palavra"""
+    selected: List[Any] = []
+    remaining = budget_tokens
+    for doc in docs:
+        cost = estimate_tokens(doc.page_content)
+        if cost <= remaining:
+            selected.append(doc)
+            remaining -= cost
+            continue
+        if remaining >= MIN_TAIL_TOKENS:
+            cut = doc.page_content[:remaining * 4]
+            cut = cut[:cut.rfind(" ")] if " " in cut else cut
+            selected.append(_with_text(doc, cut + " …"))
+        break
+    return selected
+
+
+def compress(docs: Sequence[Any], budget_tokens: int = DEFAULT_BUDGET_TOKENS,
+             threshold: float = DUPLICATE_THRESHOLD) -> List[Any]:
+    """
+    Pipeline completo: fusão de sobreposições, remoção de quase-duplicatas e orçamento
+
+    Args:
+        docs: Documents na ordem de relevância do retriever
+        budget_tokens: Máximo de tokens estimados no contexto
+        threshold: Fração mínima de shingles já presentes para descartar um trecho
+
+    Returns:
+        Documents comprimidos, ainda em ordem de relevância
+    """
+    return fit_budget(drop_near_duplicates(merge_overlapping(docs), threshold), budget_tokens)
+
+
+if BaseRetriever is not None:
+    class CompressingRetriever(BaseRetriever):
+        """Envolve outro retriever aplicando `compress` ao resultado"""
+
+        base: Any
+        budget_tokens: int = DEFAULT_BUDGET_TOKENS
+        threshold: float = DUPLICATE_THRESHOLD
+
+        def _get_relevant_documents(self, query: str, *, run_manager=None) -> List:
+            docs = self.base.invoke(query)
+            with tracing.span("rag.contexto", docs_in=len(docs),
+                              tokens_in=sum(estimate_tokens(d.page_content) for d in docs)) as sp:
+                result = compress(docs, self.budget_tokens, self.threshold)
+                sp.set(docs_out=len(result), tokens_out=sum(estimate_tokens(d.page_content) for d in result))
+            return result
+else:
+    CompressingRetriever = None
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
 import os
+import shutil
 import sys
 import requests
 import logging
+import time
 from typing import Dict, List, Optional
 from datetime import datetime
 from pathlib import Path
@@ -10,6 +14,11 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import OllamaEmbeddings
 
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools import monitoring_check, rag_shards, tracing, vector_index
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,8 +33,15 @@ logger = logging.getLogger(__name__)
 # Diretórios
 DATA_DIR = Path.home() / "projetos/devsecops/data/knowledge_base"
 DB_DIR = Path.home() / "projetos/devsecops/chromadb"
+COMPACT_DIR = rag_shards.COMPACT_DIR
 CACHE_DIR = DATA_DIR / "cache"
 
+EMBEDDING_MODEL = "llama3"
+# Backends gravados pelo build_index: "auto" (Chroma + índice compacto), "chroma" ou "compact"
+RAG_BACKEND = rag_shards.RAG_BACKEND
+# Precisão do índice compacto: "float16" (recall igual ao Chroma) ou "int8" (1/4 da memória)
+COMPACT_DTYPE = os.environ.get("DEVSECOPS_RAG_DTYPE", "float16")
+
 for directory in [DATA_DIR, DB_DIR, CACHE_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
 
@@ -113,11 +129,67 @@ sources: Dict[str, Dict[str, Dict[str, str]]] = {
     }
 }
 
+def split_documents(texts: List[Dict]) -> List:
+    """
+    Divide os documentos em chunks, propagando os metadados de cada documento
+
+    Args:
+        texts: Lista de dicts com "content" e "metadata"
+
+    Returns:
+        Lista de Documents do LangChain
+    """
+    # Configurar o text splitter com parâmetros otimizados
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1500,
+        chunk_overlap=200,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""],
+        # Posição do chunk na fonte: permite fundir chunks sobrepostos na recuperação
+        add_start_index=True
+    )
+    # create_documents recebe um metadata por texto de entrada e o replica nos chunks
+    return splitter.create_documents(
+        [item["content"] for item in texts],
+        metadatas=[item["metadata"] for item in texts]
+    )
+
+def shard_up_to_date(info: Dict, fingerprint: str) -> bool:
+    """Shard registrado com os mesmos arquivos (coleções antigas, sem cosseno, são refeitas)"""
+    if info.get("fingerprint") != fingerprint:
+        return False
+    return "chroma" not in info.get("backends", ()) or info.get("space") == "cosine"
+
+def drop_collection(name: Optional[str]) -> None:
+    """Apaga uma coleção do Chroma que não é mais referenciada pelo registro"""
+    if not name:
+        return
+    try:
+        Chroma(collection_name=name, persist_directory=str(DB_DIR)).delete_collection()
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível apagar a coleção {name}: {e}")
+
+def write_compact_index(directory: Path, vectors, texts: List[str], metadatas: List[Dict]) -> None:
+    """Grava um índice vetorial compacto (matriz NumPy mapeada em memória)"""
+    with tracing.span("rag.compact_index", chunks=len(texts), dtype=COMPACT_DTYPE):
+        vector_index.write_index(directory, vectors, texts, metadatas,
+                                 dtype=COMPACT_DTYPE, model=EMBEDDING_MODEL)
+    logger.info(f"📦 Índice compacto ({COMPACT_DTYPE}) gravado em {directory}")
+
+def shard_fingerprint(files: List[Path]) -> str:
+    """Impressão digital dos arquivos de uma categoria e da configuração de indexação"""
+    h = hashlib.sha256(f"{EMBEDDING_MODEL}|{RAG_BACKEND}|{COMPACT_DTYPE}".encode())
+    for f in files:
+        st = f.stat()
+        h.update(f"|{f.name}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
 class KnowledgeBaseLoader:
     def __init__(self):
         self.last_update = None
         self.download_stats = {"success": 0, "failed": 0}
         
+    @tracing.traced("rag.download_docs")
     def download_docs(self) -> None:
         """
         Download documents from all configured sources
@@ -150,89 +222,156 @@ class KnowledgeBaseLoader:
                 else:
                     logger.info(f"📄 {doc_name} já existe localmente")
 
-    def build_index(self) -> None:
+    @tracing.traced("rag.build_index")
+    def build_index(self, categories: Optional[List[str]] = None, force: bool = False) -> None:
         """
-        Build the vector store index from downloaded documents
+        Build the vector store index from downloaded documents, one shard per category
+
+        Args:
+            categories: Rebuild only these categories (default: all)
+            force: Rebuild even if the category files did not change
         """
         logger.info("\nConstruindo índice vetorial...")
+        registry = rag_shards.load_registry()
+        category_dirs = sorted(d for d in DATA_DIR.iterdir() if d.is_dir() and d != CACHE_DIR)
+        if categories:
+            wanted = rag_shards.resolve_categories(categories, [d.name for d in category_dirs])
+            category_dirs = [d for d in category_dirs if d.name in wanted]
+        else:
+            # Categorias removidas do disco deixam de ser consultadas e têm os dados apagados
+            for stale in set(registry) - {d.name for d in category_dirs}:
+                info = registry.pop(stale)
+                rag_shards.save_registry(registry)
+                drop_collection(info.get("collection"))
+                shutil.rmtree(rag_shards.shard_dir(stale, COMPACT_DIR), ignore_errors=True)
+                logger.info(f"🗑️ Shard removido: {stale}")
+
+        if not category_dirs:
+            logger.warning("⚠️ Nenhum documento encontrado para indexar!")
+            return
+
+        embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL)
+        stats = {"built": 0, "unchanged": 0, "chunks": 0}
+        for category_dir in category_dirs:
+            files = sorted(f for f in category_dir.glob("*") if f.is_file())
+            fingerprint = shard_fingerprint(files)
+            if not force and shard_up_to_date(registry.get(category_dir.name, {}), fingerprint):
+                logger.info(f"⏭️ Categoria inalterada: {category_dir.name}")
+                stats["unchanged"] += 1
+                continue
+            chunks = self.build_shard(category_dir.name, files, embeddings, fingerprint)
+            if chunks:
+                stats["built"] += 1
+                stats["chunks"] += chunks
+
+        self.last_update = datetime.now()
+        logger.info(f"\n✅ Base de conhecimento atualizada com sucesso!")
+        logger.info(f"📊 Estatísticas:")
+        logger.info(f"   - Shards reconstruídos: {stats['built']}")
+        logger.info(f"   - Shards inalterados: {stats['unchanged']}")
+        logger.info(f"   - Chunks gerados: {stats['chunks']}")
+        logger.info(f"   - Downloads com sucesso: {self.download_stats['success']}")
+        logger.info(f"   - Downloads falhos: {self.download_stats['failed']}")
+
+    @tracing.traced("rag.build_shard")
+    def build_shard(self, category: str, files: List[Path], embeddings, fingerprint: str) -> int:
+        """
+        Reconstrói a coleção (e o índice compacto) de uma única categoria
+
+        Returns:
+            Quantidade de chunks indexados (0 em caso de falha)
+        """
+        logger.info(f"\nProcessando categoria: {category}")
         texts = []
-        
-        # Processar documentos por categoria
-        for category_dir in DATA_DIR.iterdir():
-            if category_dir.is_dir():
-                logger.info(f"\nProcessando categoria: {category_dir.name}")
+        for file in files:
+            try:
+                content = file.read_text(errors="ignore")
                 
-                for file in category_dir.glob("*"):
-                    try:
-                        content = file.read_text(errors="ignore")
-                        
-                        # Adicionar metadados ao conteúdo
-                        metadata = {
-                            "source": file.name,
-                            "category": category_dir.name,
-                            "type": "pdf" if file.suffix == ".pdf" else "markdown"
-                        }
-                        
-                        texts.append({"content": content, "metadata": metadata})
-                        logger.info(f"✅ Processado: {file.name}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao processar {file.name}: {e}")
+                # Adicionar metadados ao conteúdo
+                metadata = {
+                    "source": file.name,
+                    "category": category,
+                    "type": "pdf" if file.suffix == ".pdf" else "markdown"
+                }
+                
+                texts.append({"content": content, "metadata": metadata})
+                logger.info(f"✅ Processado: {file.name}")
+                
+            except Exception as e:
+                logger.error(f"❌ Erro ao processar {file.name}: {e}")
 
         if not texts:
-            logger.warning("⚠️ Nenhum documento encontrado para indexar!")
-            return
+            logger.warning(f"⚠️ Nenhum documento na categoria {category}")
+            return 0
 
-        # Configurar o text splitter com parâmetros otimizados
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1500,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        
         # Criar documentos com metadados
-        docs = []
-        for item in texts:
-            chunks = splitter.create_documents(
-                [item["content"]], 
-                metadatas=[item["metadata"]] * len(splitter.split_text(item["content"]))
-            )
-            docs.extend(chunks)
+        with tracing.span("rag.split", category=category, documents=len(texts)) as sp:
+            docs = split_documents(texts)
+            sp.set(chunks=len(docs))
 
         # Criar embeddings e persistir
+        previous = rag_shards.load_registry().get(category, {}).get("collection")
+        collection = None
         try:
-            embeddings = OllamaEmbeddings(model="llama3")
-            db = Chroma.from_documents(
-                docs, 
-                embeddings, 
-                persist_directory=str(DB_DIR),
-                collection_metadata={
-                    "last_update": datetime.now().isoformat(),
-                    "document_count": len(docs)
-                }
-            )
-            db.persist()
-            
-            self.last_update = datetime.now()
-            logger.info(f"\n✅ Base de conhecimento atualizada com sucesso!")
-            logger.info(f"📊 Estatísticas:")
-            logger.info(f"   - Documentos processados: {len(texts)}")
-            logger.info(f"   - Chunks gerados: {len(docs)}")
-            logger.info(f"   - Downloads com sucesso: {self.download_stats['success']}")
-            logger.info(f"   - Downloads falhos: {self.download_stats['failed']}")
+            started = time.perf_counter()
+            backends = []
+            if RAG_BACKEND in ("chroma", "auto"):
+                # A coleção nova é gravada ao lado da atual, que segue valendo até o registro ser trocado
+                collection = rag_shards.collection_name(category, build=f"{time.time_ns():x}")
+                with tracing.span("rag.embed", category=category, chunks=len(docs)):
+                    db = Chroma.from_documents(
+                        docs, 
+                        embeddings, 
+                        collection_name=collection,
+                        persist_directory=str(DB_DIR),
+                        collection_metadata={
+                            "hnsw:space": "cosine",
+                            "category": category,
+                            "last_update": datetime.now().isoformat(),
+                            "document_count": len(docs)
+                        }
+                    )
+                    db.persist()
+                monitoring_check.record_embedding(len(docs), time.perf_counter() - started, backend="ollama")
+                backends.append("chroma")
+                if RAG_BACKEND == "auto":
+                    # Reaproveita os vetores já calculados: o índice compacto espelha a coleção do Chroma
+                    data = db.get(include=["embeddings", "documents", "metadatas"])
+                    write_compact_index(rag_shards.shard_dir(category, COMPACT_DIR),
+                                        data["embeddings"], data["documents"], data["metadatas"])
+                    backends.append("compact")
+            else:
+                with tracing.span("rag.embed", category=category, chunks=len(docs)):
+                    vectors = embeddings.embed_documents([d.page_content for d in docs])
+                monitoring_check.record_embedding(len(docs), time.perf_counter() - started, backend="ollama")
+                write_compact_index(rag_shards.shard_dir(category, COMPACT_DIR),
+                                    vectors, [d.page_content for d in docs], [d.metadata for d in docs])
+                backends.append("compact")
+
+            rag_shards.record_shard(category, len(docs), fingerprint, backends, collection=collection)
+            if previous != collection:
+                drop_collection(previous)
+            return len(docs)
             
         except Exception as e:
-            logger.error(f"❌ Erro ao criar índice vetorial: {e}")
+            # O registro continua apontando para a coleção anterior, intacta
+            drop_collection(collection)
+            logger.error(f"❌ Erro ao criar índice vetorial da categoria {category}: {e}")
+            return 0
 
 def main():
     """
     Main function to run the knowledge base loader
     """
+    parser = argparse.ArgumentParser(description="Baixa e indexa a base de conhecimento (um shard por categoria)")
+    parser.add_argument("--categoria", action="append", dest="categories",
+                        help="Reconstrói apenas esta categoria (pode repetir)")
+    parser.add_argument("--force", action="store_true", help="Reconstrói mesmo sem mudanças nos arquivos")
+    args = parser.parse_args()
     try:
         loader = KnowledgeBaseLoader()
         loader.download_docs()
-        loader.build_index()
+        loader.build_index(args.categories, force=args.force)
     except KeyboardInterrupt:
         logger.info("\n ⚠️ Processo interrompido pelo usuário")
     except Exception as e:
@@ -0,0 +1,261 @@
+# Shards da base de conhecimento por categoria + roteamento de consultas
+"""
+A base de conhecimento é particionada pela metadata `category` (OWASP, NIST,
+Cloud Native, ...): cada categoria vira uma coleção própria no Chroma
+(`kb-<slug>`) e um índice compacto próprio (`vector_index/<slug>/`).
+
+- `rag_loader` reconstrói só as categorias cujos arquivos mudaram (ou as
+  pedidas explicitamente) e registra cada shard em `shards.json`;
+- `route()` escolhe os shards relevantes para a pergunta por palavras-chave,
+  ou usa o filtro explícito passado ao `perguntar`;
+- `open_retriever()` monta um retriever LangChain que embeda a pergunta uma
+  única vez, consulta apenas os shards escolhidos e funde os top-k.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from tools import vector_index
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.retrievers import BaseRetriever
+except ImportError:
+    Document = None
+    BaseRetriever = None
+
+ROOT_DIR = Path.home() / "projetos/devsecops"
+DB_DIR = ROOT_DIR / "chromadb"
+COMPACT_DIR = ROOT_DIR / "vector_index"
+REGISTRY_FILE = ROOT_DIR / "shards.json"
+
+# Backend da base: "auto" (Chroma + índice compacto na indexação; compacto quando existir na
+# consulta), "chroma" ou "compact". "both" é aceito como sinônimo antigo de "auto".
+BACKENDS = ("auto", "chroma", "compact")
+RAG_BACKEND = os.environ.get("DEVSECOPS_RAG_BACKEND", "auto").lower().replace("both", "auto")
+if RAG_BACKEND not in BACKENDS:
+    RAG_BACKEND = "auto"
+
+# Palavras-chave que direcionam a pergunta para cada categoria (sem acentos, minúsculas).
+# O próprio nome da categoria também conta como palavra-chave.
+ROUTES: Dict[str, Tuple[str, ...]] = {
+    "OWASP": ("owasp", "top 10", "top10", "asvs", "injection", "injecao", "xss", "csrf", "ssrf",
+              "broken access", "autenticacao", "authentication", "api security", "proactive controls"),
+    "NIST": ("nist", "ssdf", "800-218", "800-190", "800-204", "sp 800", "secure software development framework"),
+    "Cloud Native": ("cncf", "cloud native", "cloud-native", "whitepaper", "security assessment"),
+    "CIS Benchmarks": ("cis", "benchmark", "hardening", "docker bench", "kube-bench"),
+    "DevSecOps": ("devsecops", "pipeline", "ci/cd", "cicd", "gitlab", "github", "shift left", "shift-left"),
+    "Best Practices": ("boas praticas", "best practice", "best practices", "aws", "cloud security",
+                       "container security", "kubernetes security"),
+}
+
+
+def slugify(category: str) -> str:
+    """'Cloud Native' -> 'cloud-native'"""
+    text = unicodedata.normalize("NFKD", category).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "default"
+
+
+def collection_name(category: str, build: Optional[str] = None) -> str:
+    """
+    Nome da coleção do Chroma para a categoria (3-63 caracteres)
+
+    Com `build`, o nome ganha o sufixo da reconstrução (`kb-owasp-<build>`): a
+    coleção nova é gravada ao lado da atual e só passa a valer quando o
+    registro for atualizado.
+    """
+    name = f"kb-{slugify(category)}"
+    if build is None:
+        return name[:63]
+    return f"{name[:62 - len(build)]}-{build}"
+
+
+def shard_dir(category: str, root: Path = COMPACT_DIR) -> Path:
+    return Path(root) / slugify(category)
+
+
+def _fold(text: str) -> str:
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+
+
+# --------------------------------------------------------------------------- registro
+def load_registry(path: Path = REGISTRY_FILE) -> Dict[str, Dict[str, Any]]:
+    """Shards registrados: {categoria: {slug, collection, space, chunks, fingerprint, backends, updated}}"""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8")).get("shards", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_registry(shards: Dict[str, Dict[str, Any]], path: Path = REGISTRY_FILE) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"version": 1, "shards": shards}, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def record_shard(category: str, chunks: int, fingerprint: str, backends: Iterable[str],
+                 collection: Optional[str] = None, path: Path = REGISTRY_FILE) -> None:
+    """
+    Registra (ou atualiza) um shard recém-reconstruído
+
+    Args:
+        collection: Coleção do Chroma gravada (None quando só há índice compacto);
+            coleções novas usam a métrica de cosseno
+    """
+    shards = load_registry(path)
+    shards[category] = {
+        "slug": slugify(category),
+        "collection": collection,
+        "space": "cosine" if collection else None,
+        "chunks": chunks,
+        "fingerprint": fingerprint,
+        "backends": sorted(backends),
+        "updated": datetime.now().isoformat(),
+    }
+    save_registry(shards, path)
+
+
+# --------------------------------------------------------------------------- roteamento
+def resolve_categories(names: Iterable[str], available: Iterable[str]) -> List[str]:
+    """
+    Converte nomes informados pelo usuário (nome ou slug, sem diferenciar caixa) em categorias
+
+    Raises:
+        ValueError: se algum nome não corresponder a um shard existente
+    """
+    lookup = {}
+    for category in available:
+        lookup[_fold(category)] = category
+        lookup[slugify(category)] = category
+    selected, unknown = [], []
+    for name in names:
+        category = lookup.get(_fold(name.strip())) or lookup.get(slugify(name))
+        if category is None:
+            unknown.append(name)
+        elif category not in selected:
+            selected.append(category)
+    if unknown:
+        raise ValueError(f"categoria(s) desconhecida(s): {', '.join(unknown)}. "
+                         f"Disponíveis: {', '.join(sorted(set(lookup.values())))}")
+    return selected
+
+
+def route(query: str, available: Iterable[str], explicit: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Escolhe os shards a consultar
+
+    Args:
+        query: Pergunta do usuário
+        available: Categorias com shard construído
+        explicit: Filtro explícito (tem precedência sobre as palavras-chave)
+
+    Returns:
+        Categorias selecionadas; todas as disponíveis se nenhuma palavra-chave casar
+    """
+    available = list(available)
+    if explicit:
+        return resolve_categories(explicit, available)
+    folded = _fold(query)
+    selected = []
+    for category in available:
+        keywords = ROUTES.get(category, ()) + (_fold(category),)
+        if any(re.search(rf"(?<![a-z0-9]){re.escape(k)}(?![a-z0-9])", folded) for k in keywords):
+            selected.append(category)
+    return selected or available
+
+
+# --------------------------------------------------------------------------- retriever
+def _chroma_cosine(db: Any, space: Optional[str], vector: List[float], k: int) -> List[Tuple[float, Any]]:
+    """
+    Top-k de uma coleção do Chroma com similaridade de cosseno
+
+    A distância do Chroma não é comparável à similaridade do índice compacto;
+    ela é convertida para cosseno, na mesma escala de `CompactIndex.query`.
+    Coleções gravadas com `hnsw:space=cosine` devolvem 1 - cosseno; nas antigas
+    (L2 ao quadrado) a conversão 1 - d/2 só é exata para embeddings
+    normalizados — o rag_loader reconstrói esses shards na próxima execução.
+    """
+    scored = []
+    for doc, distance in db.similarity_search_by_vector_with_relevance_scores(vector, k=k):
+        score = 1.0 - float(distance) if space == "cosine" else 1.0 - float(distance) / 2.0
+        scored.append((score, Document(page_content=doc.page_content,
+                                       metadata={**(doc.metadata or {}), "score": score})))
+    return scored
+
+
+if BaseRetriever is not None:
+    class ShardedRetriever(BaseRetriever):
+        """Consulta vários shards com um único embedding da pergunta e funde os top-k"""
+
+        embeddings: Any
+        shards: List[Any]  # CompactIndex ou (Chroma, métrica da coleção)
+        k: int = 3
+
+        def _get_relevant_documents(self, query: str, *, run_manager=None) -> List:
+            vector = self.embeddings.embed_query(query)
+            scored = []
+            for shard in self.shards:
+                if isinstance(shard, vector_index.CompactIndex):
+                    for item in shard.query(vector, self.k):
+                        doc = Document(page_content=item["text"], metadata={**item["metadata"], "score": item["score"]})
+                        scored.append((item["score"], doc))
+                else:
+                    scored.extend(_chroma_cosine(*shard, vector, self.k))
+            scored.sort(key=lambda pair: pair[0], reverse=True)
+            return [doc for _, doc in scored[:self.k]]
+else:
+    ShardedRetriever = None
+
+
+def open_retriever(query: str, embeddings: Any, categories: Optional[Iterable[str]] = None,
+                   backend: str = "auto", k: int = 3) -> Tuple[Any, List[str]]:
+    """
+    Monta o retriever para a pergunta, abrindo apenas os shards relevantes
+
+    Sem shards registrados (base indexada antes do particionamento), usa o
+    índice único antigo: o compacto na raiz de COMPACT_DIR ou a coleção padrão
+    do Chroma.
+
+    Args:
+        query: Pergunta (usada no roteamento)
+        embeddings: Embeddings LangChain usados na indexação
+        categories: Filtro explícito de categorias
+        backend: "auto" (compacto quando existir), "compact" ou "chroma"
+        k: Quantidade de trechos devolvidos
+
+    Returns:
+        Tupla (retriever, categorias consultadas — vazia no índice único)
+    """
+    model = getattr(embeddings, "model", None)
+    registry = load_registry()
+    if not registry:
+        if categories:
+            raise ValueError("a base não está particionada por categoria; execute rag_loader.py novamente")
+        if backend != "chroma" and vector_index.exists(COMPACT_DIR):
+            return vector_index.CompactRetriever(index=vector_index.CompactIndex(COMPACT_DIR, model),
+                                                 embeddings=embeddings, k=k), []
+        from langchain_community.vectorstores import Chroma
+        db = Chroma(persist_directory=str(DB_DIR), embedding_function=embeddings)
+        return db.as_retriever(search_kwargs={"k": k}), []
+
+    selected = route(query, registry, categories)
+    shards = []
+    for category in selected:
+        info = registry[category]
+        use_compact = (backend == "compact" or not info.get("collection")
+                       or (backend != "chroma" and "compact" in info.get("backends", ())))
+        if use_compact:
+            shards.append(vector_index.CompactIndex(shard_dir(category), model))
+        else:
+            from langchain_community.vectorstores import Chroma
+            db = Chroma(collection_name=info["collection"], persist_directory=str(DB_DIR),
+                        embedding_function=embeddings)
+            shards.append((db, info.get("space")))
+    return ShardedRetriever(embeddings=embeddings, shards=shards, k=k), selected
@@ -25,6 +25,8 @@ import subprocess
 import tempfile
 import asyncio
 
+from tools import monitoring_check, tracing
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -57,7 +59,8 @@ TRANSLATIONS = {
         "next_steps": "Próximos Passos",
         "critical_findings": "Problemas Críticos",
         "warnings": "Avisos",
-        "suggestions": "Sugestões"
+        "suggestions": "Sugestões",
+        "delta": "Mudanças desde a última execução"
     },
     "en": {
         "report_title": "DevSecOps Report",
@@ -69,7 +72,8 @@ TRANSLATIONS = {
         "next_steps": "Next Steps",
         "critical_findings": "Critical Findings",
         "warnings": "Warnings",
-        "suggestions": "Suggestions"
+        "suggestions": "Suggestions",
+        "delta": "Changes since last run"
     }
 }
 
@@ -120,6 +124,7 @@ class DevSecOpsReport:
         """Retorna a string traduzida para a chave dada, conforme o locale."""
         return TRANSLATIONS.get(self.locale, TRANSLATIONS["pt"]).get(key, key)
 
+    @tracing.traced("report.chart")
     def _generate_severity_chart(self) -> str:
         """Gera gráfico de severidade das vulnerabilidades"""
         severity_counts = {
@@ -160,6 +165,11 @@ class DevSecOpsReport:
         if "executive_summary" in self.summaries:
             sections.append(self.summaries["executive_summary"])
 
+        # Mudanças desde a execução anterior (histórico de achados)
+        if "delta" in self.summaries:
+            sections.append(f"\n## 🔁 {self._t('delta')}")
+            sections.append(self.summaries["delta"])
+
         # Métricas
         sections.append(f"\n## 📈 {self._t('metrics')}")
         for name, value in self.metrics.items():
@@ -213,6 +223,10 @@ class DevSecOpsReport:
         if "executive_summary" in self.summaries:
             html_parts.append(f"<p>{self.summaries['executive_summary']}</p>")
 
+        if "delta" in self.summaries:
+            html_parts.append(f"<h2>{self._t('delta')}</h2>")
+            html_parts.append(f"<pre>{self.summaries['delta']}</pre>")
+
         # Metrics
         html_parts.append(f"<h2>{self._t('metrics')}</h2>")
         if self.metrics:
@@ -375,6 +389,7 @@ class DevSecOpsReport:
         logger.info(f"Dados JSON exportados para: {output_path}")
         return str(output_path)
 
+@tracing.traced("report.create")
 def create_report(
     project_name: str,
     findings: List[Dict],
@@ -416,9 +431,14 @@ def create_report(
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Gerar relatórios em diferentes formatos
-    report.to_markdown(output_dir / "report.md")
-    report.to_html(output_dir / "report.html")
-    report.to_pdf(output_dir / "report.pdf")
-    report.export_json(output_dir / "report.json")
+    render = monitoring_check.REPORT_RENDER_DURATION
+    with tracing.span("report.markdown"), render.time(format="markdown"):
+        report.to_markdown(output_dir / "report.md")
+    with tracing.span("report.html"), render.time(format="html"):
+        report.to_html(output_dir / "report.html")
+    with tracing.span("report.pdf"), render.time(format="pdf"):
+        report.to_pdf(output_dir / "report.pdf")
+    with tracing.span("report.json"), render.time(format="json"):
+        report.export_json(output_dir / "report.json")
     
     return report
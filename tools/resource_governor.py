@@ -0,0 +1,482 @@
+# Governança de recursos para os subprocessos dos scanners
+"""
+Camada única de execução para Trivy, Bandit (CLI), ZAP e demais scanners
+externos:
+
+- limites por ferramenta de CPU, memória e prioridade (nice/ionice), via
+  cgroup v2 quando o processo pode criar sub-cgroups delegados, ou via
+  rlimits (RLIMIT_CPU/RLIMIT_DATA) como alternativa;
+- admissão: trabalho cujo limite de memória não cabe na memória disponível
+  da máquina é recusado antes de iniciar;
+- contabilidade: pico de RSS e tempo de CPU de cada execução (wait4 ou
+  memory.peak/cpu.stat do cgroup), exportados como métricas;
+- execuções que estouram o orçamento são marcadas com o limite atingido em
+  vez de devolver saída parcial como se fosse um resultado válido.
+
+Para scanners que rodam em container (`docker run`), os limites são
+repassados ao Docker com `docker_flags()`. Workers Python de longa duração
+(pool do Bandit) aplicam os limites a si mesmos com `govern_process()` e
+medem cada tarefa com `cpu_budget()`.
+"""
+
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows: sem rlimits, apenas timeout e medições de tempo
+    resource = None
+
+from tools import monitoring_check, tracing
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+# Mensagens de falha de alocação (Python, Go/Trivy, libc) quando o RLIMIT_DATA é atingido
+OOM_MARKERS = ("memoryerror", "out of memory", "cannot allocate memory")
+
+
+@dataclass
+class ResourceLimits:
+    """Limites de uma execução (None = sem limite)"""
+    cpu_seconds: Optional[int] = None
+    memory_mb: Optional[int] = None
+    cpus: Optional[float] = None          # cota de CPU (cgroup cpu.max / docker --cpus)
+    reserve_mb: Optional[int] = None      # memória livre exigida para iniciar (admissão)
+    nice: int = 10
+    ionice_class: Optional[int] = 2       # 1=realtime, 2=best-effort, 3=idle
+    ionice_level: int = 7
+    timeout: Optional[float] = 300
+
+
+# Limites padrão por ferramenta; sobrescreva com DEVSECOPS_LIMITS_<TOOL>="memory_mb=4096,cpus=2"
+DEFAULT_LIMITS: Dict[str, ResourceLimits] = {
+    "trivy": ResourceLimits(cpu_seconds=900, memory_mb=2048, cpus=2, reserve_mb=512, timeout=300),
+    "bandit": ResourceLimits(cpu_seconds=600, memory_mb=1024, cpus=2, reserve_mb=128, timeout=300),
+    "zap": ResourceLimits(memory_mb=2048, cpus=2, reserve_mb=768, timeout=600),
+}
+
+
+class ResourceBudgetError(RuntimeError):
+    """Execução recusada (sem recursos disponíveis) ou interrompida por exceder o orçamento"""
+
+
+@dataclass
+class GovernedResult:
+    """Resultado de uma execução governada"""
+    returncode: int
+    stdout: str
+    stderr: str
+    wall_seconds: float
+    cpu_seconds: Optional[float] = None
+    peak_rss_mb: Optional[float] = None
+    limited_by: Optional[str] = None      # "cpu", "memory" ou "timeout"
+    backend: str = "none"                 # "cgroup", "rlimit" ou "none"
+
+
+def limits_for(tool: str) -> ResourceLimits:
+    """Limites da ferramenta com os ajustes de DEVSECOPS_LIMITS_<TOOL>"""
+    limits = DEFAULT_LIMITS.get(tool, ResourceLimits())
+    spec = os.environ.get(f"DEVSECOPS_LIMITS_{tool.upper()}", "")
+    overrides = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        key, value = (part.strip() for part in item.split("=", 1))
+        if key not in ResourceLimits.__dataclass_fields__:
+            continue
+        if value.lower() in ("", "none"):
+            overrides[key] = None
+        else:
+            try:
+                overrides[key] = float(value) if key in ("cpus", "timeout") else int(value)
+            except ValueError:
+                pass
+    return replace(limits, **overrides)
+
+
+def available_memory_mb() -> Optional[float]:
+    """MemAvailable do kernel (None fora do Linux)"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def admit(tool: str, limits: ResourceLimits) -> None:
+    """
+    Controle de admissão: recusa a execução se a reserva de memória não cabe na máquina agora
+
+    A reserva (`reserve_mb`) é o uso esperado, não o teto (`memory_mb`): um
+    runner pequeno ainda executa o scanner, que só é interrompido se de fato
+    passar do teto.
+
+    Raises:
+        ResourceBudgetError
+    """
+    available = available_memory_mb()
+    if limits.reserve_mb and available is not None and available < limits.reserve_mb:
+        monitoring_check.SCANNER_REJECTED.inc(tool=tool, reason="admission")
+        raise ResourceBudgetError(
+            f"{tool}: memória disponível ({available:.0f} MB) abaixo da reserva ({limits.reserve_mb} MB)")
+
+
+def docker_flags(tool: str) -> List[str]:
+    """Flags de `docker run` equivalentes aos limites da ferramenta"""
+    limits = limits_for(tool)
+    flags = []
+    if limits.memory_mb:
+        flags += ["--memory", f"{limits.memory_mb}m", "--memory-swap", f"{limits.memory_mb}m"]
+    if limits.cpus:
+        flags += ["--cpus", str(limits.cpus)]
+    return flags
+
+
+# --------------------------------------------------------------------------- cgroup v2
+class _Cgroup:
+    """Sub-cgroup v2 temporário; só funciona quando o cgroup atual é delegado a este usuário"""
+
+    def __init__(self, tool: str, limits: ResourceLimits):
+        own = _own_cgroup()
+        if own is None:
+            raise OSError("cgroup v2 indisponível")
+        self.path = own / f"devsecops-{tool}-{os.getpid()}-{threading.get_ident()}"
+        self.path.mkdir()
+        try:
+            if limits.memory_mb:
+                (self.path / "memory.max").write_text(str(limits.memory_mb * 1024 * 1024))
+                swap = self.path / "memory.swap.max"
+                if swap.exists():
+                    swap.write_text("0")
+            if limits.cpus:
+                period = 100000
+                (self.path / "cpu.max").write_text(f"{int(limits.cpus * period)} {period}")
+        except OSError:
+            self.remove()
+            raise
+
+    def attach_self(self) -> None:
+        """Chamado no filho antes do exec: entra no cgroup"""
+        (self.path / "cgroup.procs").write_text(str(os.getpid()))
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        peak = cpu = None
+        oom = False
+        try:
+            peak = int((self.path / "memory.peak").read_text()) / (1024 * 1024)
+        except (OSError, ValueError):
+            pass
+        try:
+            for line in (self.path / "cpu.stat").read_text().splitlines():
+                if line.startswith("usage_usec"):
+                    cpu = int(line.split()[1]) / 1e6
+        except (OSError, ValueError):
+            pass
+        try:
+            for line in (self.path / "memory.events").read_text().splitlines():
+                if line.startswith("oom_kill") and int(line.split()[1]) > 0:
+                    oom = True
+        except (OSError, ValueError):
+            pass
+        return {"peak_rss_mb": peak, "cpu_seconds": cpu, "oom": oom}
+
+    def remove(self) -> None:
+        try:
+            self.path.rmdir()
+        except OSError:
+            pass
+
+
+def _own_cgroup() -> Optional[Path]:
+    if not (CGROUP_ROOT / "cgroup.controllers").exists():
+        return None  # hierarquia v1 ou híbrida
+    try:
+        with open("/proc/self/cgroup") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    path = CGROUP_ROOT / line[3:].strip().lstrip("/")
+                    controllers = (path / "cgroup.subtree_control").read_text().split()
+                    if "memory" in controllers and os.access(path, os.W_OK):
+                        return path
+    except OSError:
+        pass
+    return None
+
+
+# --------------------------------------------------------------------------- execução
+def _preexec(limits: ResourceLimits, cgroup: Optional[_Cgroup]):
+    def apply():
+        if cgroup is not None:
+            cgroup.attach_self()
+        if resource is not None and limits.cpu_seconds:
+            # cpu.max só limita a taxa; o total de CPU vale também com cgroup
+            resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + 5))
+        if cgroup is None and resource is not None and limits.memory_mb:
+            # RLIMIT_DATA (e não RLIMIT_AS): runtimes como o do Go reservam muito espaço virtual
+            size = limits.memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_DATA, (size, size))
+        if limits.nice:
+            os.nice(limits.nice)
+    return apply
+
+
+def _ionice_prefix(limits: ResourceLimits) -> List[str]:
+    if limits.ionice_class is None or not shutil.which("ionice"):
+        return []
+    prefix = ["ionice", "-c", str(limits.ionice_class)]
+    if limits.ionice_class in (1, 2):
+        prefix += ["-n", str(limits.ionice_level)]
+    return prefix
+
+
+# --------------------------------------------------------------------------- workers em processo
+class _CPUBudgetHit(BaseException):
+    """Levantada pelo SIGXCPU; BaseException para não ser engolida por `except Exception` do scanner"""
+
+
+def govern_process(tool: str, limits: Optional[ResourceLimits] = None) -> None:
+    """
+    Aplica ao processo atual a prioridade e o limite de memória da ferramenta
+
+    Para workers que executam o scanner como biblioteca (sem exec): chame no
+    inicializador do worker. O limite de CPU não é aplicado aqui, pois o
+    processo atende várias tarefas; use `cpu_budget()` em cada uma.
+    """
+    limits = limits or limits_for(tool)
+    if resource is not None and limits.memory_mb:
+        size = limits.memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (size, size))
+    if limits.nice:
+        os.nice(limits.nice)
+    prefix = _ionice_prefix(limits)
+    if prefix:
+        subprocess.run(prefix + ["-p", str(os.getpid())], capture_output=True)
+
+
+@contextmanager
+def cpu_budget(tool: str, limits: Optional[ResourceLimits] = None) -> Iterator[Dict[str, Optional[float]]]:
+    """
+    Limita o tempo de CPU de uma tarefa no processo atual e mede o consumo
+
+    O RLIMIT_CPU do processo é ajustado para o CPU já usado + `cpu_seconds` e
+    restaurado ao final. Só deve ser usado na thread principal de um processo
+    dedicado (worker), pois o limite e o SIGXCPU valem para o processo todo.
+
+    Yields:
+        Dict preenchido ao final com cpu_seconds e peak_rss_mb da tarefa
+
+    Raises:
+        ResourceBudgetError: a tarefa excedeu o limite de CPU
+    """
+    limits = limits or limits_for(tool)
+    usage: Dict[str, Optional[float]] = {"cpu_seconds": None, "peak_rss_mb": None}
+    if resource is None:
+        yield usage
+        return
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    used = before.ru_utime + before.ru_stime
+    previous = resource.getrlimit(resource.RLIMIT_CPU)
+    handler = None
+    if limits.cpu_seconds:
+        soft, hard = int(used) + limits.cpu_seconds + 1, previous[1]
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+        def on_xcpu(signum, frame):
+            raise _CPUBudgetHit()
+
+        handler = signal.signal(signal.SIGXCPU, on_xcpu)
+    try:
+        yield usage
+    except _CPUBudgetHit:
+        raise ResourceBudgetError(f"{tool}: tarefa excedeu o limite de CPU ({limits.cpu_seconds}s)") from None
+    finally:
+        if handler is not None:
+            resource.setrlimit(resource.RLIMIT_CPU, previous)
+            signal.signal(signal.SIGXCPU, handler)
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        usage["cpu_seconds"] = after.ru_utime + after.ru_stime - used
+        usage["peak_rss_mb"] = after.ru_maxrss / 1024  # KiB no Linux
+
+
+def record_usage(tool: str, cpu_seconds: Optional[float] = None, peak_rss_mb: Optional[float] = None,
+                 limited_by: Optional[str] = None) -> None:
+    """Exporta nas métricas do scanner o consumo medido fora de `run` (ex.: por lote de um worker)"""
+    _record(tool, GovernedResult(0, "", "", 0.0, cpu_seconds=cpu_seconds, peak_rss_mb=peak_rss_mb,
+                                 limited_by=limited_by))
+
+
+def run(cmd: Sequence[str], tool: str, limits: Optional[ResourceLimits] = None,
+        check_admission: bool = True, record_usage: bool = True) -> GovernedResult:
+    """
+    Executa um comando de scanner sob os limites da ferramenta
+
+    Args:
+        cmd: Comando em lista (nunca via shell)
+        tool: Nome da ferramenta (chave dos limites e das métricas)
+        limits: Limites explícitos (padrão: `limits_for(tool)`)
+        check_admission: Recusa antes de iniciar se não houver memória disponível
+        record_usage: Exporta pico de RSS e CPU nas métricas do scanner
+
+    Returns:
+        GovernedResult com saída, pico de RSS, CPU e o limite atingido (se algum)
+
+    Raises:
+        ResourceBudgetError: se a execução for recusada na admissão
+        FileNotFoundError: se o executável não existir
+    """
+    limits = limits or limits_for(tool)
+    if shutil.which(cmd[0]) is None:
+        raise FileNotFoundError(f"executável não encontrado: {cmd[0]}")
+    if check_admission:
+        admit(tool, limits)
+
+    with tracing.span(f"governor.{tool}", memory_mb=limits.memory_mb, cpu_seconds=limits.cpu_seconds) as sp:
+        if resource is None:
+            return _run_portable(cmd, tool, limits, record_usage)
+
+        cgroup = None
+        try:
+            cgroup = _Cgroup(tool, limits)
+        except OSError:
+            cgroup = None
+
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            _ionice_prefix(limits) + list(cmd),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            preexec_fn=_preexec(limits, cgroup), start_new_session=True,
+        )
+        out: List[bytes] = []
+        err: List[bytes] = []
+        readers = [threading.Thread(target=lambda s=s, b=b: b.append(s.read()), daemon=True)
+                   for s, b in ((proc.stdout, out), (proc.stderr, err))]
+        for t in readers:
+            t.start()
+
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                pass
+
+        timer = threading.Timer(limits.timeout, on_timeout) if limits.timeout else None
+        if timer:
+            timer.start()
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            if timer:
+                timer.cancel()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        for t in readers:
+            t.join()
+        proc.stdout.close()
+        proc.stderr.close()
+
+        result = GovernedResult(
+            returncode=proc.returncode,
+            stdout=b"".join(out).decode("utf-8", "replace"),
+            stderr=b"".join(err).decode("utf-8", "replace"),
+            wall_seconds=time.perf_counter() - started,
+            cpu_seconds=usage.ru_utime + usage.ru_stime,
+            peak_rss_mb=usage.ru_maxrss / 1024,  # KiB no Linux
+            backend="cgroup" if cgroup else "rlimit",
+        )
+        oom = False
+        if cgroup is not None:
+            stats = cgroup.stats()
+            result.peak_rss_mb = stats["peak_rss_mb"] or result.peak_rss_mb
+            result.cpu_seconds = stats["cpu_seconds"] or result.cpu_seconds
+            oom = stats["oom"]
+            cgroup.remove()
+
+        result.limited_by = _limit_hit(result, limits, timed_out.is_set(), oom)
+        sp.set(peak_rss_mb=round(result.peak_rss_mb or 0, 1), cpu_s=round(result.cpu_seconds or 0, 2),
+               backend=result.backend, limited_by=result.limited_by)
+
+    _record(tool, result, record_usage)
+    return result
+
+
+def run_container(args: Sequence[str], tool: str) -> GovernedResult:
+    """
+    `docker run` governado: os limites de memória/CPU vão para o container
+
+    O processo local é só o cliente Docker, então ele recebe apenas o timeout e
+    a prioridade; pico de RSS e CPU do cliente não são registrados como se
+    fossem do scanner.
+
+    Args:
+        args: Argumentos após `docker run` (flags, imagem e comando)
+        tool: Nome da ferramenta
+
+    Raises:
+        ResourceBudgetError: se a execução for recusada na admissão
+    """
+    limits = limits_for(tool)
+    admit(tool, limits)
+    client = replace(limits, cpu_seconds=None, memory_mb=None, cpus=None)
+    cmd = ["docker", "run", *docker_flags(tool), *args]
+    return run(cmd, tool, limits=client, check_admission=False, record_usage=False)
+
+
+def _limit_hit(result: GovernedResult, limits: ResourceLimits, timed_out: bool, oom: bool) -> Optional[str]:
+    if timed_out:
+        return "timeout"
+    if oom or result.returncode == -signal.SIGKILL and limits.memory_mb and \
+            result.peak_rss_mb and result.peak_rss_mb >= limits.memory_mb * 0.9:
+        return "memory"
+    # SIGXCPU só vem do RLIMIT_CPU; o SIGKILL do limite rígido é confirmado pelo tempo medido
+    if limits.cpu_seconds and (result.returncode == -signal.SIGXCPU or result.returncode == -signal.SIGKILL
+                               and result.cpu_seconds and result.cpu_seconds >= limits.cpu_seconds):
+        return "cpu"
+    if result.returncode != 0 and limits.memory_mb and any(m in result.stderr.lower() for m in OOM_MARKERS):
+        return "memory"
+    return None
+
+
+def _run_portable(cmd: Sequence[str], tool: str, limits: ResourceLimits, record_usage: bool) -> GovernedResult:
+    started = time.perf_counter()
+    try:
+        res = subprocess.run(list(cmd), capture_output=True, text=True, timeout=limits.timeout)
+        result = GovernedResult(res.returncode, res.stdout, res.stderr, time.perf_counter() - started)
+    except subprocess.TimeoutExpired as e:
+        result = GovernedResult(-1, e.stdout or "", e.stderr or "", time.perf_counter() - started,
+                                limited_by="timeout")
+    _record(tool, result, record_usage)
+    return result
+
+
+def _record(tool: str, result: GovernedResult, record_usage: bool = True) -> None:
+    if record_usage and result.peak_rss_mb is not None:
+        monitoring_check.SCANNER_PEAK_RSS.observe(result.peak_rss_mb, tool=tool)
+    if record_usage and result.cpu_seconds is not None:
+        monitoring_check.SCANNER_CPU_SECONDS.observe(result.cpu_seconds, tool=tool)
+    if result.limited_by:
+        monitoring_check.SCANNER_REJECTED.inc(tool=tool, reason=result.limited_by)
+
+
+def describe_limit(tool: str, result: GovernedResult) -> str:
+    """Mensagem de erro padronizada para execuções interrompidas pelo orçamento"""
+    limits = limits_for(tool)
+    detail = {
+        "memory": f"memória ({limits.memory_mb} MB; pico {result.peak_rss_mb or 0:.0f} MB)",
+        "cpu": f"CPU ({limits.cpu_seconds}s; usado {result.cpu_seconds or 0:.0f}s)",
+        "timeout": f"tempo ({limits.timeout:.0f}s)",
+    }.get(result.limited_by, result.limited_by)
+    return f"[Erro {tool}: execução interrompida por exceder o orçamento de {detail}]"
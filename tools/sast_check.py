@@ -1,6 +1,8 @@
 # SAST helpers (Bandit + SonarQube)
-import subprocess
+import json
+from tools import bandit_pool, resource_governor, tracing
 
+@tracing.traced("sast.bandit")
 def run_bandit(path='.'):
     """
     Executa análise SAST usando Bandit
@@ -10,14 +12,45 @@ def run_bandit(path='.'):
         Output do Bandit em formato JSON
     """
     try:
-        cmd = f"bandit -r {path} -f json"
-        res = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
+        # API Python: sem shell e sem recarregar plugins a cada chamada (ver bandit_pool)
+        return json.dumps(bandit_pool.scan([path]), indent=2, ensure_ascii=False)
+    except ImportError:
+        pass
+    except TimeoutError:
+        return f"[Erro: Bandit timeout após {resource_governor.limits_for('bandit').timeout:.0f} segundos]"
+    except Exception as e:
+        return f"[Erro Bandit: {e}]"
+
+    # Bandit instalado apenas como executável: argumentos em lista, sem shell
+    try:
+        res = resource_governor.run(["bandit", "-r", str(path), "-f", "json"], "bandit")
+        if res.limited_by == "timeout":
+            return f"[Erro: Bandit timeout após {resource_governor.limits_for('bandit').timeout:.0f} segundos]"
+        if res.limited_by:
+            return resource_governor.describe_limit("bandit", res)
         return res.stdout or res.stderr
-    except subprocess.TimeoutExpired:
-        return "[Erro: Bandit timeout após 300 segundos]"
     except Exception as e:
         return f"[Erro Bandit: {e}]"
 
+def to_findings(report):
+    """
+    Converte o relatório do Bandit (formato `-f json`) em achados (campos de SecurityFinding)
+    Args:
+        report: Dict com a chave `results`, como devolvido por `bandit_pool.scan`
+    Returns:
+        Lista de achados, um por issue
+    """
+    return [{
+        "severity": issue["issue_severity"],
+        "title": f"SAST (Bandit) - {issue['test_id']} {issue['test_name']}",
+        "description": f"{issue['issue_text']}\n\n{issue.get('code', '').rstrip()}".strip(),
+        "recommendation": "Reveja o trecho e aplique a correção indicada na documentação do teste.",
+        "tool": "SAST",
+        "location": f"{issue['filename']}:{issue['line_number']}",
+        "confidence": issue.get("issue_confidence", "MEDIUM"),
+        "references": [issue["more_info"]] if issue.get("more_info") else None,
+    } for issue in report.get("results", [])]
+
 def run_sonarqube_scan(project_key, token):
     """
     Executa análise usando SonarQube
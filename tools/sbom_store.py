@@ -0,0 +1,369 @@
+# SBOM por digest de imagem + re-verificação sem pull
+"""
+Gera o SBOM (CycloneDX) de cada imagem uma única vez por digest e guarda em
+`data/sbom/`. As verificações seguintes cruzam o SBOM salvo com a base de
+vulnerabilidades atual, sem baixar a imagem nem extrair camadas:
+
+- `trivy sbom` sobre o arquivo salvo (com `--offline` usa só a cópia local
+  da base do Trivy: `--skip-db-update --offline-scan`);
+- ou, sem Trivy, os `purl` dos componentes contra o índice OSV local do
+  `sca_check` (pacotes de linguagem, Alpine e Debian/Ubuntu).
+
+O digest vem da própria referência (`imagem@sha256:...`), do Docker local
+(`docker image inspect`, sem pull) ou, sem Docker, do índice de SBOMs; para
+tags não resolvíveis localmente o SBOM é reaproveitado por até
+`DEVSECOPS_SBOM_MAX_AGE_DAYS` dias (padrão 7) e, vencido, é gerado de novo pelo
+próprio `verificar` (exceto com `--sem-gerar`). O `verificar` sai com código 1
+se alguma imagem ficou sem verificação.
+
+Uso:
+    python tools/sbom_store.py gerar nginx:1.25 redis:7
+    python tools/sbom_store.py verificar [--offline] [--osv] [--sem-gerar] [imagem ...]
+    python tools/sbom_store.py listar
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import unquote
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools import monitoring_check, resource_governor, sca_check, tracing
+
+BASE = Path(__file__).resolve().parents[1]
+SBOM_DIR = BASE / "data" / "sbom"
+INDEX_FILE = SBOM_DIR / "index.json"
+
+# Tags que não puderam ser resolvidas para um digest reaproveitam o SBOM por este tempo
+MAX_AGE_SECONDS = float(os.environ.get("DEVSECOPS_SBOM_MAX_AGE_DAYS", "7")) * 86400
+# Usa somente a cópia local da base do Trivy (sem download)
+OFFLINE = os.environ.get("DEVSECOPS_TRIVY_OFFLINE", "").lower() in ("1", "true", "yes")
+SEVERITIES = "HIGH,CRITICAL"
+
+# Tipo do purl -> ecossistema do índice OSV (o índice guarda o ecossistema sem a versão da distro)
+PURL_ECOSYSTEMS = {
+    "pypi": "PyPI", "npm": "npm", "golang": "Go", "cargo": "crates.io", "maven": "Maven",
+    "gem": "RubyGems", "nuget": "NuGet", "composer": "Packagist", "hex": "Hex", "pub": "Pub",
+    "apk": "Alpine",
+}
+DEB_NAMESPACES = {"debian": "Debian", "ubuntu": "Ubuntu"}
+
+_DIGEST_RE = re.compile(r"@(sha256:[0-9a-f]{64})$")
+_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------------- purl / digest
+def parse_purl(purl: str) -> Optional[Dict[str, str]]:
+    """
+    'pkg:deb/debian/openssl@3.0.11-1~deb12u2?arch=amd64' -> {type, namespace, name, version}
+
+    Returns:
+        None para purls sem versão ou malformados
+    """
+    if not purl or not purl.startswith("pkg:"):
+        return None
+    body = purl[4:].split("#", 1)[0].split("?", 1)[0]
+    if "@" not in body:
+        return None
+    path, version = body.rsplit("@", 1)
+    parts = [unquote(p) for p in path.strip("/").split("/")]
+    if len(parts) < 2:
+        return None
+    return {"type": parts[0].lower(), "namespace": "/".join(parts[1:-1]), "name": parts[-1],
+            "version": unquote(version)}
+
+
+def osv_package(purl: Dict[str, str]) -> Optional[Tuple[str, str]]:
+    """(ecossistema OSV, nome do pacote) de um purl, ou None se não houver correspondência"""
+    if purl["type"] == "deb":
+        ecosystem = DEB_NAMESPACES.get(purl["namespace"].lower())
+    else:
+        ecosystem = PURL_ECOSYSTEMS.get(purl["type"])
+    if ecosystem is None:
+        return None
+    if purl["namespace"] and ecosystem in ("Maven", "Go", "npm", "Packagist"):
+        separator = ":" if ecosystem == "Maven" else "/"
+        return ecosystem, f"{purl['namespace']}{separator}{purl['name']}"
+    return ecosystem, purl["name"]
+
+
+def local_digest(image: str) -> Optional[str]:
+    """
+    Digest da imagem sem pull: da própria referência ou do Docker local
+
+    Imagens construídas localmente (`docker build -t app:dev`) não têm
+    RepoDigests; nesse caso vale o ID da imagem, que muda a cada rebuild.
+    """
+    match = _DIGEST_RE.search(image)
+    if match:
+        return match.group(1)
+    if shutil.which("docker") is None:
+        return None
+    try:
+        res = subprocess.run(["docker", "image", "inspect", "--format", "{{json .RepoDigests}} {{.Id}}", image],
+                             capture_output=True, text=True, timeout=15)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if res.returncode != 0 or not res.stdout.strip():
+        return None
+    repo_digests, _, image_id = res.stdout.strip().rpartition(" ")
+    repo = image.rsplit(":", 1)[0] if ":" in image.rsplit("/", 1)[-1] else image
+    digests = json.loads(repo_digests or "null") or []
+    for entry in digests:
+        if entry.split("@", 1)[0].endswith(repo.split("/", 1)[-1]):
+            return entry.split("@", 1)[1]
+    if digests:
+        return digests[0].split("@", 1)[1]
+    return image_id if image_id.startswith("sha256:") else None
+
+
+def sbom_digest(sbom: Dict) -> Optional[str]:
+    """Digest registrado pelo gerador no próprio SBOM (RepoDigest do Trivy, ou o ImageID)"""
+    component = (sbom.get("metadata") or {}).get("component") or {}
+    props = {p.get("name"): p.get("value") for p in component.get("properties") or []}
+    repo_digest = props.get("aquasecurity:trivy:RepoDigest")
+    if repo_digest and "@" in repo_digest:
+        return repo_digest.split("@", 1)[1]
+    if props.get("aquasecurity:trivy:ImageID"):
+        return props["aquasecurity:trivy:ImageID"]
+    version = component.get("version") or ""
+    return version if version.startswith("sha256:") else None
+
+
+# --------------------------------------------------------------------------- armazenamento
+class SBOMStore:
+    """SBOMs em disco, um arquivo por digest, com índice referência → digest"""
+
+    def __init__(self, root: Union[str, Path] = SBOM_DIR):
+        self.root = Path(root)
+        self.index_file = self.root / INDEX_FILE.name
+
+    def load_index(self) -> Dict[str, Dict]:
+        try:
+            return json.loads(self.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(index, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.index_file)
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / f"{digest.replace(':', '_')}.cdx.json"
+
+    def lookup(self, image: str) -> Optional[Path]:
+        """SBOM já salvo para a imagem, se ainda for válido (None se ausente ou vencido)"""
+        entry = self.load_index().get(image)
+        digest = local_digest(image)
+        if digest is None:
+            # Sem como resolver a tag agora: vale o SBOM salvo dentro do prazo
+            if entry is None or time.time() - entry.get("created", 0) > MAX_AGE_SECONDS:
+                return None
+            digest = entry["digest"]
+        path = self.path_for(digest)
+        return path if path.exists() else None
+
+    def generate(self, image: str) -> Path:
+        """
+        Gera o SBOM (Trivy ou Syft) e o registra pelo digest
+
+        Raises:
+            FileNotFoundError: se nem Trivy nem Syft estiverem instalados
+            RuntimeError: se o gerador falhar
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / f".{os.getpid()}-{threading.get_ident()}.cdx.json"
+        if shutil.which("trivy"):
+            cmd = ["trivy", "image", "--quiet", "--format", "cyclonedx", "--output", str(tmp), image]
+        elif shutil.which("syft"):
+            cmd = ["syft", image, "-o", f"cyclonedx-json={tmp}", "-q"]
+        else:
+            raise FileNotFoundError("nem trivy nem syft encontrados para gerar o SBOM")
+        with tracing.span("container.sbom_gerar", image=image):
+            res = resource_governor.run(cmd, "trivy")
+        if res.limited_by:
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError(resource_governor.describe_limit("trivy", res))
+        if res.returncode != 0 or not tmp.exists():
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError((res.stderr or res.stdout).strip()[:500] or f"gerador saiu com código {res.returncode}")
+
+        sbom = json.loads(tmp.read_text(encoding="utf-8"))
+        digest = local_digest(image) or sbom_digest(sbom)
+        if digest is None:
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError(f"não foi possível determinar o digest de {image}")
+        path = self.path_for(digest)
+        os.replace(tmp, path)
+        with _lock:
+            index = self.load_index()
+            index[image] = {"digest": digest, "file": path.name, "created": time.time(),
+                            "components": len(sbom.get("components") or [])}
+            self._save_index(index)
+        return path
+
+    def ensure(self, image: str, refresh: bool = False) -> Tuple[Path, bool]:
+        """
+        SBOM da imagem, gerando-o só quando não houver um válido
+
+        Returns:
+            Tupla (caminho do SBOM, True se foi gerado agora)
+        """
+        path = None if refresh else self.lookup(image)
+        monitoring_check.record_cache("sbom", path is not None)
+        if path is not None:
+            return path, False
+        return self.generate(image), True
+
+
+# --------------------------------------------------------------------------- verificação
+def match_command(sbom_path: Union[str, Path], offline: bool = OFFLINE) -> List[str]:
+    """Comando `trivy sbom` com os mesmos filtros do scan de imagem"""
+    cmd = ["trivy", "sbom", "--quiet", "--format", "json", "--severity", SEVERITIES, "--ignore-unfixed"]
+    if offline:
+        cmd += ["--skip-db-update", "--offline-scan"]
+    return cmd + [str(sbom_path)]
+
+
+def match_trivy(sbom_path: Union[str, Path], offline: bool = OFFLINE) -> str:
+    """
+    Cruza o SBOM com a base do Trivy
+
+    Returns:
+        Saída JSON do Trivy (mesmo formato de `trivy image --format json`)
+
+    Raises:
+        RuntimeError: se o Trivy falhar ou exceder o orçamento de recursos
+    """
+    with tracing.span("container.sbom_match", offline=offline):
+        res = resource_governor.run(match_command(sbom_path, offline), "trivy")
+    if res.limited_by:
+        raise RuntimeError(resource_governor.describe_limit("trivy", res))
+    if res.returncode != 0:
+        raise RuntimeError((res.stderr or res.stdout).strip()[:500])
+    return res.stdout
+
+
+def match_osv(sbom_path: Union[str, Path], image: str, db_path: Union[str, Path] = sca_check.OSV_INDEX) -> List[Dict]:
+    """
+    Cruza os componentes do SBOM (pelo purl) com o índice OSV local, sem Trivy
+
+    Returns:
+        Lista de achados no formato de SecurityFinding
+    """
+    sbom = json.loads(Path(sbom_path).read_text(encoding="utf-8"))
+    packages = set()
+    for component in sbom.get("components") or []:
+        purl = parse_purl(component.get("purl") or "")
+        target = osv_package(purl) if purl else None
+        if target:
+            packages.add((*target, purl["version"]))
+    findings = []
+    with tracing.span("container.sbom_osv", packages=len(packages)), sca_check.OSVIndex(db_path) as index:
+        for ecosystem, name, version in sorted(packages):
+            for vuln in index.lookup(ecosystem, name, version):
+                # Registros de distro (Alpine/Debian) raramente trazem severidade: não são descartados
+                unknown = vuln["severity"] == "UNKNOWN"
+                if not unknown and vuln["severity"] not in SEVERITIES.split(","):
+                    continue
+                fixed = ", ".join(sorted(set(vuln["fixed"]), key=sca_check.version_key_for(ecosystem)))
+                if not fixed:
+                    continue  # equivalente ao --ignore-unfixed do scan de imagem
+                note = "\nSeveridade não informada pela base OSV." if unknown else ""
+                findings.append({
+                    "severity": "MEDIUM" if unknown else vuln["severity"],
+                    "title": f"Container (SBOM) - {vuln['id']} em {name}",
+                    "description": f"{vuln['summary']}\n\nPacote {name} {version} ({ecosystem}){note}",
+                    "recommendation": f"Atualize para {fixed}.",
+                    "tool": "Trivy",
+                    "location": image,
+                    "references": vuln["references"] or None,
+                })
+    return findings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from tools import container_check
+
+    parser = argparse.ArgumentParser(description="SBOMs por digest e re-verificação sem pull")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_gen = sub.add_parser("gerar", help="Gera (ou reaproveita) o SBOM das imagens")
+    p_gen.add_argument("imagens", nargs="+")
+    p_gen.add_argument("--refresh", action="store_true", help="Gera de novo mesmo se já houver SBOM")
+    p_check = sub.add_parser("verificar", help="Cruza os SBOMs salvos com a base atual")
+    p_check.add_argument("imagens", nargs="*", help="Padrão: todas as imagens do índice")
+    p_check.add_argument("--offline", action="store_true", default=OFFLINE, help="Não atualiza a base do Trivy")
+    p_check.add_argument("--osv", action="store_true", help="Usa o índice OSV local em vez do Trivy")
+    p_check.add_argument("--sem-gerar", dest="generate", action="store_false",
+                         help="Não gera SBOMs ausentes ou vencidos (as imagens ficam sem verificação)")
+    p_check.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    sub.add_parser("listar", help="Lista os SBOMs salvos")
+    args = parser.parse_args(argv)
+    store = SBOMStore()
+
+    if args.cmd == "listar":
+        for image, entry in sorted(store.load_index().items()):
+            print(f"{image}  {entry['digest'][:19]}  {entry['components']} componentes  "
+                  f"{time.strftime('%Y-%m-%d', time.localtime(entry['created']))}")
+        return 0
+
+    if args.cmd == "gerar":
+        failed = 0
+        for image in args.imagens:
+            try:
+                path, generated = store.ensure(image, refresh=args.refresh)
+                print(f"{image}: {'gerado' if generated else 'reaproveitado'} {path.name}")
+            except Exception as e:
+                failed += 1
+                print(f"{image}: [Erro SBOM: {e}]")
+        return 1 if failed else 0
+
+    images = args.imagens or sorted(store.load_index())
+
+    def check(image: str) -> Tuple[str, Union[List[Dict], str]]:
+        try:
+            if args.generate:
+                # SBOM ausente ou vencido (tag não resolvível localmente) é gerado de novo
+                path, _ = store.ensure(image)
+            else:
+                path = store.lookup(image)
+            if path is None:
+                return image, "sem SBOM válido (execute: gerar)"
+            if args.osv:
+                return image, match_osv(path, image)
+            return image, container_check.trivy_findings(match_trivy(path, args.offline), image)
+        except Exception as e:
+            return image, f"[Erro: {e}]"
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = list(pool.map(check, images))
+    report = {}
+    skipped = 0
+    for image, findings in results:
+        report[image] = findings
+        skipped += isinstance(findings, str)
+        summary = findings if isinstance(findings, str) else f"{len(findings)} vulnerabilidade(s)"
+        print(f"{image}: {summary}", file=sys.stderr)
+    print(f"{len(images)} imagem(ns) em {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    if skipped:
+        print(f"{skipped} imagem(ns) sem verificação", file=sys.stderr)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,586 @@
-# SCA placeholder (OWASP Dependency-Check can be integrated)
+# SCA offline: lockfiles do repositório x espelho local da base OSV
+"""
+Análise de composição de software (SCA) sem rede e sem JVM.
+
+1. `build_osv_index` carrega um espelho local da base OSV (diretórios com JSON
+   ou os `all.zip` exportados por ecossistema) em um índice SQLite chaveado por
+   (ecossistema, pacote), com os intervalos de versões afetadas.
+2. `find_lockfiles`/`parse_lockfile` extraem as dependências fixadas nos
+   lockfiles do repositório (pip, Pipfile, Poetry, npm, Yarn, Go, Cargo).
+3. `scan_dependencies` cruza cada pacote com o índice e devolve achados no
+   formato de SecurityFinding.
+
+Uso:
+    python tools/sca_check.py --build-index <diretório ou all.zip do OSV>
+    python tools/sca_check.py <repositório>
+"""
+
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools import tracing
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:  # pragma: no cover - Python 3.10
+    tomllib = None
+
+BASE = Path(__file__).resolve().parents[1]
+OSV_INDEX = BASE / "data" / "osv" / "osv_index.db"
+
+# Diretórios ignorados ao procurar lockfiles
+SKIP_DIRS = {".git", "node_modules", ".venv", "venv", "__pycache__", ".tox", ".nox", "vendor", "target"}
+
+# Severidade do OSV/GHSA -> severidade dos relatórios
+SEVERITY_MAP = {"CRITICAL": "CRITICAL", "HIGH": "HIGH", "MODERATE": "MEDIUM", "MEDIUM": "MEDIUM", "LOW": "LOW"}
+# Urgência do security tracker do Debian -> severidade dos relatórios
+DEBIAN_URGENCY = {"high": "HIGH", "medium": "MEDIUM", "low": "LOW", "unimportant": "LOW"}
+# Ecossistemas com versões no formato do dpkg
+DPKG_ECOSYSTEMS = {"Debian", "Ubuntu"}
+
+_CVSS_AV = {"N": 0.85, "A": 0.62, "L": 0.55, "P": 0.2}
+_CVSS_AC = {"L": 0.77, "H": 0.44}
+_CVSS_UI = {"N": 0.85, "R": 0.62}
+_CVSS_CIA = {"H": 0.56, "L": 0.22, "N": 0.0}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vulns (
+    id TEXT PRIMARY KEY,
+    summary TEXT,
+    severity TEXT,
+    aliases TEXT,
+    refs TEXT
+);
+CREATE TABLE IF NOT EXISTS ranges (
+    ecosystem TEXT NOT NULL,
+    package TEXT NOT NULL,
+    vuln_id TEXT NOT NULL,
+    introduced TEXT,
+    fixed TEXT,
+    last_affected TEXT
+);
+CREATE TABLE IF NOT EXISTS versions (
+    ecosystem TEXT NOT NULL,
+    package TEXT NOT NULL,
+    version TEXT NOT NULL,
+    vuln_id TEXT NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_ranges_pkg ON ranges(ecosystem, package);
+CREATE INDEX IF NOT EXISTS idx_versions_pkg ON versions(ecosystem, package, version);
+"""
+
+
+# --------------------------------------------------------------------------- versões
+_PRE_TAGS = {"dev": 0, "a": 1, "alpha": 1, "b": 2, "beta": 2, "c": 3, "rc": 3, "pre": 3, "preview": 3}
+_POST_TAGS = {"post", "rev", "r", "p", "patch"}
+
+
+@lru_cache(maxsize=65536)
+def version_key(version: str) -> Tuple:
+    """
+    Chave de ordenação genérica para versões (semver, PEP 440, Go, Cargo).
+
+    Números comparam numericamente; marcadores de pré-release (dev/a/b/rc) ficam
+    antes da versão final e pós-release depois. Metadados de build (+...) e o
+    prefixo `v` são ignorados.
+    """
+    v = version.strip().lower()
+    if v.startswith("v"):
+        v = v[1:]
+    v = v.split("+", 1)[0]
+    if "!" in v:  # epoch PEP 440
+        epoch, v = v.split("!", 1)
+    else:
+        epoch = "0"
+    tokens = re.findall(r"\d+|[a-z]+", v)
+    release, rest = [], []
+    for i, tok in enumerate(tokens):
+        if tok.isdigit():
+            release.append(int(tok))
+        else:
+            rest = tokens[i:]
+            break
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+
+    key: List[Tuple[int, int, str]] = [(3, int(epoch) if epoch.isdigit() else 0, "")]
+    key.extend((3, n, "") for n in release)
+    for tok in rest:
+        if tok.isdigit():
+            key.append((3, int(tok), ""))
+        elif tok in _POST_TAGS:
+            key.append((2, 0, tok))
+        else:
+            key.append((0, _PRE_TAGS.get(tok, 4), tok))
+    key.append((1, 0, ""))
+    return tuple(key)
+
+
+def _dpkg_order(char: str) -> int:
+    if char == "~":
+        return -1
+    return ord(char) if char.isalpha() else ord(char) + 256
+
+
+def _dpkg_part(text: str) -> Tuple:
+    """Trechos alternados não-numérico/numérico, comparados como no `dpkg --compare-versions`"""
+    key: List = []
+    while text:
+        m = re.match(r"(\D*)(\d*)", text)
+        key.append(tuple(_dpkg_order(c) for c in m.group(1)) + (0,))
+        key.append(int(m.group(2) or 0))
+        text = text[m.end():]
+    key.append((0,))
+    return tuple(key)
+
+
+@lru_cache(maxsize=65536)
+def dpkg_version_key(version: str) -> Tuple:
+    """
+    Chave de ordenação para versões Debian/Ubuntu (`epoch:upstream-revisão`).
+
+    O epoch prevalece (`1:2.3-1` > `2.4-1`) e `~` fica antes de tudo,
+    inclusive do fim da string (`1.0~rc1` < `1.0`).
+    """
+    epoch, _, rest = version.strip().partition(":") if ":" in version else ("0", "", version.strip())
+    upstream, _, revision = rest.rpartition("-") if "-" in rest else (rest, "", "")
+    return int(epoch) if epoch.isdigit() else 0, _dpkg_part(upstream), _dpkg_part(revision)
+
+
+def version_key_for(ecosystem: str):
+    """Função de ordenação de versões adequada ao ecossistema"""
+    return dpkg_version_key if ecosystem in DPKG_ECOSYSTEMS else version_key
+
+
+def _in_range(version: str, introduced: Optional[str], fixed: Optional[str],
+              last_affected: Optional[str], key=version_key) -> bool:
+    vk = key(version)
+    if introduced and introduced != "0" and vk < key(introduced):
+        return False
+    if fixed and vk >= key(fixed):
+        return False
+    if last_affected and vk > key(last_affected):
+        return False
+    return True
+
+
+def normalize_package(ecosystem: str, name: str) -> str:
+    """Normaliza o nome do pacote conforme o ecossistema (PEP 503 para PyPI)"""
+    if ecosystem == "PyPI":
+        return re.sub(r"[-_.]+", "-", name).lower()
+    return name
+
+
+# --------------------------------------------------------------------------- índice OSV
+def _iter_osv_records(source: Path) -> Iterator[Dict]:
+    """Percorre registros OSV em diretórios, arquivos .json e exportações .zip"""
+    paths = [source] if source.is_file() else sorted(source.rglob("*"))
+    for p in paths:
+        if p.suffix == ".zip":
+            with zipfile.ZipFile(p) as zf:
+                for name in zf.namelist():
+                    if name.endswith(".json"):
+                        yield json.loads(zf.read(name))
+        elif p.suffix == ".json" and p.is_file():
+            yield json.loads(p.read_text(encoding="utf-8"))
+
+
+def _cvss3_score(vector: str) -> Optional[float]:
+    """Nota base de um vetor CVSS 3.x (`CVSS:3.1/AV:N/AC:L/...`)"""
+    metrics = dict(part.split(":", 1) for part in vector.split("/")[1:] if ":" in part)
+    try:
+        changed = metrics["S"] == "C"
+        iss = 1 - (1 - _CVSS_CIA[metrics["C"]]) * (1 - _CVSS_CIA[metrics["I"]]) * (1 - _CVSS_CIA[metrics["A"]])
+        pr = {"N": 0.85, "L": 0.68 if changed else 0.62, "H": 0.5 if changed else 0.27}[metrics["PR"]]
+        exploitability = 8.22 * _CVSS_AV[metrics["AV"]] * _CVSS_AC[metrics["AC"]] * pr * _CVSS_UI[metrics["UI"]]
+    except KeyError:
+        return None
+    impact = 7.52 * (iss - 0.029) - 3.25 * (iss - 0.02) ** 15 if changed else 6.42 * iss
+    if impact <= 0:
+        return 0.0
+    total = min((1.08 if changed else 1) * (impact + exploitability), 10)
+    return math.ceil(total * 10 - 1e-9) / 10
+
+
+def _score_severity(score: float) -> str:
+    return "CRITICAL" if score >= 9 else "HIGH" if score >= 7 else "MEDIUM" if score >= 4 else "LOW"
+
+
+def _record_severity(record: Dict, affected: Dict) -> str:
+    """
+    Severidade declarada pela base, pelo vetor CVSS v3 ou pela urgência do Debian
+
+    Returns:
+        "UNKNOWN" quando o registro não traz nenhuma dessas informações
+        (comum nos registros de Alpine e Debian)
+    """
+    for src in (affected.get("database_specific") or {}, record.get("database_specific") or {},
+                affected.get("ecosystem_specific") or {}):
+        sev = str(src.get("severity") or "").upper()
+        if sev in SEVERITY_MAP:
+            return SEVERITY_MAP[sev]
+    scores = []
+    for entry in (affected.get("severity") or []) + (record.get("severity") or []):
+        value = str(entry.get("score") or "")
+        if value.startswith("CVSS:3"):
+            scores.append(_cvss3_score(value))
+        elif re.fullmatch(r"\d+(\.\d+)?", value):
+            scores.append(float(value))
+    scores = [score for score in scores if score is not None]
+    if scores:
+        return _score_severity(max(scores))
+    for src in (affected.get("ecosystem_specific") or {}, affected.get("database_specific") or {}):
+        urgency = str(src.get("urgency") or "").lower().rstrip("*")
+        if urgency in DEBIAN_URGENCY:
+            return DEBIAN_URGENCY[urgency]
+    return "UNKNOWN"
+
+
+def _intervals(events: List[Dict]) -> Iterator[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    """Converte a lista de eventos OSV em intervalos (introduced, fixed, last_affected)"""
+    start = None
+    opened = False
+    for ev in events:
+        if "introduced" in ev:
+            if opened:
+                yield start, None, None
+            start, opened = ev["introduced"], True
+        elif "fixed" in ev and opened:
+            yield start, ev["fixed"], None
+            opened = False
+        elif "last_affected" in ev and opened:
+            yield start, None, ev["last_affected"]
+            opened = False
+    if opened:
+        yield start, None, None
+
+
+@tracing.traced("sca.build_index")
+def build_osv_index(source: Union[str, Path], db_path: Union[str, Path] = OSV_INDEX) -> Dict[str, int]:
+    """
+    Carrega um espelho local do OSV em um índice SQLite
+
+    Args:
+        source: Diretório com JSONs do OSV, ou um `all.zip` exportado
+        db_path: Arquivo SQLite de destino (recriado do zero)
+
+    Returns:
+        Dict com contagens de vulnerabilidades, intervalos e versões indexadas
+    """
+    source, db_path = Path(source), Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = db_path.with_suffix(".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(str(tmp_path))
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+    stats = {"vulns": 0, "ranges": 0, "versions": 0}
+    with conn:
+        for record in _iter_osv_records(source):
+            vid = record.get("id")
+            if not vid or record.get("withdrawn"):
+                continue
+            severity = _record_severity(record, {})
+            for affected in record.get("affected", []):
+                pkg = affected.get("package") or {}
+                eco = str(pkg.get("ecosystem") or "").split(":", 1)[0]
+                name = pkg.get("name")
+                if not eco or not name:
+                    continue
+                name = normalize_package(eco, name)
+                severity = _record_severity(record, affected)
+                for rng in affected.get("ranges", []):
+                    if rng.get("type") == "GIT":
+                        continue
+                    rows = [(eco, name, vid, i, f, la) for i, f, la in _intervals(rng.get("events", []))]
+                    conn.executemany("INSERT INTO ranges VALUES (?, ?, ?, ?, ?, ?)", rows)
+                    stats["ranges"] += len(rows)
+                explicit = affected.get("versions") or []
+                conn.executemany("INSERT INTO versions VALUES (?, ?, ?, ?)",
+                                 [(eco, name, v, vid) for v in explicit])
+                stats["versions"] += len(explicit)
+            refs = [r.get("url") for r in record.get("references", []) if r.get("url")]
+            conn.execute(
+                "INSERT OR REPLACE INTO vulns VALUES (?, ?, ?, ?, ?)",
+                (vid, record.get("summary") or record.get("details", "")[:300], severity,
+                 json.dumps(record.get("aliases", [])), json.dumps(refs[:5])),
+            )
+            stats["vulns"] += 1
+        conn.executescript(INDEXES)
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return stats
+
+
+class OSVIndex:
+    """Consulta ao índice OSV local por (ecossistema, pacote, versão)"""
+
+    def __init__(self, db_path: Union[str, Path] = OSV_INDEX):
+        self.db_path = Path(db_path)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"Índice OSV não encontrado: {self.db_path}")
+        self.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, ecosystem: str, package: str, version: str) -> List[Dict]:
+        """Retorna as vulnerabilidades que afetam a versão informada"""
+        package = normalize_package(ecosystem, package)
+        key = version_key_for(ecosystem)
+        hits = set()
+        for vid, intro, fixed, last in self.conn.execute(
+                "SELECT vuln_id, introduced, fixed, last_affected FROM ranges "
+                "WHERE ecosystem = ? AND package = ?", (ecosystem, package)):
+            if vid not in hits and _in_range(version, intro, fixed, last, key):
+                hits.add(vid)
+        for (vid,) in self.conn.execute(
+                "SELECT vuln_id FROM versions WHERE ecosystem = ? AND package = ? AND version = ?",
+                (ecosystem, package, version)):
+            hits.add(vid)
+        if not hits:
+            return []
+        marks = ",".join("?" * len(hits))
+        rows = self.conn.execute(
+            f"SELECT id, summary, severity, aliases, refs FROM vulns WHERE id IN ({marks})", tuple(hits))
+        vulns = []
+        for vid, summary, severity, aliases, refs in rows:
+            fixed = [f for (f,) in self.conn.execute(
+                "SELECT fixed FROM ranges WHERE ecosystem = ? AND package = ? AND vuln_id = ? "
+                "AND fixed IS NOT NULL", (ecosystem, package, vid))]
+            aliases = json.loads(aliases)
+            if severity == "UNKNOWN":
+                severity = self._alias_severity(aliases)
+            vulns.append({
+                "id": vid, "summary": summary, "severity": severity,
+                "aliases": aliases, "references": json.loads(refs), "fixed": fixed,
+            })
+        return vulns
+
+    def _alias_severity(self, aliases: List[str]) -> str:
+        """Maior severidade conhecida entre os aliases (ex.: o GHSA/CVE de um registro do Debian)"""
+        if not aliases:
+            return "UNKNOWN"
+        marks = ",".join("?" * len(aliases))
+        known = {sev for (sev,) in self.conn.execute(
+            f"SELECT severity FROM vulns WHERE id IN ({marks}) AND severity != 'UNKNOWN'", tuple(aliases))}
+        for severity in ("CRITICAL", "HIGH", "MEDIUM", "LOW"):
+            if severity in known:
+                return severity
+        return "UNKNOWN"
+
+
+# --------------------------------------------------------------------------- lockfiles
+def _parse_requirements(text: str) -> Iterator[Tuple[str, str]]:
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        m = re.match(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(\[[^\]]*\])?\s*===?\s*([^\s;,]+)", line)
+        if m:
+            yield m.group(1), m.group(3)
+
+
+def _parse_pipfile_lock(text: str) -> Iterator[Tuple[str, str]]:
+    data = json.loads(text)
+    for section in ("default", "develop"):
+        for name, info in (data.get(section) or {}).items():
+            version = str(info.get("version") or "")
+            if version.startswith("=="):
+                yield name, version[2:]
+
+
+def _parse_toml_packages(text: str) -> Iterator[Tuple[str, str]]:
+    """poetry.lock / Cargo.lock: blocos [[package]] com name e version"""
+    if tomllib is not None:
+        for pkg in tomllib.loads(text).get("package", []):
+            if pkg.get("name") and pkg.get("version"):
+                yield pkg["name"], pkg["version"]
+        return
+    for block in text.split("[[package]]")[1:]:
+        name = re.search(r'^name\s*=\s*"([^"]+)"', block, re.M)
+        version = re.search(r'^version\s*=\s*"([^"]+)"', block, re.M)
+        if name and version:
+            yield name.group(1), version.group(1)
+
+
+def _parse_package_lock(text: str) -> Iterator[Tuple[str, str]]:
+    data = json.loads(text)
+    packages = data.get("packages")
+    if packages:  # lockfileVersion 2/3
+        for path, info in packages.items():
+            if not path or info.get("link"):
+                continue
+            name = info.get("name") or path.rsplit("node_modules/", 1)[-1]
+            if info.get("version"):
+                yield name, info["version"]
+        return
+
+    def _walk(deps):  # lockfileVersion 1
+        for name, info in (deps or {}).items():
+            if info.get("version"):
+                yield name, info["version"]
+            yield from _walk(info.get("dependencies"))
+
+    yield from _walk(data.get("dependencies"))
+
+
+def _parse_yarn_lock(text: str) -> Iterator[Tuple[str, str]]:
+    name = None
+    for line in text.splitlines():
+        if line and not line.startswith((" ", "#")):
+            spec = line.rstrip(":").split(",")[0].strip().strip('"')
+            name = spec.rsplit("@", 1)[0] if spec.count("@") > (1 if spec.startswith("@") else 0) else spec
+        elif name and line.strip().startswith("version"):
+            yield name, line.split(None, 1)[1].strip().strip('"')
+            name = None
+
+
+def _parse_go_sum(text: str) -> Iterator[Tuple[str, str]]:
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            version = parts[1].split("/go.mod", 1)[0].replace("+incompatible", "")
+            yield parts[0], version
+
+
+# Nome do arquivo -> (ecossistema OSV, parser)
+LOCKFILE_PARSERS = {
+    "Pipfile.lock": ("PyPI", _parse_pipfile_lock),
+    "poetry.lock": ("PyPI", _parse_toml_packages),
+    "package-lock.json": ("npm", _parse_package_lock),
+    "npm-shrinkwrap.json": ("npm", _parse_package_lock),
+    "yarn.lock": ("npm", _parse_yarn_lock),
+    "go.sum": ("Go", _parse_go_sum),
+    "Cargo.lock": ("crates.io", _parse_toml_packages),
+}
+
+
+def _parser_for(path: Path):
+    if path.name in LOCKFILE_PARSERS:
+        return LOCKFILE_PARSERS[path.name]
+    if re.match(r"^requirements.*\.txt$", path.name) or path.name == "constraints.txt":
+        return "PyPI", _parse_requirements
+    return None
+
+
+def find_lockfiles(root: Union[str, Path]) -> List[Path]:
+    """Localiza lockfiles suportados abaixo de `root`"""
+    root = Path(root)
+    if root.is_file():
+        return [root] if _parser_for(root) else []
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for fn in filenames:
+            p = Path(dirpath) / fn
+            if _parser_for(p):
+                found.append(p)
+    return sorted(found)
+
+
+def parse_lockfile(path: Union[str, Path]) -> List[Dict[str, str]]:
+    """
+    Extrai as dependências fixadas de um lockfile
+
+    Returns:
+        Lista de dicts com ecosystem, name, version e file
+    """
+    path = Path(path)
+    spec = _parser_for(path)
+    if spec is None:
+        return []
+    ecosystem, parser = spec
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    return [{"ecosystem": ecosystem, "name": name, "version": version, "file": str(path)}
+            for name, version in parser(text)]
+
+
+# --------------------------------------------------------------------------- scan
+@tracing.traced("sca.scan")
+def scan_dependencies(path: Union[str, Path] = ".", db_path: Union[str, Path] = OSV_INDEX) -> List[Dict]:
+    """
+    Cruza as dependências dos lockfiles de `path` com o índice OSV local
+
+    Returns:
+        Lista de achados no formato de SecurityFinding
+    """
+    deps: Dict[Tuple[str, str, str], List[str]] = {}
+    with tracing.span("sca.lockfiles") as sp:
+        lockfiles = find_lockfiles(path)
+        for lockfile in lockfiles:
+            for dep in parse_lockfile(lockfile):
+                key = (dep["ecosystem"], dep["name"], dep["version"])
+                deps.setdefault(key, []).append(dep["file"])
+        sp.set(lockfiles=len(lockfiles), packages=len(deps))
+
+    findings = []
+    with tracing.span("sca.match", packages=len(deps)), OSVIndex(db_path) as index:
+        for (ecosystem, name, version), files in sorted(deps.items()):
+            for vuln in index.lookup(ecosystem, name, version):
+                aliases = ", ".join(vuln["aliases"])
+                fixed = ", ".join(sorted(set(vuln["fixed"]), key=version_key))
+                findings.append({
+                    # Sem severidade na base: mantém MEDIUM, como antes
+                    "severity": "MEDIUM" if vuln["severity"] == "UNKNOWN" else vuln["severity"],
+                    "title": f"SCA - {vuln['id']} em {name}@{version}",
+                    "description": f"{vuln['summary']}" + (f" (aliases: {aliases})" if aliases else ""),
+                    "recommendation": (f"Atualize {name} para {fixed} ou superior." if fixed
+                                       else f"Sem versão corrigida conhecida para {name}; avalie mitigação ou substituição."),
+                    "tool": "SCA",
+                    "location": "; ".join(sorted(set(files))),
+                    "references": vuln["references"] or None,
+                })
+    return findings
+
+
 def run_dependency_check(path='.'):
-    return '[Placeholder] Execute OWASP Dependency-Check CLI or integrate via Docker.'
+    """
+    Executa a análise SCA offline
+    Args:
+        path: Repositório (ou lockfile) a ser analisado
+    Returns:
+        Achados em formato JSON, ou mensagem de erro
+    """
+    try:
+        return json.dumps(scan_dependencies(path), indent=2, ensure_ascii=False)
+    except FileNotFoundError:
+        return f"[Índice OSV não encontrado em {OSV_INDEX}. Execute: python tools/sca_check.py --build-index <espelho OSV>]"
+    except Exception as e:
+        return f"[Erro SCA: {e}]"
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if len(args) == 2 and args[0] == "--build-index":
+        stats = build_osv_index(args[1])
+        print(f"Índice OSV gerado em {OSV_INDEX}: {stats}")
+    elif len(args) <= 1:
+        print(run_dependency_check(args[0] if args else "."))
+    else:
+        print("Uso: python tools/sca_check.py [--build-index <espelho OSV>] [caminho]")
+
+
+if __name__ == "__main__":
+    main()
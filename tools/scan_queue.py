@@ -0,0 +1,627 @@
+# Varredura distribuída: coordenador + workers sobre uma fila de jobs
+"""
+Divide uma varredura grande (repositórios × ferramentas, imagens × Trivy,
+URLs × ZAP) em jobs numa fila compartilhada; qualquer número de workers, em
+uma ou várias máquinas, consome os jobs, executa as funções de `tools/*_check`
+e devolve achados estruturados, que o coordenador funde em um único relatório.
+
+Backends (escolhidos por `DEVSECOPS_QUEUE_URL` ou `--fila`):
+
+- SQLite (padrão, `relatorios/scan_queue.db` ou `sqlite:///caminho.db`):
+  workers na mesma máquina ou num sistema de arquivos compartilhado;
+- Redis (`redis://host:6379/0`, requer o pacote `redis`): workers em várias
+  máquinas.
+
+Semântica at-least-once: cada job é entregue com um lease renovado por
+heartbeat enquanto o worker trabalha. Se o worker morre, o lease expira e o
+job volta para a fila; falhas são repetidas com backoff até `max_attempts`,
+depois o job fica `dead`. Um job pode rodar mais de uma vez — a primeira
+conclusão vale e as demais são descartadas.
+
+Uso:
+    python tools/scan_queue.py planejar --repo ../api --repo ../web --imagem nginx:1.25 --aguardar
+    python tools/scan_queue.py worker
+    python tools/scan_queue.py status 3
+    python tools/scan_queue.py relatorio 3
+"""
+
+import json
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools import (container_check, dast_check, findings_store, job_scheduler, monitoring_check, sast_check,
+                   sca_check, secret_scan, tracing)
+
+BASE = Path(__file__).resolve().parents[1]
+REPORT_DIR = BASE / "relatorios"
+QUEUE_DB = REPORT_DIR / "scan_queue.db"
+HISTORY_DB = REPORT_DIR / "historico.db"
+
+# Ferramentas aplicadas a cada repositório quando --ferramentas não é informado
+REPO_TOOLS = ("sast", "sca", "secrets")
+# Duração do lease; o worker o renova a cada terço deste tempo enquanto trabalha
+LEASE_SECONDS = 120.0
+MAX_ATTEMPTS = 3
+# Espera antes de repetir um job que falhou: RETRY_BACKOFF * 2^(tentativas - 1)
+RETRY_BACKOFF = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plan_id INTEGER NOT NULL REFERENCES plans(id),
+    tool TEXT NOT NULL,
+    target TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_queue_ready ON queue(status, available_at, id);
+CREATE INDEX IF NOT EXISTS idx_queue_plan ON queue(plan_id);
+"""
+
+
+def _backoff(attempts: int) -> float:
+    return RETRY_BACKOFF * 2 ** max(0, attempts - 1)
+
+
+# --------------------------------------------------------------------------- backends
+class SQLiteQueue:
+    """Fila em SQLite (WAL + BEGIN IMMEDIATE), para workers que compartilham o arquivo"""
+
+    def __init__(self, db_path: os.PathLike = QUEUE_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> job_scheduler.ClosingConnection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        return job_scheduler.ClosingConnection(conn)
+
+    def create_plan(self, name: str, jobs: Sequence[Tuple[str, str]], max_attempts: int = MAX_ATTEMPTS) -> int:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                plan_id = conn.execute("INSERT INTO plans (name, created_at, total) VALUES (?, ?, ?)",
+                                       (name, now, len(jobs))).lastrowid
+                conn.executemany(
+                    "INSERT INTO queue (plan_id, tool, target, status, max_attempts, available_at) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?)",
+                    [(plan_id, tool, target, max_attempts, now) for tool, target in jobs])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return plan_id
+
+    def lease(self, owner: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict]:
+        """Entrega o próximo job disponível, devolvendo antes à fila os leases expirados"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for row in conn.execute("SELECT id, tool FROM queue WHERE status = 'leased' AND lease_expires < ?",
+                                        (now,)).fetchall():
+                    monitoring_check.DISTRIBUTED_JOBS.inc(tool=row["tool"], event="expired")
+                conn.execute(
+                    "UPDATE queue SET owner = NULL, error = 'lease expirou sem conclusão', "
+                    "status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END, "
+                    "finished_at = CASE WHEN attempts >= max_attempts THEN ? END "
+                    "WHERE status = 'leased' AND lease_expires < ?", (now, now))
+                row = conn.execute(
+                    "SELECT id FROM queue WHERE status = 'queued' AND available_at <= ? ORDER BY id LIMIT 1",
+                    (now,)).fetchone()
+                job = None
+                if row:
+                    conn.execute(
+                        "UPDATE queue SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                        "WHERE id = ?", (owner, now + lease_seconds, row["id"]))
+                    job = dict(conn.execute("SELECT * FROM queue WHERE id = ?", (row["id"],)).fetchone())
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return job
+
+    def extend(self, job_id: int, owner: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        """Renova o lease; False se o job já não pertence a este worker"""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE queue SET lease_expires = ? WHERE id = ? AND status = 'leased' AND owner = ?",
+                (time.time() + lease_seconds, job_id, owner))
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, owner: str, result: Dict) -> bool:
+        """Grava o resultado; False se outra entrega do mesmo job já concluiu"""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE queue SET status = 'done', result = ?, error = NULL, owner = NULL, finished_at = ? "
+                "WHERE id = ? AND status != 'done'",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id))
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, owner: str, error: str) -> Optional[str]:
+        """
+        Registra a falha de uma tentativa
+
+        Returns:
+            "queued" (será repetido), "dead" (tentativas esgotadas) ou None se o lease já era de outro worker
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT attempts, max_attempts FROM queue WHERE id = ? AND status = 'leased' "
+                                   "AND owner = ?", (job_id, owner)).fetchone()
+                status = None
+                if row:
+                    status = "dead" if row["attempts"] >= row["max_attempts"] else "queued"
+                    conn.execute(
+                        "UPDATE queue SET status = ?, error = ?, owner = NULL, available_at = ?, finished_at = ? "
+                        "WHERE id = ?", (status, error, now + _backoff(row["attempts"]),
+                                         now if status == "dead" else None, job_id))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def plan(self, plan_id: int) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM plans WHERE id = ?", (plan_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM queue WHERE plan_id = ? GROUP BY status",
+                                       (plan_id,)).fetchall())
+        return {**dict(row), "counts": counts}
+
+    def plan_jobs(self, plan_id: int) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM queue WHERE plan_id = ? ORDER BY id", (plan_id,)).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["result"] = json.loads(job["result"]) if job["result"] else None
+            jobs.append(job)
+        return jobs
+
+
+# Scripts Lua: cada transição de estado é atômica no servidor Redis
+_LEASE_LUA = """
+local now = tonumber(ARGV[1])
+local expired = 0
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)) do
+  redis.call('ZREM', KEYS[3], id)
+  redis.call('RPUSH', KEYS[1], id)
+end
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)) do
+  redis.call('ZREM', KEYS[2], id)
+  expired = expired + 1
+  local job = ARGV[4] .. id
+  redis.call('HSET', job, 'owner', '', 'error', 'lease expirou sem conclusão')
+  if tonumber(redis.call('HGET', job, 'attempts')) >= tonumber(redis.call('HGET', job, 'max_attempts')) then
+    redis.call('HSET', job, 'status', 'dead', 'finished_at', now)
+  else
+    redis.call('HSET', job, 'status', 'queued')
+    redis.call('LPUSH', KEYS[1], id)
+  end
+end
+local id = redis.call('LPOP', KEYS[1])
+if not id then return {false, expired} end
+local job = ARGV[4] .. id
+local expires = now + tonumber(ARGV[2])
+redis.call('HSET', job, 'status', 'leased', 'owner', ARGV[3], 'lease_expires', expires)
+redis.call('HINCRBY', job, 'attempts', 1)
+redis.call('ZADD', KEYS[2], expires, id)
+return {id, expired}
+"""
+
+_EXTEND_LUA = """
+if redis.call('HGET', KEYS[2], 'status') ~= 'leased' or redis.call('HGET', KEYS[2], 'owner') ~= ARGV[1] then
+  return 0
+end
+redis.call('HSET', KEYS[2], 'lease_expires', ARGV[2])
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+return 1
+"""
+
+_COMPLETE_LUA = """
+if redis.call('HGET', KEYS[2], 'status') == 'done' then return 0 end
+redis.call('HSET', KEYS[2], 'status', 'done', 'result', ARGV[1], 'finished_at', ARGV[2], 'owner', '')
+redis.call('HDEL', KEYS[2], 'error')
+redis.call('ZREM', KEYS[1], ARGV[3])
+return 1
+"""
+
+_FAIL_LUA = """
+if redis.call('HGET', KEYS[3], 'status') ~= 'leased' or redis.call('HGET', KEYS[3], 'owner') ~= ARGV[1] then
+  return false
+end
+redis.call('ZREM', KEYS[1], ARGV[5])
+redis.call('HSET', KEYS[3], 'error', ARGV[2], 'owner', '')
+local now = tonumber(ARGV[3])
+if tonumber(redis.call('HGET', KEYS[3], 'attempts')) >= tonumber(redis.call('HGET', KEYS[3], 'max_attempts')) then
+  redis.call('HSET', KEYS[3], 'status', 'dead', 'finished_at', now)
+  return 'dead'
+end
+redis.call('HSET', KEYS[3], 'status', 'queued')
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[4]), ARGV[5])
+return 'queued'
+"""
+
+
+class RedisQueue:
+    """Fila em Redis (ou servidor compatível), para workers em várias máquinas"""
+
+    def __init__(self, url: str, prefix: str = "devsecops:queue:"):
+        import redis  # dependência opcional
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.ready, self.leases, self.delayed = (f"{prefix}ready", f"{prefix}leases", f"{prefix}delayed")
+        self._lease = self.redis.register_script(_LEASE_LUA)
+        self._extend = self.redis.register_script(_EXTEND_LUA)
+        self._complete = self.redis.register_script(_COMPLETE_LUA)
+        self._fail = self.redis.register_script(_FAIL_LUA)
+
+    def _job_key(self, job_id) -> str:
+        return f"{self.prefix}job:{job_id}"
+
+    def _job(self, job_id) -> Dict:
+        data = self.redis.hgetall(self._job_key(job_id))
+        job = {"id": int(job_id), "plan_id": int(data["plan_id"]), "tool": data["tool"], "target": data["target"],
+               "status": data["status"], "attempts": int(data.get("attempts", 0)),
+               "max_attempts": int(data["max_attempts"]), "owner": data.get("owner") or None,
+               "error": data.get("error"), "finished_at": float(data["finished_at"]) if data.get("finished_at") else None}
+        job["result"] = json.loads(data["result"]) if data.get("result") else None
+        return job
+
+    def create_plan(self, name: str, jobs: Sequence[Tuple[str, str]], max_attempts: int = MAX_ATTEMPTS) -> int:
+        plan_id = self.redis.incr(f"{self.prefix}plan_seq")
+        first = self.redis.incrby(f"{self.prefix}job_seq", len(jobs)) - len(jobs) + 1 if jobs else 0
+        ids = list(range(first, first + len(jobs)))
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(f"{self.prefix}plan:{plan_id}", mapping={"name": name, "created_at": time.time(),
+                                                          "total": len(jobs)})
+        for job_id, (tool, target) in zip(ids, jobs):
+            pipe.hset(self._job_key(job_id), mapping={"plan_id": plan_id, "tool": tool, "target": target,
+                                                      "status": "queued", "attempts": 0,
+                                                      "max_attempts": max_attempts})
+        if ids:
+            pipe.rpush(f"{self.prefix}plan:{plan_id}:jobs", *ids)
+            pipe.rpush(self.ready, *ids)
+        pipe.execute()
+        return plan_id
+
+    def lease(self, owner: str, lease_seconds: float = LEASE_SECONDS) -> Optional[Dict]:
+        job_id, expired = self._lease(keys=[self.ready, self.leases, self.delayed],
+                                      args=[time.time(), lease_seconds, owner, f"{self.prefix}job:"])
+        if expired:
+            monitoring_check.DISTRIBUTED_JOBS.inc(expired, tool="*", event="expired")
+        return self._job(job_id) if job_id else None
+
+    def extend(self, job_id: int, owner: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+        return bool(self._extend(keys=[self.leases, self._job_key(job_id)],
+                                 args=[owner, time.time() + lease_seconds, job_id]))
+
+    def complete(self, job_id: int, owner: str, result: Dict) -> bool:
+        return bool(self._complete(keys=[self.leases, self._job_key(job_id)],
+                                   args=[json.dumps(result, ensure_ascii=False), time.time(), job_id]))
+
+    def fail(self, job_id: int, owner: str, error: str) -> Optional[str]:
+        attempts = int(self.redis.hget(self._job_key(job_id), "attempts") or 0)
+        return self._fail(keys=[self.leases, self.delayed, self._job_key(job_id)],
+                          args=[owner, error, time.time(), _backoff(attempts), job_id]) or None
+
+    def plan(self, plan_id: int) -> Optional[Dict]:
+        data = self.redis.hgetall(f"{self.prefix}plan:{plan_id}")
+        if not data:
+            return None
+        ids = self.redis.lrange(f"{self.prefix}plan:{plan_id}:jobs", 0, -1)
+        pipe = self.redis.pipeline(transaction=False)
+        for job_id in ids:
+            pipe.hget(self._job_key(job_id), "status")
+        counts: Dict[str, int] = {}
+        for status in pipe.execute():
+            counts[status] = counts.get(status, 0) + 1
+        return {"id": plan_id, "name": data["name"], "created_at": float(data["created_at"]),
+                "total": int(data["total"]), "counts": counts}
+
+    def plan_jobs(self, plan_id: int) -> List[Dict]:
+        return [self._job(job_id) for job_id in self.redis.lrange(f"{self.prefix}plan:{plan_id}:jobs", 0, -1)]
+
+
+def open_queue(url: Optional[str] = None):
+    """
+    Abre o backend indicado por `url` (ou DEVSECOPS_QUEUE_URL)
+
+    Aceita `redis://...`/`rediss://...`, `sqlite:///caminho.db` ou um caminho
+    de arquivo; sem nada, usa a fila SQLite em relatorios/.
+    """
+    url = url or os.environ.get("DEVSECOPS_QUEUE_URL")
+    if not url:
+        return SQLiteQueue()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisQueue(url)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteQueue(url)
+
+
+# --------------------------------------------------------------------------- execução
+def execute(tool: str, target: str) -> List[Dict]:
+    """
+    Executa um job e devolve os achados estruturados
+
+    Raises:
+        RuntimeError: se o scanner falhou (o job é repetido até esgotar as tentativas)
+    """
+    if tool == "sast":
+        out = sast_check.run_bandit(target)
+        if out.startswith("[Erro"):
+            raise RuntimeError(out)
+        return sast_check.to_findings(json.loads(out))
+    if tool == "sca":
+        return sca_check.scan_dependencies(target)
+    if tool == "secrets":
+        return secret_scan.to_findings(secret_scan.scan_tree(target))
+    if tool == "container":
+        out = container_check.ContainerSecurityChecker().trivy_scan_image(target)
+        try:
+            return container_check.trivy_findings(out, target)
+        except ValueError:
+            raise RuntimeError(out.strip()[:500]) from None
+    if tool == "dast":
+        return dast_check.scan_targets([target])
+    raise ValueError(f"ferramenta desconhecida: {tool}")
+
+
+class Worker:
+    """Consome jobs da fila até ser interrompido (SIGTERM/Ctrl+C) ou a fila esvaziar"""
+
+    def __init__(self, queue, worker_id: Optional[str] = None, lease_seconds: float = LEASE_SECONDS,
+                 poll_interval: float = 2.0):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def stop(self, *_) -> None:
+        """Termina após o job atual"""
+        self._stop.set()
+
+    def _heartbeat(self, job_id: int, done: threading.Event) -> None:
+        while not done.wait(self.lease_seconds / 3):
+            if not self.queue.extend(job_id, self.worker_id, self.lease_seconds):
+                # Outro worker assumiu o job; o resultado deste ainda é aceito se chegar primeiro
+                print(f"[{self.worker_id}] lease do job {job_id} perdido", file=sys.stderr)
+                return
+
+    def run_once(self) -> bool:
+        """Processa um job; False se não havia job disponível"""
+        job = self.queue.lease(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        tool, target = job["tool"], job["target"]
+        monitoring_check.DISTRIBUTED_JOBS.inc(tool=tool, event="leased")
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job["id"], done), daemon=True)
+        beat.start()
+        started = time.perf_counter()
+        try:
+            with tracing.span(f"fila.{tool}", job=job["id"], target=target, attempt=job["attempts"]), \
+                    monitoring_check.SCANNER_DURATION.time(tool=tool):
+                findings = execute(tool, target)
+        except Exception as e:
+            done.set()
+            status = self.queue.fail(job["id"], self.worker_id, f"{type(e).__name__}: {e}")
+            # None: a lease expirou e o job já foi entregue a outro worker
+            event = "lost" if status is None else "dead" if status == "dead" else "retried"
+            monitoring_check.DISTRIBUTED_JOBS.inc(tool=tool, event=event)
+            print(f"[{self.worker_id}] job {job['id']} {tool} {target}: falhou ({e})", file=sys.stderr)
+            return True
+        done.set()
+        accepted = self.queue.complete(job["id"], self.worker_id, {
+            "findings": findings, "worker": self.worker_id, "seconds": round(time.perf_counter() - started, 3)})
+        monitoring_check.DISTRIBUTED_JOBS.inc(tool=tool, event="done" if accepted else "duplicate")
+        print(f"[{self.worker_id}] job {job['id']} {tool} {target}: {len(findings)} achado(s)", file=sys.stderr)
+        return True
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_idle: bool = False) -> int:
+        """
+        Loop do worker
+
+        Returns:
+            Quantidade de jobs processados
+        """
+        processed = 0
+        while not self._stop.is_set() and (max_jobs is None or processed < max_jobs):
+            if self.run_once():
+                processed += 1
+            elif exit_when_idle:
+                break
+            else:
+                self._stop.wait(self.poll_interval)
+        return processed
+
+
+# --------------------------------------------------------------------------- coordenador
+def build_plan(repos: Iterable[str] = (), tools: Sequence[str] = REPO_TOOLS, images: Iterable[str] = (),
+               urls: Iterable[str] = ()) -> List[Tuple[str, str]]:
+    """Jobs (ferramenta, alvo): repositórios × ferramentas, imagens × Trivy e URLs × ZAP"""
+    jobs = []
+    for repo in repos:
+        path = str(Path(repo).resolve()) if os.path.exists(repo) else repo
+        jobs.extend((tool, path) for tool in tools)
+    jobs.extend(("container", image) for image in images)
+    jobs.extend(("dast", url) for url in urls)
+    return jobs
+
+
+def wait(queue, plan_id: int, timeout: Optional[float] = None, poll_interval: float = 2.0) -> Dict:
+    """Aguarda até todos os jobs do plano estarem concluídos ou mortos"""
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        plan = queue.plan(plan_id)
+        if plan is None:
+            raise ValueError(f"plano {plan_id} não encontrado")
+        pending = plan["total"] - plan["counts"].get("done", 0) - plan["counts"].get("dead", 0)
+        monitoring_check.QUEUE_DEPTH.set(pending, queue=f"plano.{plan_id}")
+        if pending == 0 or (deadline and time.monotonic() > deadline):
+            return plan
+        time.sleep(poll_interval)
+
+
+def merge_results(queue, plan_id: int) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    Funde os resultados dos jobs do plano
+
+    Achados repetidos (mesma impressão digital) entre jobs são contados uma
+    vez; jobs sem conclusão entram como achado de falha, para não sumirem do
+    relatório.
+
+    Returns:
+        Tupla (achados, métricas)
+    """
+    findings: List[Dict] = []
+    seen = set()
+    metrics: Dict[str, int] = {"jobs": 0, "jobs_concluidos": 0, "jobs_falhos": 0, "jobs_pendentes": 0}
+    for job in queue.plan_jobs(plan_id):
+        metrics["jobs"] += 1
+        if job["status"] == "done":
+            metrics["jobs_concluidos"] += 1
+            for finding in job["result"]["findings"]:
+                fp = findings_store.fingerprint(finding)
+                if fp not in seen:
+                    seen.add(fp)
+                    findings.append(finding)
+            continue
+        if job["status"] == "dead":
+            metrics["jobs_falhos"] += 1
+            title = f"{job['tool'].upper()} - Falha ao rodar"
+        else:
+            metrics["jobs_pendentes"] += 1
+            title = f"{job['tool'].upper()} - Job não concluído ({job['status']})"
+        findings.append({
+            "severity": "LOW",
+            "title": title,
+            "description": job.get("error") or "",
+            "recommendation": "Verifique os logs dos workers e reenfileire o alvo.",
+            "tool": job["tool"].upper(),
+            "location": job["target"],
+        })
+    metrics["achados"] = len(findings)
+    return findings, metrics
+
+
+def write_report(queue, plan_id: int, output_dir: Optional[os.PathLike] = None) -> Path:
+    """Gera o relatório unificado do plano (md/html/pdf/json) e registra a execução no histórico"""
+    # Importado aqui: workers não precisam das dependências de renderização (matplotlib, PDF)
+    from tools import report_gen
+    plan = queue.plan(plan_id)
+    if plan is None:
+        raise ValueError(f"plano {plan_id} não encontrado")
+    findings, metrics = merge_results(queue, plan_id)
+    output_dir = Path(output_dir or REPORT_DIR / f"plano-{plan_id}")
+    project = f"Varredura distribuída - {plan['name']}"
+    summaries = {}
+    try:
+        with findings_store.FindingsStore(HISTORY_DB) as store:
+            run_id = store.record_run(project, findings)
+            summaries["delta"] = findings_store.format_delta(store.diff(run_id))
+    except Exception as e:
+        print(f"Aviso: histórico de achados indisponível: {e}", file=sys.stderr)
+    report_gen.create_report(project, findings, metrics, summaries, output_dir, locale="pt")
+    return output_dir
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Varredura distribuída (coordenador/workers)")
+    parser.add_argument("--fila", default=None, help="redis://host:6379/0, sqlite:///arquivo.db (padrão: SQLite local)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_plan = sub.add_parser("planejar", help="Enfileira um plano de varredura")
+    p_plan.add_argument("--repo", action="append", default=[], help="Repositório (repetível)")
+    p_plan.add_argument("--ferramentas", default=",".join(REPO_TOOLS), help="Ferramentas por repositório")
+    p_plan.add_argument("--imagem", action="append", default=[], help="Imagem para o Trivy (repetível)")
+    p_plan.add_argument("--url", action="append", default=[], help="URL para o ZAP (repetível)")
+    p_plan.add_argument("--nome", default=None)
+    p_plan.add_argument("--tentativas", type=int, default=MAX_ATTEMPTS)
+    p_plan.add_argument("--aguardar", action="store_true", help="Aguarda os workers e gera o relatório")
+    p_plan.add_argument("--timeout", type=float, default=None)
+
+    p_worker = sub.add_parser("worker", help="Consome jobs da fila")
+    p_worker.add_argument("--id", default=None)
+    p_worker.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    p_worker.add_argument("--max-jobs", type=int, default=None)
+    p_worker.add_argument("--sair-ocioso", action="store_true", help="Encerra quando a fila estiver vazia")
+
+    p_status = sub.add_parser("status", help="Progresso de um plano")
+    p_status.add_argument("plano", type=int)
+    p_report = sub.add_parser("relatorio", help="Gera o relatório unificado de um plano")
+    p_report.add_argument("plano", type=int)
+
+    args = parser.parse_args(argv)
+    queue = open_queue(args.fila)
+
+    if args.cmd == "planejar":
+        tools = [t.strip() for t in args.ferramentas.split(",") if t.strip()]
+        jobs = build_plan(args.repo, tools, args.imagem, args.url)
+        if not jobs:
+            parser.error("informe ao menos um --repo, --imagem ou --url")
+        name = args.nome or time.strftime("%Y-%m-%d %H:%M")
+        plan_id = queue.create_plan(name, jobs, args.tentativas)
+        print(f"Plano {plan_id}: {len(jobs)} job(s) enfileirado(s)")
+        if args.aguardar:
+            plan = wait(queue, plan_id, args.timeout)
+            print(json.dumps(plan["counts"], ensure_ascii=False))
+            print(f"Relatório gerado: {write_report(queue, plan_id)}")
+    elif args.cmd == "worker":
+        worker = Worker(queue, args.id, args.lease)
+        signal.signal(signal.SIGTERM, worker.stop)
+        try:
+            count = worker.run(args.max_jobs, args.sair_ocioso)
+        except KeyboardInterrupt:
+            count = None
+        if count is not None:
+            print(f"{count} job(s) processado(s)", file=sys.stderr)
+    elif args.cmd == "status":
+        plan = queue.plan(args.plano)
+        if plan is None:
+            print("Plano não encontrado.")
+            return 1
+        print(json.dumps(plan, indent=2, ensure_ascii=False))
+    else:
+        print(f"Relatório gerado: {write_report(queue, args.plano)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
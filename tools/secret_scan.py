@@ -0,0 +1,342 @@
+# Secret scanning: varredura de credenciais em toda a árvore
+"""
+Varredura de segredos (chaves de API, tokens, chaves privadas, senhas) em um
+diretório inteiro.
+
+- Todas as regras são combinadas em uma única expressão regular com grupos
+  nomeados. Antes dela, as palavras-chave das regras são localizadas com buscas
+  literais (memchr), e a expressão só roda nas linhas candidatas.
+- Arquivos grandes são mapeados em memória (mmap) em vez de lidos inteiros.
+- Binários são descartados pela extensão ou por um byte NUL no início.
+- A regra genérica (`chave: valor` longo) exige entropia de Shannon mínima,
+  o que descarta placeholders como `token: xxxxxxxxxxxxxxxxxxxx`.
+- Arquivos são distribuídos entre processos (um por núcleo) quando a árvore
+  é grande o bastante para compensar o custo de subir o pool.
+
+Uso:
+    python tools/secret_scan.py [--workers N] <diretório>
+"""
+
+import json
+import math
+import mmap
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+# Diretórios e extensões ignorados
+SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", ".venv", "venv", "__pycache__", ".tox", ".nox",
+             ".mypy_cache", ".pytest_cache", "dist", "build"}
+BINARY_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp", ".pdf", ".zip", ".gz", ".tgz", ".bz2",
+    ".xz", ".7z", ".rar", ".jar", ".war", ".class", ".so", ".dll", ".dylib", ".exe", ".o", ".a",
+    ".pyc", ".pyo", ".whl", ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp3", ".mp4", ".mov",
+    ".avi", ".sqlite", ".db", ".bin", ".iso", ".npy",
+}
+# Abaixo disso por processo, o custo de subir o pool supera o da varredura
+MIN_FILES_PER_WORKER = 32
+SNIFF_BYTES = 8192
+MMAP_THRESHOLD = 1024 * 1024
+BLOCK_SIZE = 8 * 1024 * 1024
+
+# Padrões de atribuição de credenciais (também usados na análise de Dockerfile)
+GENERIC_ASSIGNMENT_PATTERNS = [
+    r'(?i)password\s*=\s*[\'"][^\'"]+[\'"]',
+    r'(?i)secret\s*=\s*[\'"][^\'"]+[\'"]',
+    r'(?i)api[_-]key\s*=\s*[\'"][^\'"]+[\'"]',
+    r'(?i)token\s*=\s*[\'"][^\'"]+[\'"]',
+    r'(?i)credentials?\s*=\s*[\'"][^\'"]+[\'"]'
+]
+
+
+class Rule(NamedTuple):
+    id: str
+    pattern: str           # o grupo nomeado "secret" (opcional) delimita o valor
+    description: str
+    severity: str = "HIGH"
+    min_entropy: Optional[float] = None
+
+
+RULES: List[Rule] = [
+    Rule("private-key", r"-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY(?: BLOCK)?-----",
+         "Chave privada", "CRITICAL"),
+    Rule("aws-access-key-id", r"\b(?P<secret>(?:AKIA|ASIA|AGPA|AIDA|AROA|ANPA)[0-9A-Z]{16})\b",
+         "AWS Access Key ID", "CRITICAL"),
+    Rule("aws-secret-access-key",
+         r"(?i:aws.{0,20}?(?:secret|sk).{0,20}?['\"=:\s]+)(?P<secret>[A-Za-z0-9/+=]{40})\b",
+         "AWS Secret Access Key", "CRITICAL", 4.0),
+    Rule("github-token", r"\b(?P<secret>(?:ghp|gho|ghu|ghs|ghr)_[A-Za-z0-9]{36,255}|github_pat_[A-Za-z0-9_]{22,255})\b",
+         "Token do GitHub", "CRITICAL"),
+    Rule("gitlab-token", r"\b(?P<secret>glpat-[A-Za-z0-9_\-]{20})\b", "Token do GitLab", "CRITICAL"),
+    Rule("slack-token", r"\b(?P<secret>xox[baprs]-[A-Za-z0-9-]{10,72})\b", "Token do Slack", "HIGH"),
+    Rule("google-api-key", r"\b(?P<secret>AIza[0-9A-Za-z_\-]{35})\b", "Google API Key", "HIGH"),
+    Rule("stripe-key", r"\b(?P<secret>(?:sk|rk)_live_[0-9A-Za-z]{24,99})\b", "Chave Stripe", "CRITICAL"),
+    Rule("jwt", r"\b(?P<secret>eyJ[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,})\b",
+         "JSON Web Token", "MEDIUM"),
+    Rule("url-credentials", r"\b[a-z][a-z0-9+.-]*://[^/\s:@'\"]+:(?P<secret>[^/\s:@'\"]{3,})@[^\s'\"]+",
+         "Credenciais embutidas em URL", "HIGH"),
+] + [
+    Rule(f"assignment-{i}", p.replace("(?i)", "(?i:", 1) + ")" if p.startswith("(?i)") else p,
+         "Possível credencial atribuída em texto claro", "HIGH")
+    for i, p in enumerate(GENERIC_ASSIGNMENT_PATTERNS)
+] + [
+    Rule("generic-secret",
+         r"(?i:(?:secret|token|passw(?:or)?d|pwd|api[_-]?key|auth[_-]?key|access[_-]?key)[\w.-]{0,20}\s*[:=]\s*['\"]?)"
+         r"(?P<secret>[A-Za-z0-9+/_\-.=]{16,})",
+         "Segredo genérico de alta entropia", "HIGH", 3.5),
+]
+
+
+def _compile(rules: List[Rule]) -> "re.Pattern[bytes]":
+    """Combina todas as regras em um único padrão (bytes) com um grupo por regra"""
+    parts = []
+    for idx, rule in enumerate(rules):
+        pattern = rule.pattern.replace("(?P<secret>", f"(?P<s{idx}>")
+        parts.append(f"(?P<r{idx}>{pattern})")
+    return re.compile("|".join(parts).encode("utf-8"))
+
+
+COMBINED = _compile(RULES)
+_GROUP_INDEX = {f"r{i}": i for i in range(len(RULES))}
+
+# Palavras-chave (minúsculas) que toda regra exige; filtram as linhas candidatas
+KEYWORDS = (
+    b"-----begin", b"akia", b"asia", b"agpa", b"aida", b"aroa", b"anpa", b"aws",
+    b"ghp_", b"gho_", b"ghu_", b"ghs_", b"ghr_", b"github_pat_", b"glpat-", b"xox", b"aiza",
+    b"_live_", b"eyj", b"://", b"passw", b"pwd", b"secret", b"token", b"api", b"auth",
+    b"access", b"credential",
+)
+
+
+def shannon_entropy(data: Union[str, bytes]) -> float:
+    """Entropia de Shannon (bits por símbolo)"""
+    if not data:
+        return 0.0
+    counts = Counter(data)
+    n = len(data)
+    return -sum(c / n * math.log2(c / n) for c in counts.values())
+
+
+def _redact(value: bytes) -> str:
+    text = value.decode("utf-8", errors="replace")
+    return text[:4] + "…" if len(text) > 4 else "…"
+
+
+def _candidate_windows(low: bytes) -> List[Tuple[int, int]]:
+    """
+    Localiza, com `bytes.find` (memchr), as linhas que contêm alguma palavra-chave
+    e devolve janelas (linha + a seguinte) já mescladas e ordenadas
+    """
+    spans = []
+    size = len(low)
+    for kw in KEYWORDS:
+        i = low.find(kw)
+        while i != -1:
+            start = low.rfind(b"\n", 0, i) + 1
+            eol = low.find(b"\n", i)
+            eol = size if eol == -1 else eol
+            nxt = low.find(b"\n", eol + 1) if eol < size else -1
+            spans.append((start, size if nxt == -1 else nxt))
+            i = low.find(kw, eol + 1) if eol < size else -1
+    spans.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _blocks(buf) -> Iterator[Tuple[int, bytes]]:
+    """Divide o buffer em blocos de até BLOCK_SIZE terminando em quebra de linha"""
+    size, start = len(buf), 0
+    while start < size:
+        end = min(start + BLOCK_SIZE, size)
+        if end < size:
+            nl = buf.rfind(b"\n", start, end)
+            if nl != -1:
+                end = nl + 1
+        yield start, buf[start:end]
+        start = end
+
+
+def iter_matches(buf, rules: List[Rule] = RULES, pattern=COMBINED) -> Iterator[Dict]:
+    """
+    Percorre um buffer (bytes ou mmap) e devolve os segredos encontrados
+
+    As palavras-chave das regras são localizadas primeiro com buscas literais;
+    a expressão combinada só roda nas linhas candidatas.
+
+    Returns:
+        Iterador de dicts com line, rule, description, severity, entropy e match (mascarado)
+    """
+    line_base = 1
+    search = pattern.search
+    for _, block in _blocks(buf):
+        last, line = 0, line_base
+        for win_start, win_end in _candidate_windows(block.lower()):
+            pos = win_start
+            while True:
+                m = search(block, pos, win_end)
+                if m is None:
+                    break
+                idx = _GROUP_INDEX[m.lastgroup]
+                rule = rules[idx]
+                secret = m.group(f"s{idx}") if f"s{idx}" in pattern.groupindex else None
+                value = secret if secret is not None else m.group(0)
+                entropy = shannon_entropy(value)
+                if rule.min_entropy is not None and entropy < rule.min_entropy:
+                    # Um casamento genérico descartado não pode esconder regras mais
+                    # específicas que comecem dentro dele
+                    pos = m.start() + 1
+                    continue
+                pos = max(m.end(), m.start() + 1)
+                line += block.count(b"\n", last, m.start())
+                last = m.start()
+                yield {
+                    "line": line,
+                    "rule": rule.id,
+                    "description": rule.description,
+                    "severity": rule.severity,
+                    "entropy": round(entropy, 2),
+                    "match": _redact(value),
+                }
+        line_base += block.count(b"\n")
+
+
+def scan_text(text: Union[str, bytes]) -> List[Dict]:
+    """Varre um conteúdo em memória (ex.: Dockerfile já lido)"""
+    data = text.encode("utf-8", errors="ignore") if isinstance(text, str) else text
+    return list(iter_matches(data))
+
+
+def _is_binary(path: Path, head: bytes) -> bool:
+    return path.suffix.lower() in BINARY_EXTENSIONS or b"\x00" in head
+
+
+def scan_file(path: Union[str, Path]) -> List[Dict]:
+    """
+    Varre um arquivo; arquivos grandes são mapeados em memória
+
+    Returns:
+        Lista de resultados com file e line (vazia para binários/ilegíveis)
+    """
+    path = Path(path)
+    if path.suffix.lower() in BINARY_EXTENSIONS:
+        return []
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return []
+            head = f.read(SNIFF_BYTES)
+            if _is_binary(path, head):
+                return []
+            if size <= MMAP_THRESHOLD:
+                results = list(iter_matches(head + f.read()))
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    results = list(iter_matches(mm))
+    except (OSError, ValueError):
+        return []
+    for r in results:
+        r["file"] = str(path)
+    return results
+
+
+def iter_files(root: Union[str, Path]) -> Iterator[str]:
+    """Lista os arquivos candidatos abaixo de `root`, ignorando diretórios de dependências/VCS"""
+    root = Path(root)
+    if root.is_file():
+        yield str(root)
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+        for fn in filenames:
+            if os.path.splitext(fn)[1].lower() not in BINARY_EXTENSIONS:
+                yield os.path.join(dirpath, fn)
+
+
+def scan_tree(root: Union[str, Path] = ".", workers: Optional[int] = None) -> List[Dict]:
+    """
+    Varre toda a árvore em paralelo (um processo por núcleo)
+
+    Árvores pequenas são varridas no próprio processo: cada processo do pool
+    recebe ao menos MIN_FILES_PER_WORKER arquivos.
+
+    Args:
+        root: Diretório (ou arquivo) a varrer
+        workers: Número máximo de processos (padrão: os.cpu_count(); 1 = sem paralelismo)
+
+    Returns:
+        Lista de resultados ordenada por arquivo e linha
+
+    Raises:
+        FileNotFoundError: se `root` não existir
+    """
+    if not Path(root).exists():
+        raise FileNotFoundError(f"caminho não encontrado: {root}")
+    files = list(iter_files(root))
+    workers = min(workers or os.cpu_count() or 1, len(files) // MIN_FILES_PER_WORKER)
+    results: List[Dict] = []
+    if workers <= 1:
+        for f in files:
+            results.extend(scan_file(f))
+    else:
+        chunksize = max(1, min(256, len(files) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for file_results in pool.map(scan_file, files, chunksize=chunksize):
+                results.extend(file_results)
+    results.sort(key=lambda r: (r["file"], r["line"]))
+    return results
+
+
+def to_findings(results: List[Dict]) -> List[Dict]:
+    """Converte resultados da varredura em achados (campos de SecurityFinding)"""
+    return [{
+        "severity": r["severity"],
+        "title": f"Secret - {r['description']}",
+        "description": f"Regra {r['rule']} casou com '{r['match']}' (entropia {r['entropy']})",
+        "recommendation": "Remova o segredo do repositório, revogue/rotacione a credencial e use um cofre de segredos.",
+        "tool": "Secrets",
+        "location": f"{r['file']}:{r['line']}",
+    } for r in results]
+
+
+def run_secret_scan(path='.'):
+    """
+    Executa a varredura de segredos
+    Args:
+        path: Diretório ou arquivo a varrer
+    Returns:
+        Achados em formato JSON
+    """
+    try:
+        return json.dumps(to_findings(scan_tree(path)), indent=2, ensure_ascii=False)
+    except Exception as e:
+        return f"[Erro na varredura de segredos: {e}]"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Varredura de segredos em toda a árvore")
+    parser.add_argument("path", nargs="?", default=".", help="Diretório ou arquivo a varrer (padrão: .)")
+    parser.add_argument("--workers", type=int, default=None, help="Máximo de processos (padrão: um por núcleo)")
+    args = parser.parse_args(argv)
+    try:
+        results = scan_tree(args.path, args.workers)
+    except FileNotFoundError as e:
+        print(f"[Erro na varredura de segredos: {e}]", file=sys.stderr)
+        return 1
+    print(json.dumps(to_findings(results), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
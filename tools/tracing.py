@@ -0,0 +1,234 @@
+# Tracing leve por etapa (spans) e profiling opcional com cProfile
+"""
+Camada mínima de spans para descobrir onde o tempo de uma ação é gasto
+(leitura do PDF, Bandit, Trivy, embeddings, busca, gráficos, PDF...).
+
+Desabilitado por padrão: `span()` devolve um objeto no-op compartilhado e
+`traced` chama a função original diretamente, então o custo fora do modo de
+tracing é uma checagem de booleano.
+
+Uso:
+    tracing.enable()
+    with tracing.span("sast.bandit", path="."):
+        ...
+    tracing.export_json("trace.json")      # árvore de tempos
+    tracing.export_chrome("trace.chrome.json")  # chrome://tracing / Perfetto
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+_enabled = False
+_current: ContextVar[Optional["Span"]] = ContextVar("devsecops_current_span", default=None)
+_roots: List["Span"] = []
+_lock = threading.Lock()
+
+
+class Span:
+    """Etapa cronometrada, com atributos e sub-etapas"""
+
+    __slots__ = ("name", "attrs", "start_ns", "end_ns", "children", "thread_id")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.name = name
+        self.attrs = attrs
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.children: List["Span"] = []
+        self.thread_id = threading.get_ident()
+
+    def set(self, **attrs) -> None:
+        """Acrescenta atributos ao span (ex.: contagens conhecidas só ao final)"""
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.perf_counter_ns()) - self.start_ns
+
+
+class _NoopSpan:
+    """Span inativo: usado quando o tracing está desligado"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanContext:
+    __slots__ = ("span", "token")
+
+    def __init__(self, name: str, attrs: Dict):
+        self.span = Span(name, attrs)
+        self.token = None
+
+    def __enter__(self) -> Span:
+        parent = _current.get()
+        if parent is None:
+            with _lock:
+                _roots.append(self.span)
+        else:
+            parent.children.append(self.span)
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.span.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        _current.reset(self.token)
+        return False
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Descarta os spans já coletados"""
+    with _lock:
+        _roots.clear()
+
+
+def span(name: str, **attrs):
+    """
+    Context manager que cronometra uma etapa
+
+    Args:
+        name: Nome da etapa (ex.: "report.pdf")
+        **attrs: Atributos livres registrados no span
+
+    Returns:
+        Span ativo (ou um no-op quando o tracing está desligado)
+    """
+    if not _enabled:
+        return _NOOP
+    return _SpanContext(name, attrs)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator que envolve a função inteira em um span"""
+    def decorator(fn):
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _SpanContext(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --------------------------------------------------------------------------- exportação
+def _origin_ns() -> int:
+    return min((s.start_ns for s in _roots), default=0)
+
+
+def _as_tree(s: Span, origin: int) -> Dict:
+    return {
+        "name": s.name,
+        "start_ms": round((s.start_ns - origin) / 1e6, 3),
+        "duration_ms": round(s.duration_ns / 1e6, 3),
+        "attrs": s.attrs,
+        "children": [_as_tree(c, origin) for c in s.children],
+    }
+
+
+def get_trace() -> List[Dict]:
+    """Retorna a árvore de spans coletados (tempos em ms relativos ao primeiro span)"""
+    with _lock:
+        roots = list(_roots)
+    origin = _origin_ns()
+    return [_as_tree(s, origin) for s in roots]
+
+
+def export_json(path: Union[str, Path]) -> str:
+    """Grava a árvore de tempos em JSON"""
+    path = Path(path)
+    path.write_text(json.dumps({"pid": os.getpid(), "spans": get_trace()}, indent=2,
+                               ensure_ascii=False, default=str), encoding="utf-8")
+    return str(path)
+
+
+def export_chrome(path: Union[str, Path]) -> str:
+    """Grava os spans no formato Trace Event (chrome://tracing, Perfetto, speedscope)"""
+    with _lock:
+        roots = list(_roots)
+    origin = _origin_ns()
+    pid = os.getpid()
+    events = []
+    stack = list(roots)
+    while stack:
+        s = stack.pop()
+        events.append({
+            "name": s.name, "ph": "X", "pid": pid, "tid": s.thread_id,
+            "ts": (s.start_ns - origin) / 1e3, "dur": s.duration_ns / 1e3,
+            "args": {k: str(v) for k, v in s.attrs.items()},
+        })
+        stack.extend(s.children)
+    events.sort(key=lambda e: e["ts"])
+    Path(path).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}), encoding="utf-8")
+    return str(path)
+
+
+def format_tree(min_ms: float = 0.0) -> str:
+    """Resumo textual da árvore de spans (para o terminal)"""
+    lines = []
+
+    def _walk(node: Dict, depth: int) -> None:
+        if node["duration_ms"] >= min_ms:
+            lines.append(f"{'  ' * depth}{node['duration_ms']:>10.1f} ms  {node['name']}")
+        for child in node["children"]:
+            _walk(child, depth + 1)
+
+    for root in get_trace():
+        _walk(root, 0)
+    return "\n".join(lines)
+
+
+@contextmanager
+def profiled(output: Union[str, Path], top: int = 25, stream=None):
+    """
+    Executa o bloco sob cProfile, grava as estatísticas (.prof) e imprime as
+    `top` funções por tempo acumulado
+    """
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield prof
+    finally:
+        prof.disable()
+        prof.dump_stats(str(output))
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        print(buf.getvalue(), file=stream or sys.stderr)
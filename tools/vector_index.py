@@ -0,0 +1,258 @@
+# Índice vetorial compacto (NumPy mapeado em memória) para a base de conhecimento
+"""
+Alternativa ao Chroma para o RAG local:
+
+- os embeddings ficam em uma matriz `.npy` normalizada em float16 ou int8
+  (quantização simétrica por linha, com a escala em float32 ao lado),
+  aberta com `np.load(mmap_mode="r")` — sem cópia e em milissegundos;
+- textos e metadados dos chunks ficam em um arquivo JSON Lines lateral, lido
+  apenas para os resultados do top-k (via tabela de offsets);
+- a busca é um produto interno vetorizado em blocos + `argpartition`.
+
+Layout do diretório do índice (cada gravação cria uma versão nova e troca o
+ponteiro `index.json`; a versão anterior fica até a gravação seguinte):
+
+    index.json          {"current": ".v<id>"} — versão ativa
+    .v<id>/
+        manifest.json   dimensão, quantidade, dtype, modelo de embeddings
+        vectors.npy     matriz (n, dim) float16 ou int8
+        scales.npy      escala por linha (apenas int8)
+        chunks.jsonl    {"text": ..., "metadata": {...}} por linha
+        offsets.npy     offset em bytes de cada linha de chunks.jsonl (n + 1)
+
+Índices antigos, com os arquivos direto no diretório, continuam legíveis.
+"""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.retrievers import BaseRetriever
+except ImportError:  # langchain é opcional para o índice em si
+    Document = None
+    BaseRetriever = None
+
+FORMAT_VERSION = 1
+DTYPES = ("float16", "int8")
+
+# Linhas processadas por bloco na busca (limita a cópia temporária em float32)
+SEARCH_BLOCK_ROWS = 8192
+
+POINTER_FILE = "index.json"
+# Prefixo das versões (oculto, não colide com os slugs dos shards em rag_shards)
+VERSION_PREFIX = ".v"
+INDEX_FILES = ("manifest.json", "vectors.npy", "scales.npy", "chunks.jsonl", "offsets.npy")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def resolve(directory: Union[str, Path]) -> Path:
+    """Diretório da versão ativa do índice (o próprio diretório no layout antigo)"""
+    directory = Path(directory)
+    try:
+        current = json.loads((directory / POINTER_FILE).read_text(encoding="utf-8"))["current"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return directory
+    return directory / current
+
+
+def _remove_stale(directory: Path, keep: Sequence[str]) -> None:
+    """Remove versões antigas, arquivos do layout antigo e sobras de gravações interrompidas"""
+    for entry in directory.iterdir():
+        if entry.name.startswith(VERSION_PREFIX) and entry.is_dir() and entry.name not in keep:
+            shutil.rmtree(entry, ignore_errors=True)
+        elif entry.name in INDEX_FILES or (entry.name.startswith(POINTER_FILE + ".") and entry.name.endswith(".tmp")):
+            entry.unlink(missing_ok=True)
+    # Diretórios temporários da troca feita por versões anteriores deste módulo
+    for suffix in (".tmp", ".old"):
+        shutil.rmtree(directory.with_name(directory.name + suffix), ignore_errors=True)
+
+
+def write_index(directory: Union[str, Path], vectors: Union[np.ndarray, Sequence[Sequence[float]]],
+                texts: Sequence[str], metadatas: Optional[Sequence[Dict]] = None,
+                dtype: str = "float16", model: Optional[str] = None) -> Path:
+    """
+    Grava um índice compacto
+
+    Os arquivos são escritos em uma versão nova (`.v<id>/`) e só então o
+    ponteiro `index.json` é trocado com `os.replace`, que é atômico: leitores
+    abrem a versão anterior ou a nova, nunca uma pela metade. A versão que
+    estava ativa é mantida (leitores que já a resolveram continuam abrindo-a);
+    as mais antigas e sobras de gravações interrompidas são removidas.
+
+    Args:
+        directory: Diretório de destino
+        vectors: Embeddings (n, dim)
+        texts: Texto de cada chunk
+        metadatas: Metadados de cada chunk
+        dtype: "float16" ou "int8"
+        model: Nome do modelo de embeddings (conferido na abertura)
+
+    Returns:
+        Path do diretório gravado
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype deve ser um de {DTYPES}")
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] != len(texts):
+        raise ValueError("vectors deve ser uma matriz com uma linha por texto")
+    matrix = _normalize(matrix)
+    metadatas = [m or {} for m in metadatas] if metadatas is not None else [{} for _ in texts]
+    if len(metadatas) != len(texts):
+        raise ValueError("texts e metadatas devem ter o mesmo tamanho")
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = f"{VERSION_PREFIX}{time.time_ns():x}-{os.getpid()}"
+    tmp = directory / version
+    tmp.mkdir()
+
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.rint(matrix / scales[:, None]).astype(np.int8)
+        np.save(tmp / "vectors.npy", quantized)
+        np.save(tmp / "scales.npy", scales.astype(np.float32))
+    else:
+        np.save(tmp / "vectors.npy", matrix.astype(np.float16))
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    with open(tmp / "chunks.jsonl", "wb") as f:
+        for i, (text, meta) in enumerate(zip(texts, metadatas)):
+            f.write(json.dumps({"text": text, "metadata": meta}, ensure_ascii=False).encode("utf-8") + b"\n")
+            offsets[i + 1] = f.tell()
+    np.save(tmp / "offsets.npy", offsets)
+
+    manifest = {"version": FORMAT_VERSION, "count": len(texts), "dim": int(matrix.shape[1]),
+                "dtype": dtype, "model": model}
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    previous = resolve(directory)
+    pointer = directory / f"{POINTER_FILE}.{os.getpid()}.tmp"
+    pointer.write_text(json.dumps({"current": version}), encoding="utf-8")
+    os.replace(pointer, directory / POINTER_FILE)
+    _remove_stale(directory, keep=(version, previous.name))
+    return directory
+
+
+def exists(directory: Union[str, Path]) -> bool:
+    return (resolve(directory) / "manifest.json").exists()
+
+
+class CompactIndex:
+    """Índice somente leitura sobre os arquivos de `write_index`"""
+
+    def __init__(self, directory: Union[str, Path], model: Optional[str] = None):
+        """
+        Args:
+            directory: Diretório gravado por `write_index` (a versão ativa é resolvida na abertura)
+            model: Modelo de embeddings das consultas; se informado, precisa ser o
+                mesmo gravado no manifesto (vetores de modelos diferentes não se comparam)
+
+        Raises:
+            ValueError: versão de formato ou modelo incompatível
+        """
+        self.directory = resolve(directory)
+        self.manifest = json.loads((self.directory / "manifest.json").read_text(encoding="utf-8"))
+        if self.manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(f"versão de índice não suportada: {self.manifest.get('version')}")
+        indexed = self.manifest.get("model")
+        if model and indexed and model != indexed:
+            raise ValueError(f"índice gerado com o modelo {indexed}, consulta com {model}; "
+                             "execute rag_loader.py --force")
+        self.vectors = np.load(self.directory / "vectors.npy", mmap_mode="r")
+        self.scales = (np.load(self.directory / "scales.npy", mmap_mode="r")
+                       if self.manifest["dtype"] == "int8" else None)
+        self.offsets = np.load(self.directory / "offsets.npy", mmap_mode="r")
+        self._chunks = open(self.directory / "chunks.jsonl", "rb")
+
+    def close(self) -> None:
+        self._chunks.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self.manifest["count"])
+
+    @property
+    def model(self) -> Optional[str]:
+        return self.manifest.get("model")
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes da matriz de vetores (e escalas) — o que fica residente na busca"""
+        return int(self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def search(self, query: Union[np.ndarray, Sequence[float]], k: int = 3) -> List[Tuple[int, float]]:
+        """
+        Busca os k chunks mais similares (cosseno) ao vetor de consulta
+
+        Returns:
+            Lista de (posição do chunk, similaridade), da maior para a menor
+        """
+        n = len(self)
+        if n == 0 or k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32).ravel()
+        norm = np.linalg.norm(q)
+        if norm:
+            q = q / norm
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            block = self.vectors[start:start + SEARCH_BLOCK_ROWS]
+            # einsum acumula em float32 sem materializar o bloco convertido
+            scores[start:start + len(block)] = np.einsum("ij,j->i", block, q, dtype=np.float32)
+        if self.scales is not None:
+            scores *= self.scales
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def chunk(self, i: int) -> Dict[str, Any]:
+        """Lê texto e metadados de um chunk pelo offset (sem carregar o arquivo inteiro)"""
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        self._chunks.seek(start)
+        return json.loads(self._chunks.read(end - start))
+
+    def query(self, query: Union[np.ndarray, Sequence[float]], k: int = 3) -> List[Dict[str, Any]]:
+        """Top-k com texto, metadados e similaridade de cada chunk"""
+        results = []
+        for i, score in self.search(query, k):
+            item = self.chunk(i)
+            item["score"] = score
+            results.append(item)
+        return results
+
+
+if BaseRetriever is not None:
+    class CompactRetriever(BaseRetriever):
+        """Adaptador LangChain: permite usar o CompactIndex no lugar de `Chroma.as_retriever()`"""
+
+        index: Any
+        embeddings: Any
+        k: int = 3
+
+        def _get_relevant_documents(self, query: str, *, run_manager=None) -> List:
+            vector = self.embeddings.embed_query(query)
+            return [
+                Document(page_content=item["text"], metadata={**item["metadata"], "score": item["score"]})
+                for item in self.index.query(vector, self.k)
+            ]
+else:
+    CompactRetriever = None
@@ -0,0 +1,438 @@
+# Modo watch: reanálise incremental a cada arquivo salvo
+"""
+Observa um diretório e, a cada arquivo salvo, roda apenas os analisadores
+daquele arquivo, mostrando o que mudou nos achados:
+
+- Dockerfile → `analyze_dockerfile`; docker-compose → `analyze_compose`;
+  prometheus.yml → `check_prometheus_config`; demais YAML/JSON →
+  heurísticas do `policy_check` por documento; `.rego` → `analyze_rego`;
+  `.py` → Bandit só no arquivo salvo (API Python com plugins já carregados,
+  ou o daemon do `bandit_pool` quando houver);
+- eventos do sistema de arquivos vêm do `watchdog` (se instalado), do
+  inotify do Linux (via ctypes) ou, em último caso, de polling por mtime;
+- rajadas de eventos (salvar, formatar, git checkout) são agrupadas por
+  debounce e cada arquivo é analisado uma vez por lote;
+- os achados de cada arquivo ficam em memória (e os documentos parseados no
+  `doc_cache`), então cada salvamento gera só o diff: novos e resolvidos.
+
+Uso:
+    python tools/devsecops_mcp.py watch . [--json]
+    python tools/watcher.py . [--json]
+"""
+
+import ctypes
+import json
+import os
+import queue
+import select
+import struct
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, TextIO, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from tools import bandit_pool, container_check, doc_cache, monitoring_check, policy_check, tracing
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# Silêncio após o último evento antes de analisar o lote
+DEBOUNCE_SECONDS = 0.15
+# Mesmo com eventos contínuos, um lote é analisado no máximo após este tempo
+MAX_BATCH_DELAY = 1.0
+# Intervalo do backend de polling
+POLL_INTERVAL = 0.5
+IGNORED_DIRS = bandit_pool.EXCLUDE_DIRS | {"relatorios"}
+
+# Achados de um arquivo: chave estável (sem número de linha) → texto exibido
+Issues = Dict[str, str]
+
+
+# --------------------------------------------------------------------------- analisadores
+def _flatten(result: Dict[str, List[str]]) -> List[str]:
+    return [issue for key in ("critical", "warnings", "suggestions", "error") for issue in result.get(key, [])]
+
+
+def _keyed(issues: Iterable[str]) -> Issues:
+    keyed: Issues = {}
+    for issue in issues:
+        key, n = issue, 1
+        while key in keyed:
+            n += 1
+            key = f"{issue}#{n}"
+        keyed[key] = issue
+    return keyed
+
+
+def _dockerfile(path: Path) -> Issues:
+    return _keyed(_flatten(container_check.ContainerSecurityChecker().analyze_dockerfile(str(path))))
+
+
+def _compose(path: Path) -> Issues:
+    return _keyed(_flatten(container_check.ContainerSecurityChecker().analyze_compose(str(path))))
+
+
+def _prometheus(path: Path) -> Issues:
+    report = monitoring_check.check_prometheus_config(path)
+    return _keyed(line.strip() for line in report.splitlines() if line.strip().startswith(("❌", "⚠", "💡", "[Erro")))
+
+
+def _config(path: Path) -> Issues:
+    try:
+        docs = doc_cache.load_all(path)
+    except Exception as e:
+        return {"parse": f"❌ Erro ao parsear: {str(e).splitlines()[0]}"}
+    issues = []
+    for i, doc in enumerate(docs, 1):
+        label = f"[{policy_check._describe(doc, i)}] " if len(docs) > 1 else ""
+        issues.extend(f"{label}{issue[2:] if issue.startswith('- ') else issue}"
+                      for issue in policy_check._config_issues(doc))
+    return _keyed(issues)
+
+
+def _rego(path: Path) -> Issues:
+    result = policy_check.analyze_rego(path)
+    return {} if result == "Política Rego possui regras." else {"rego": f"⚠️ {result}"}
+
+
+def _bandit_issues(results: List[Dict], errors: List[Dict]) -> Issues:
+    issues: Issues = {}
+    for issue in results:
+        # Chave sem a linha: editar acima do achado não o transforma em "novo"
+        key, n = f"{issue['test_id']}:{issue['issue_text']}", 1
+        while f"{key}#{n}" in issues:
+            n += 1
+        issues[f"{key}#{n}"] = (f"{issue['issue_severity']} {issue['test_id']} linha {issue['line_number']}: "
+                                f"{issue['issue_text']}")
+    for error in errors:
+        issues[f"erro:{error['reason']}"] = f"❌ Bandit: {error['reason']}"
+    return issues
+
+
+def _python(path: Path) -> Issues:
+    report = bandit_pool.scan([path])
+    return _bandit_issues(report["results"], report["errors"])
+
+
+def analyzer_for(path: Path) -> Optional[Callable[[Path], Issues]]:
+    """Analisador responsável pelo arquivo (None = arquivo ignorado)"""
+    name = path.name.lower()
+    if name == "dockerfile" or name.startswith("dockerfile.") or name.endswith(".dockerfile"):
+        return _dockerfile
+    if name in ("docker-compose.yml", "docker-compose.yaml", "compose.yml", "compose.yaml") or \
+            (name.startswith("docker-compose.") and path.suffix.lower() in (".yml", ".yaml")):
+        return _compose
+    if name in ("prometheus.yml", "prometheus.yaml"):
+        return _prometheus
+    if path.suffix.lower() in (".yml", ".yaml", ".json"):
+        return _config
+    if path.suffix.lower() == ".rego":
+        return _rego
+    if path.suffix.lower() == ".py":
+        return _python
+    return None
+
+
+def _ignored(path: str, root: str) -> bool:
+    rel = os.path.relpath(path, root)
+    return any(part in IGNORED_DIRS or part.endswith(".egg") for part in Path(rel).parts[:-1])
+
+
+def iter_watched_files(root: Path) -> Iterable[Path]:
+    for dirpath, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS and not d.endswith(".egg"))
+        for name in sorted(names):
+            path = Path(dirpath) / name
+            if analyzer_for(path) is not None:
+                yield path
+
+
+# --------------------------------------------------------------------------- backends de eventos
+class _InotifyBackend:
+    """inotify do Linux via ctypes: um watch por diretório, novos diretórios entram na hora"""
+
+    IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x8, 0x40, 0x80
+    IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_Q_OVERFLOW, IN_ISDIR = 0x100, 0x200, 0x400, 0x4000, 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: Path):
+        self.root = str(root)
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        self.dirs: Dict[int, str] = {}
+        self.overflowed = False
+        try:
+            self._add_tree(self.root)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            # ENOSPC: limite fs.inotify.max_user_watches atingido
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch falhou em {path}")
+        self.dirs[wd] = path
+
+    def _add_tree(self, top: str) -> List[str]:
+        """Observa `top` e subdiretórios; devolve os arquivos já existentes (criados antes do watch)"""
+        files = []
+        for dirpath, dirs, names in os.walk(top):
+            dirs[:] = [d for d in dirs if d not in IGNORED_DIRS and not d.endswith(".egg")]
+            self._add_watch(dirpath)
+            files.extend(os.path.join(dirpath, n) for n in names)
+        return files
+
+    def poll(self, timeout: float) -> Set[str]:
+        changed: Set[str] = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self._EVENT.unpack_from(data, offset)
+                name = data[offset + self._EVENT.size: offset + self._EVENT.size + length].rstrip(b"\0")
+                offset += self._EVENT.size + length
+                if mask & self.IN_Q_OVERFLOW:
+                    self.overflowed = True
+                    continue
+                base = self.dirs.get(wd)
+                if base is None:
+                    continue
+                if mask & self.IN_DELETE_SELF:
+                    self.dirs.pop(wd, None)
+                    continue
+                path = os.path.join(base, os.fsdecode(name))
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO) and os.path.basename(path) not in IGNORED_DIRS:
+                        changed.update(self._add_tree(path))
+                    continue
+                if mask & self.IN_CREATE:
+                    continue  # o conteúdo chega no IN_CLOSE_WRITE
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _WatchdogBackend:
+    """watchdog (inotify/FSEvents/ReadDirectoryChangesW conforme o SO)"""
+
+    def __init__(self, root: Path):
+        self._events: "queue.Queue[str]" = queue.Queue()
+        events = self._events
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    events.put(event.src_path)
+                    if getattr(event, "dest_path", None):
+                        events.put(event.dest_path)
+
+        self.observer = Observer()
+        self.observer.schedule(Handler(), str(root), recursive=True)
+        self.observer.start()
+
+    def poll(self, timeout: float) -> Set[str]:
+        changed: Set[str] = set()
+        try:
+            changed.add(self._events.get(timeout=timeout))
+        except queue.Empty:
+            return changed
+        while True:
+            try:
+                changed.add(self._events.get_nowait())
+            except queue.Empty:
+                return changed
+
+    def close(self) -> None:
+        self.observer.stop()
+        self.observer.join()
+
+
+class _PollingBackend:
+    """Fallback portátil: compara (mtime, tamanho) dos arquivos observados"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for path in iter_watched_files(self.root):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            snapshot[str(path)] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def poll(self, timeout: float) -> Set[str]:
+        time.sleep(max(timeout, POLL_INTERVAL))
+        current = self._scan()
+        changed = {p for p, stamp in current.items() if self._snapshot.get(p) != stamp}
+        changed |= set(self._snapshot) - set(current)
+        self._snapshot = current
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def open_backend(root: Path):
+    """watchdog → inotify (Linux) → polling"""
+    if Observer is not None:
+        return _WatchdogBackend(root)
+    if sys.platform.startswith("linux"):
+        try:
+            return _InotifyBackend(root)
+        except (OSError, AttributeError) as e:
+            print(f"Aviso: inotify indisponível ({e}); usando polling", file=sys.stderr)
+    return _PollingBackend(root)
+
+
+# --------------------------------------------------------------------------- watch
+class Watcher:
+    """Mantém os achados de cada arquivo em memória e publica diffs a cada lote de alterações"""
+
+    def __init__(self, root: str, out: TextIO = sys.stdout, ndjson: bool = False):
+        self.root = Path(root).resolve()
+        self.out = out
+        self.ndjson = ndjson
+        self.state: Dict[str, Issues] = {}
+
+    def _emit(self, event: Dict) -> None:
+        if self.ndjson:
+            self.out.write(json.dumps(event, ensure_ascii=False) + "\n")
+        else:
+            stamp = datetime.now().strftime("%H:%M:%S")
+            if event["event"] == "pronto":
+                self.out.write(f"[{stamp}] Observando {event['raiz']} ({event['arquivos']} arquivos, "
+                               f"{event['achados']} achados, {event['ms']} ms, backend {event['backend']})\n")
+            elif event["novos"] or event["resolvidos"]:
+                self.out.write(f"[{stamp}] {event['arquivo']} ({event['ms']} ms)\n")
+                self.out.writelines(f"  + {issue}\n" for issue in event["novos"])
+                self.out.writelines(f"  ✓ resolvido: {issue}\n" for issue in event["resolvidos"])
+            else:
+                self.out.write(f"[{stamp}] {event['arquivo']}: sem mudanças nos achados ({event['ms']} ms)\n")
+        self.out.flush()
+
+    def analyze(self, path: Path) -> Optional[Dict]:
+        """Reanalisa um arquivo e devolve o diff contra o estado anterior (None se ignorado)"""
+        analyzer = analyzer_for(path)
+        key = str(path)
+        if analyzer is None or _ignored(key, str(self.root)):
+            return None
+        started = time.perf_counter()
+        with tracing.span("watch.arquivo", arquivo=path.name):
+            if path.is_file():
+                try:
+                    current = analyzer(path)
+                except Exception as e:
+                    current = {"erro": f"❌ Falha ao analisar: {e}"}
+            else:
+                current = {}  # removido: tudo o que havia foi resolvido
+        previous = self.state.get(key, {})
+        if current:
+            self.state[key] = current
+        else:
+            self.state.pop(key, None)
+        return {
+            "event": "diff",
+            "arquivo": os.path.relpath(key, self.root),
+            "novos": [current[k] for k in current if k not in previous],
+            "resolvidos": [previous[k] for k in previous if k not in current],
+            "total": len(current),
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def baseline(self, backend_name: str) -> None:
+        """Análise inicial da árvore (arquivos .py em um único lote do bandit_pool)"""
+        started = time.perf_counter()
+        files = list(iter_watched_files(self.root))
+        python = []
+        for path in files:
+            if analyzer_for(path) is _python:
+                python.append(path)
+            else:
+                self.analyze(path)
+        if python:
+            try:
+                report = bandit_pool.scan(python)
+            except Exception as e:
+                print(f"Aviso: Bandit indisponível ({e})", file=sys.stderr)
+            else:
+                results: Dict[str, List[Dict]] = {}
+                errors: Dict[str, List[Dict]] = {}
+                for issue in report["results"]:
+                    results.setdefault(str(Path(issue["filename"]).resolve()), []).append(issue)
+                for error in report["errors"]:
+                    errors.setdefault(str(Path(error["filename"]).resolve()), []).append(error)
+                for name in set(results) | set(errors):
+                    self.state[name] = _bandit_issues(results.get(name, []), errors.get(name, []))
+        self._emit({"event": "pronto", "raiz": str(self.root), "backend": backend_name, "arquivos": len(files),
+                    "achados": sum(len(v) for v in self.state.values()),
+                    "ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    def run(self, backend=None, stop: Optional[Callable[[], bool]] = None) -> None:
+        backend = backend or open_backend(self.root)
+        self.baseline(type(backend).__name__.strip("_").replace("Backend", "").lower())
+        pending: Set[str] = set()
+        first = last = 0.0
+        try:
+            while not (stop and stop()):
+                changed = backend.poll(DEBOUNCE_SECONDS if pending else 0.5)
+                now = time.monotonic()
+                if changed:
+                    if not pending:
+                        first = now
+                    pending |= changed
+                    last = now
+                if pending and (now - last >= DEBOUNCE_SECONDS or now - first >= MAX_BATCH_DELAY):
+                    batch, pending = sorted(pending), set()
+                    if getattr(backend, "overflowed", False):
+                        # Fila do kernel transbordou: eventos perdidos, reanalisa tudo o que é observado
+                        backend.overflowed = False
+                        batch = sorted(set(batch) | {str(p) for p in iter_watched_files(self.root)} | set(self.state))
+                    for path in batch:
+                        diff = self.analyze(Path(path))
+                        if diff is not None:
+                            self._emit(diff)
+        finally:
+            backend.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Reanálise incremental a cada arquivo salvo")
+    parser.add_argument("diretorio", nargs="?", default=".")
+    parser.add_argument("--json", action="store_true", help="Eventos em NDJSON (um diff por linha)")
+    args = parser.parse_args(argv)
+    if not Path(args.diretorio).is_dir():
+        print(f"Diretório não encontrado: {args.diretorio}")
+        return 1
+    try:
+        Watcher(args.diretorio, ndjson=args.json).run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())